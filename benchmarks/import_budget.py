@@ -0,0 +1,152 @@
+# ============================================================
+# IMPORT BUDGET – APUESDATA
+# ============================================================
+#
+# Chaque module src.* est importé dans un interpréteur neuf :
+# - temps d'import propre au projet (somme des temps "self" de
+#   python -X importtime pour src.* / utils.*, hors pandas, numpy…)
+# - effets de bord : fichiers du dépôt ouverts (data/, models/…)
+#   ou connexions réseau pendant l'import (audit hook)
+#
+# Un import doit être sans effet de bord et rester sous le budget :
+# le chargement des données se fait au premier appel (accesseurs).
+#
+#   python -m benchmarks.import_budget
+#   python -m benchmarks.import_budget --budget-ms 50 src.feature_builder
+# ============================================================
+
+import argparse
+import json
+import os
+import subprocess
+import sys
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parents[1]
+
+PACKAGES = ("src",)
+OWN_PREFIXES = ("src", "utils")
+
+BUDGET_MS = 50.0
+
+# Fichiers lus légitimement à l'import (configuration)
+ALLOWED_FILES = (".env",)
+
+_CHILD = r"""
+import json, os, sys
+
+root, module = sys.argv[1], sys.argv[2]
+seen = []
+
+def hook(event, args):
+    if event == "open" and isinstance(args[0], (str, bytes, os.PathLike)):
+        path = os.path.abspath(os.fsdecode(args[0]))
+        if (path.startswith(root + os.sep) and "__pycache__" not in path
+                and not path.endswith((".py", ".pyc")) and not os.path.isdir(path)):
+            seen.append(["open", os.path.relpath(path, root)])
+    elif event == "socket.connect":
+        seen.append(["connect", repr(args[1])])
+
+sys.addaudithook(hook)
+
+# __import__ (et non importlib.import_module) : seul chemin vu par -X importtime
+__import__(module)
+sys.stdout.write("\n" + json.dumps(seen) + "\n")
+"""
+
+
+def discover(packages=PACKAGES):
+    """Noms des modules Python sous les packages (hors __pycache__)."""
+    modules = []
+    for package in packages:
+        for path in sorted((ROOT / package).rglob("*.py")):
+            if "__pycache__" in path.parts:
+                continue
+            parts = path.relative_to(ROOT).with_suffix("").parts
+            if parts[-1] == "__init__":
+                parts = parts[:-1]
+            modules.append(".".join(parts))
+    return modules
+
+
+def _own_time_ms(stderr):
+    """Somme des temps "self" (-X importtime) des modules du projet, en ms."""
+    total = 0
+    for line in stderr.splitlines():
+        if not line.startswith("import time:") or "|" not in line:
+            continue
+        fields = line[len("import time:"):].split("|")
+        name = fields[-1].strip()
+        if fields[0].strip().isdigit() and name.split(".")[0] in OWN_PREFIXES:
+            total += int(fields[0])
+    return total / 1000
+
+
+def measure(module, env=None):
+    """Importe `module` dans un process neuf : temps propre + effets de bord."""
+    proc = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", _CHILD, str(ROOT), module],
+        cwd=ROOT, env=env, capture_output=True, text=True,
+    )
+    result = {
+        "module": module, "own_ms": _own_time_ms(proc.stderr),
+        "side_effects": [], "error": None, "skipped": None,
+    }
+
+    if proc.returncode != 0:
+        errors = [l for l in proc.stderr.splitlines() if not l.startswith("import time:")]
+        error = errors[-1] if errors else f"exit {proc.returncode}"
+        missing = error.startswith("ModuleNotFoundError") and error.split("'")[1].split(".")[0]
+        if missing and missing not in OWN_PREFIXES:
+            result["skipped"] = f"missing dependency '{missing}'"
+        else:
+            result["error"] = error
+        return result
+
+    events = json.loads(proc.stdout.rstrip().splitlines()[-1])
+    result["side_effects"] = [
+        f"{kind} {target}" for kind, target in events
+        if not (kind == "open" and Path(target).name in ALLOWED_FILES)
+    ]
+    return result
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Temps d'import et effets de bord des modules src.*")
+    parser.add_argument("modules", nargs="*", help="modules à mesurer (défaut : tous)")
+    parser.add_argument("--budget-ms", type=float, default=BUDGET_MS)
+    args = parser.parse_args(argv)
+
+    # src.config exige les clés API : valeurs factices (aucun appel réseau)
+    env = dict(os.environ)
+    env.setdefault("API_FOOTBALL_KEY", "offline-benchmark")
+    env.setdefault("API_FOOTBALL_HOST", "offline-benchmark")
+
+    failures = skipped = 0
+    for module in args.modules or discover():
+        r = measure(module, env=env)
+        if r["skipped"]:
+            skipped += 1
+            print(f"⏭ {r['module']:<50}    skipped ({r['skipped']})")
+            continue
+
+        over = r["own_ms"] > args.budget_ms
+        bad = over or r["side_effects"] or r["error"]
+        failures += bool(bad)
+
+        status = "❌" if bad else "✔"
+        print(f"{status} {r['module']:<50} {r['own_ms']:8.1f} ms")
+        for effect in r["side_effects"]:
+            print(f"     ↳ side effect at import: {effect}")
+        if r["error"]:
+            print(f"     ↳ import failed: {r['error']}")
+        if over:
+            print(f"     ↳ over budget ({args.budget_ms:.0f} ms)")
+
+    summary = "🎉 All imports within budget." if not failures else f"❌ {failures} module(s) failing."
+    print(f"\n{summary}" + (f" ({skipped} skipped : dependencies not installed)" if skipped else ""))
+    return 1 if failures else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,440 @@
+# ============================================================
+# BENCHMARKS FEATURE PIPELINE – APUESDATA
+# ============================================================
+#
+# Mesure (temps mur + pic mémoire tracemalloc) des helpers de
+# src/feature_builder.py et des builders (build_features,
+# rebuild_features_pro, features upcoming) sur un historique
+# synthétique de 1k / 20k / 220k matchs. 100 % offline : les
+# chemins data/ des modules sont redirigés vers un dossier temporaire.
+#
+#   python -m benchmarks.run_benchmarks
+#   python -m benchmarks.run_benchmarks --sizes 1000 20000 --only helper.
+#   python -m benchmarks.run_benchmarks --compare benchmarks/results/<old>.json
+# ============================================================
+
+import argparse
+import gc
+import io
+import json
+import os
+import platform
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+from contextlib import contextmanager, redirect_stdout
+from datetime import datetime
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+# src.config exige les clés API : valeurs factices (aucun appel réseau)
+os.environ.setdefault("API_FOOTBALL_KEY", "offline-benchmark")
+os.environ.setdefault("API_FOOTBALL_HOST", "offline-benchmark")
+
+import src.feature_builder as fb
+import src.update.rebuild_features_pro as rfp
+from benchmarks.synthetic import generate_fixtures, generate_history
+from src.features.asof_join import asof_attach, team_snapshot, team_state_table
+from src.features.indexes import _FRAME_CACHE, EloTimeline, TeamMatchIndex
+from src.features.registry import REGISTRY, build_feature_frame
+from src.features.rolling_state import build_features_streaming
+from src.features.snapshot_cache import clear_snapshots
+from src.features.team_table import SeasonTable, TeamTable, team_perspective
+from src.update.elo_advanced import compute_elo
+from src.update.elo_leagues import compute_elo_multi_league
+
+ROOT = Path(__file__).resolve().parents[1]
+RESULTS = ROOT / "benchmarks" / "results"
+
+# Taille -> paramètres du générateur (20 équipes par ligue)
+SIZES = {
+    1_000: dict(n_leagues=1),
+    20_000: dict(n_leagues=6),
+    220_000: dict(n_leagues=24),
+}
+
+HELPER_CALLS = 200
+N_FIXTURES = 3_000
+
+# build_features "scan" (~10 ms / match) : limité par défaut aux petites tailles
+SCAN_MAX_SIZE = 1_000
+REGRESSION_THRESHOLD = 1.25
+
+
+class Case:
+    """Un benchmark : run() mesuré, setup() non mesuré (rejoué avant chaque passe)."""
+
+    def __init__(self, name, run, setup=None, calls=1, max_size=None):
+        self.name = name
+        self.run = run
+        self.setup = setup
+        self.calls = calls
+        self.max_size = max_size
+
+
+# ============================================================
+# WORKSPACE OFFLINE
+# ============================================================
+
+@contextmanager
+def offline_workspace(df):
+    """
+    Dossier temporaire contenant history.csv et all_matches_features.csv
+    synthétiques ; les modules lisent / écrivent là le temps du benchmark.
+    """
+    patched = [
+        (rfp, "HISTORY"), (rfp, "HIST_FEATURES"), (rfp, "FEATURES_STATE"),
+        (rfp, "TEAM_SNAPSHOT"), (fb, "PROCESSED"),
+    ]
+    saved = [(mod, name, getattr(mod, name)) for mod, name in patched]
+
+    with tempfile.TemporaryDirectory(prefix="apuesdata_bench_") as tmp:
+        tmp = Path(tmp)
+        (tmp / "history").mkdir()
+        (tmp / "processed").mkdir()
+
+        rfp.HISTORY = tmp / "history"
+        rfp.HIST_FEATURES = tmp / "processed" / "all_matches_features_updated.csv"
+        rfp.FEATURES_STATE = tmp / "processed" / "features_state.pkl"
+        rfp.TEAM_SNAPSHOT = tmp / "processed" / "team_snapshot.csv"
+        fb.PROCESSED = tmp / "processed"
+
+        # Dataset processed (lu par lineup_strength)
+        with redirect_stdout(io.StringIO()):
+            feats = build_feature_frame(df, list(REGISTRY))
+        meta = df[["fixture_id", "Date", "HomeTeam", "AwayTeam", "HomeGoals", "AwayGoals"]]
+        processed = pd.concat([meta, feats.drop(columns=["elo_home", "elo_away"])], axis=1)
+        processed[["elo_home", "elo_away"]] = df[["elo_home", "elo_away"]]
+        processed.to_csv(tmp / "processed" / "all_matches_features.csv", index=False)
+
+        try:
+            yield tmp
+        finally:
+            for mod, name, value in saved:
+                setattr(mod, name, value)
+            clear_snapshots()
+
+
+def _cold():
+    """Vide les caches par DataFrame / fichier : mesure à froid."""
+    _FRAME_CACHE.clear()
+    clear_snapshots()
+
+
+def _write_history(tmp, df):
+    df.to_csv(tmp / "history" / "history.csv", index=False)
+
+
+# ============================================================
+# CAS DE BENCHMARK
+# ============================================================
+
+def helper_cases(df, seed):
+    rng = np.random.default_rng(seed)
+    rows = rng.choice(len(df), size=min(HELPER_CALLS, len(df)), replace=False)
+    pairs = [
+        (df["HomeTeam"].iat[i] if k % 2 else df["AwayTeam"].iat[i], df["Date"].iat[i])
+        for k, i in enumerate(rows)
+    ]
+    odds_rows = [
+        {"OddsH": df["B365H"].iat[i], "OddsD": df["B365D"].iat[i], "OddsA": df["B365A"].iat[i]}
+        for i in rows
+    ]
+
+    def warm():
+        # Index / tables en cache : coût par appel "à chaud"
+        team, date = pairs[0]
+        fb.team_features(df, team, date)
+
+    def per_pair(fn):
+        return lambda: [fn(team, date) for team, date in pairs]
+
+    helpers = {
+        "get_last_matches": lambda t, d: fb.get_last_matches(df, t, d),
+        "compute_form": lambda t, d: fb.compute_form(df, t, d),
+        "get_elo": lambda t, d: fb.get_elo(df, t, d),
+        "seasonal_stats": lambda t, d: fb.seasonal_stats(df, t, d),
+        "lineup_strength": fb.lineup_strength,
+        "last_opponents": lambda t, d: fb.last_opponents(df, t, d),
+        "sos": lambda t, d: fb.sos(df, t, d),
+        "vs_group": lambda t, d: fb.vs_group(df, t, d, "top"),
+        "momentum": lambda t, d: fb.momentum(df, t, d),
+        "home_adv": lambda t, d: fb.home_adv(df, t, d),
+        "xg_proxy": lambda t, d: fb.xg_proxy(df, t, d),
+        "team_features": lambda t, d: fb.team_features(df, t, d),
+    }
+
+    cases = [
+        Case(f"helper.{name}", per_pair(fn), setup=warm, calls=len(pairs))
+        for name, fn in helpers.items()
+    ]
+    cases.append(Case(
+        "helper.odds_movement",
+        lambda: [fb.odds_movement(df, r) for r in odds_rows],
+        calls=len(odds_rows),
+    ))
+    return cases
+
+
+def index_cases(df):
+    return [
+        Case("index.team_perspective", lambda: team_perspective(df)),
+        Case("index.TeamMatchIndex", lambda: TeamMatchIndex(df)),
+        Case("index.EloTimeline", lambda: EloTimeline(df)),
+        Case("index.TeamTable", lambda: TeamTable(df)),
+        Case("index.SeasonTable", lambda: SeasonTable(df)),
+        Case("elo.compute_elo", lambda: compute_elo(df.copy())),
+        Case("elo.compute_elo_multi_league", lambda: compute_elo_multi_league(df.copy(), workers=1)),
+    ]
+
+
+def builder_cases(df, tmp, workers, scan_max_size):
+    cases = [
+        Case(
+            "builder.build_features", lambda: fb.build_features(df, workers=1),
+            setup=_cold, max_size=scan_max_size,
+        ),
+        Case("builder.build_features_streaming", lambda: build_features_streaming(df), setup=_cold),
+        Case("registry.build_feature_frame", lambda: build_feature_frame(df, list(REGISTRY)), setup=_cold),
+    ]
+
+    def full_history():
+        _cold()
+        _write_history(tmp, df)
+
+    def checkpoint_then_new_day():
+        # Checkpoint sur l'historique sans le dernier jour, puis ce jour arrive
+        full_history()
+        last = df["Date"].max()
+        _write_history(tmp, df[df["Date"] < last])
+        with redirect_stdout(io.StringIO()):
+            rfp.rebuild_all_features()
+        _write_history(tmp, df)
+
+    cases += [
+        Case("rebuild.rebuild_all_features", lambda: rfp.rebuild_all_features(workers=1), setup=full_history),
+        Case(
+            "rebuild.rebuild_features_chunked",
+            lambda: rfp.rebuild_features_chunked(rfp.CHUNK_SIZE), setup=full_history,
+        ),
+        Case("rebuild.update_features", lambda: rfp.update_features(), setup=checkpoint_then_new_day),
+    ]
+
+    if workers > 1:
+        cases += [
+            Case(
+                f"builder.build_features[workers={workers}]",
+                lambda: fb.build_features(df, workers=workers),
+                setup=_cold, max_size=scan_max_size,
+            ),
+            Case(
+                f"rebuild.rebuild_all_features[workers={workers}]",
+                lambda: rfp.rebuild_all_features(workers=workers), setup=full_history,
+            ),
+        ]
+    return cases
+
+
+def upcoming_cases(df, seed):
+    fixtures = generate_fixtures(df, N_FIXTURES, seed=seed)
+    states = {}
+
+    def prepare_states():
+        states["table"] = team_state_table(df)
+
+    def prepare_snapshot():
+        states["snapshot"] = team_snapshot(df)
+
+    return [
+        Case("upcoming.team_state_table", lambda: team_state_table(df)),
+        Case("upcoming.team_snapshot", lambda: team_snapshot(df)),
+        Case(
+            "upcoming.asof_attach",
+            lambda: asof_attach(fixtures, states["table"]),
+            setup=prepare_states, calls=len(fixtures),
+        ),
+        Case(
+            "upcoming.build_feature_frame",
+            lambda: build_feature_frame(fixtures, list(REGISTRY), history=df),
+            calls=len(fixtures),
+        ),
+        Case(
+            "upcoming.build_feature_frame[snapshot]",
+            lambda: build_feature_frame(fixtures, list(REGISTRY), snapshot=states["snapshot"]),
+            setup=prepare_snapshot, calls=len(fixtures),
+        ),
+    ]
+
+
+# ============================================================
+# MESURE
+# ============================================================
+
+def _run_once(case, memory):
+    if case.setup is not None:
+        case.setup()
+    gc.collect()
+
+    with redirect_stdout(io.StringIO()):
+        if memory:
+            tracemalloc.start()
+            case.run()
+            peak = tracemalloc.get_traced_memory()[1]
+            tracemalloc.stop()
+            return peak
+
+        start = time.perf_counter()
+        case.run()
+        return time.perf_counter() - start
+
+
+def measure(case, size, memory=True):
+    """Temps mur (passe sans tracemalloc) puis pic mémoire (seconde passe)."""
+    wall = _run_once(case, memory=False)
+    peak = _run_once(case, memory=True) if memory else None
+
+    return {
+        "case": case.name,
+        "size": size,
+        "wall_s": round(wall, 6),
+        "calls": case.calls,
+        "per_call_ms": round(wall / case.calls * 1e3, 6),
+        "peak_mb": None if peak is None else round(peak / 2**20, 3),
+    }
+
+
+def _selected(name, only, skip):
+    if only and not any(pattern in name for pattern in only):
+        return False
+    return not any(pattern in name for pattern in skip)
+
+
+def run_size(size, args):
+    print(f"\n📊 {size:,} matchs")
+    df = generate_history(size, seed=args.seed, **SIZES.get(size, dict(n_leagues=max(1, size // 9_000))))
+
+    results = []
+    with offline_workspace(df) as tmp:
+        cases = (
+            index_cases(df)
+            + helper_cases(df, args.seed)
+            + builder_cases(df, tmp, args.workers, args.scan_max_size)
+            + upcoming_cases(df, args.seed)
+        )
+        for case in cases:
+            if not _selected(case.name, args.only, args.skip):
+                continue
+            if case.max_size is not None and size > case.max_size:
+                print(f"  {case.name:<45} ⏭️  ignoré (> {case.max_size:,} matchs, voir --scan-max-size)")
+                continue
+            res = measure(case, size, memory=not args.no_memory)
+            results.append(res)
+            mem = "" if res["peak_mb"] is None else f"  peak {res['peak_mb']:.1f} MB"
+            print(f"  {case.name:<45} {res['wall_s']:>10.3f} s{mem}")
+        _cold()
+    return results
+
+
+# ============================================================
+# RAPPORT JSON + COMPARAISON
+# ============================================================
+
+def _git_commit():
+    try:
+        out = subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"],
+            cwd=ROOT, capture_output=True, text=True, check=True,
+        )
+        return out.stdout.strip()
+    except Exception:
+        return None
+
+
+def write_report(results, args, path=None):
+    commit = _git_commit()
+    report = {
+        "meta": {
+            "commit": commit,
+            "timestamp": datetime.now().isoformat(timespec="seconds"),
+            "python": platform.python_version(),
+            "numpy": np.__version__,
+            "pandas": pd.__version__,
+            "platform": platform.platform(),
+            "cpu_count": os.cpu_count(),
+            "seed": args.seed,
+            "sizes": args.sizes,
+            "memory": not args.no_memory,
+        },
+        "results": results,
+    }
+
+    if path is None:
+        RESULTS.mkdir(parents=True, exist_ok=True)
+        stamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+        path = RESULTS / f"{stamp}_{commit or 'nogit'}.json"
+
+    path = Path(path)
+    path.write_text(json.dumps(report, indent=2))
+    print(f"\n💾 Benchmarks → {path}")
+    return report
+
+
+def compare(results, baseline_path, threshold=REGRESSION_THRESHOLD):
+    """Affiche les ratios de temps vs un rapport précédent ; liste des régressions."""
+    baseline = json.loads(Path(baseline_path).read_text())
+    old = {(r["case"], r["size"]): r for r in baseline["results"]}
+
+    print(f"\n🔍 Comparaison avec {baseline_path} (commit {baseline['meta'].get('commit')})")
+    regressions = []
+    for res in results:
+        ref = old.get((res["case"], res["size"]))
+        if ref is None or not ref["wall_s"]:
+            continue
+        ratio = res["wall_s"] / ref["wall_s"]
+        flag = "⚠️" if ratio > threshold else "  "
+        print(f"  {flag} {res['case']:<45} {res['size']:>8,}  x{ratio:.2f}")
+        if ratio > threshold:
+            regressions.append((res["case"], res["size"], ratio))
+    return regressions
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmarks offline du pipeline de features.")
+    parser.add_argument("--sizes", type=int, nargs="+", default=list(SIZES))
+    parser.add_argument("--only", nargs="*", default=[], help="sous-chaînes des cas à garder")
+    parser.add_argument("--skip", nargs="*", default=[], help="sous-chaînes des cas à ignorer")
+    parser.add_argument("--workers", type=int, default=1, help="> 1 : ajoute les builders parallèles")
+    parser.add_argument("--scan-max-size", type=int, default=SCAN_MAX_SIZE,
+                        help="taille max pour build_features (scan par ligne)")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--no-memory", action="store_true", help="pas de passe tracemalloc")
+    parser.add_argument("--out", default=None, help="fichier JSON de sortie")
+    parser.add_argument("--compare", default=None, help="rapport JSON de référence")
+    parser.add_argument("--threshold", type=float, default=REGRESSION_THRESHOLD)
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    args = parse_args(argv)
+
+    results = []
+    for size in args.sizes:
+        results += run_size(size, args)
+
+    write_report(results, args, args.out)
+
+    if args.compare:
+        regressions = compare(results, args.compare, args.threshold)
+        if regressions:
+            print(f"❌ {len(regressions)} régression(s) > x{args.threshold}")
+            return 1
+        print("✔ Pas de régression.")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
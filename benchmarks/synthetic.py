@@ -0,0 +1,167 @@
+# ============================================================
+# SYNTHETIC LEAGUES – APUESDATA BENCHMARKS
+# ============================================================
+#
+# Historique synthétique reproductible (seed) pour mesurer le
+# pipeline de features sans données de production :
+# - N ligues de T équipes, calendrier aller-retour (méthode du
+#   cercle), une journée par semaine, saisons août -> mai
+# - buts ~ Poisson(attaque, défense, avantage domicile)
+# - elo_home / elo_away pré-match (elo_advanced.compute_elo)
+# - cotes B365 / PS dérivées des probabilités Poisson + marge
+# ============================================================
+
+import numpy as np
+import pandas as pd
+
+from src.update.elo_advanced import compute_elo
+
+BASE_GOALS = 1.2      # buts par équipe et par match (avant forces / domicile)
+HOME_BOOST = 0.18     # log-avantage domicile (~1.5 vs ~1.15 buts)
+STRENGTH_SD = 0.22    # dispersion des forces attaque / défense
+FIRST_SEASON = 2008
+
+
+def _round_robin(n_teams):
+    """Journées aller (méthode du cercle) : liste de listes de paires (i, j)."""
+    teams = list(range(n_teams)) + ([None] if n_teams % 2 else [])
+    n = len(teams)
+    rounds = []
+    for r in range(n - 1):
+        pairs = []
+        for k in range(n // 2):
+            a, b = teams[k], teams[n - 1 - k]
+            if a is not None and b is not None:
+                pairs.append((a, b) if r % 2 == 0 else (b, a))
+        rounds.append(pairs)
+        teams = [teams[0], teams[-1]] + teams[1:-1]
+    return rounds
+
+
+def _outcome_probs(lam_h, lam_a, max_goals=10):
+    """P(H), P(D), P(A) pour deux Poisson indépendants (vectorisé, O(n·max_goals))."""
+    k = np.arange(max_goals + 1)
+    fact = np.cumprod(np.r_[1, k[1:]]).astype(float)
+    ph = np.exp(-lam_h)[:, None] * lam_h[:, None] ** k / fact
+    pa = np.exp(-lam_a)[:, None] * lam_a[:, None] ** k / fact
+
+    cdf_a = np.cumsum(pa, axis=1)
+    p_h = (ph[:, 1:] * cdf_a[:, :-1]).sum(axis=1)
+    p_d = (ph * pa).sum(axis=1)
+    return p_h, p_d, np.clip(1 - p_h - p_d, 1e-6, 1)
+
+
+def generate_history(n_matches=None, n_leagues=4, teams_per_league=20,
+                     n_seasons=None, seed=0):
+    """
+    Historique synthétique trié par Date.
+
+    n_seasons=None : autant de saisons que nécessaire pour n_matches.
+    n_matches=None : toutes les saisons générées ; sinon tronqué aux
+                     n_matches premiers matchs (ordre chronologique).
+    """
+    if n_matches is None and n_seasons is None:
+        raise ValueError("❌ n_matches ou n_seasons requis")
+
+    rng = np.random.default_rng(seed)
+    rounds = _round_robin(teams_per_league)
+    per_season = n_leagues * 2 * sum(len(r) for r in rounds)
+    if n_seasons is None:
+        n_seasons = -(-n_matches // per_season)
+
+    league_ids = np.arange(n_leagues) + 1
+    teams = np.array([
+        [f"l{lg} team {t:02d}" for t in range(teams_per_league)]
+        for lg in league_ids
+    ])
+
+    n_teams = teams.size
+    schedule = rounds + [[(b, a) for a, b in r] for r in rounds]
+
+    # Forces attaque / défense qui dérivent d'une saison à l'autre
+    attack = np.empty((n_seasons, n_teams))
+    defence = np.empty((n_seasons, n_teams))
+    att = rng.normal(0, STRENGTH_SD, size=n_teams)
+    dfn = rng.normal(0, STRENGTH_SD, size=n_teams)
+
+    cols = {c: [] for c in ("Date", "season", "home", "away")}
+    for s in range(n_seasons):
+        att = 0.8 * att + rng.normal(0, STRENGTH_SD * 0.6, size=n_teams)
+        dfn = 0.8 * dfn + rng.normal(0, STRENGTH_SD * 0.6, size=n_teams)
+        attack[s], defence[s] = att, dfn
+
+        start = pd.Timestamp(FIRST_SEASON + s, 8, 1).to_datetime64()
+        for lg in range(n_leagues):
+            for r, pairs in enumerate(schedule):
+                pairs = np.asarray(pairs)
+                # Samedi / dimanche / lundi selon le match
+                days = 7 * r + rng.integers(0, 3, size=len(pairs))
+                cols["Date"].append(start + days.astype("timedelta64[D]"))
+                cols["season"].append(np.full(len(pairs), s))
+                cols["home"].append(lg * teams_per_league + pairs[:, 0])
+                cols["away"].append(lg * teams_per_league + pairs[:, 1])
+
+    dates = np.concatenate(cols["Date"])
+    season = np.concatenate(cols["season"])
+    home = np.concatenate(cols["home"])
+    away = np.concatenate(cols["away"])
+    league = league_ids[home // teams_per_league]
+
+    log_base = np.log(BASE_GOALS)
+    lam_h = np.exp(log_base + HOME_BOOST + attack[season, home] - defence[season, away])
+    lam_a = np.exp(log_base - HOME_BOOST / 2 + attack[season, away] - defence[season, home])
+    hg = rng.poisson(lam_h)
+    ag = rng.poisson(lam_a)
+
+    first = FIRST_SEASON + season
+    df = pd.DataFrame({
+        "Date": dates.astype("datetime64[ns]"),
+        "Season": [f"{y}/{y + 1}" for y in first],
+        "league_id": league,
+        "Div": [f"L{lg}" for lg in league],
+        "HomeTeam": teams.ravel()[home],
+        "AwayTeam": teams.ravel()[away],
+        "HomeGoals": hg,
+        "AwayGoals": ag,
+    })
+
+    # Cotes : probabilités Poisson + marge bookmaker ~5 %
+    p_h, p_d, p_a = _outcome_probs(lam_h, lam_a)
+    for book, margin in (("B365", 1.05), ("PS", 1.025)):
+        noise = rng.normal(1, 0.02, size=(3, len(df)))
+        for res, p, e in zip("HDA", (p_h, p_d, p_a), noise):
+            df[f"{book}{res}"] = np.round(1 / np.clip(p * margin * e, 1e-3, 0.99), 2)
+
+    order = np.argsort(df["Date"].to_numpy(), kind="stable")
+    df = df.iloc[order].reset_index(drop=True)
+    if n_matches is not None:
+        df = df.iloc[:n_matches].copy()
+
+    df.insert(0, "fixture_id", np.arange(len(df)) + 1_000_000)
+    return compute_elo(df)
+
+
+def generate_fixtures(history, n_fixtures, days=7, seed=0):
+    """
+    Fixtures à venir (sans score) dans les `days` jours suivant la fin
+    de l'historique, entre équipes d'une même ligue.
+    """
+    rng = np.random.default_rng(seed)
+    last = history["Date"].max()
+
+    leagues = history.groupby("league_id")["HomeTeam"].unique()
+    lg = rng.choice(leagues.index.to_numpy(), size=n_fixtures)
+
+    home, away = [], []
+    for league in lg:
+        h, a = rng.choice(leagues[league], size=2, replace=False)
+        home.append(h)
+        away.append(a)
+
+    return pd.DataFrame({
+        "fixture_id": np.arange(n_fixtures) + 9_000_000,
+        "Date": last + pd.to_timedelta(rng.integers(1, days + 1, size=n_fixtures), unit="D"),
+        "league_id": lg,
+        "HomeTeam": home,
+        "AwayTeam": away,
+    })
@@ -2,6 +2,7 @@ import streamlit as st
 import pandas as pd
 from pathlib import Path
 from src.ui_theme import apply_custom_theme, page_title
+from src.storage import dataset_exists, read_dataset
 
 apply_custom_theme()
 page_title("Matchs & Prévisions IA", "📊")
@@ -24,8 +25,8 @@ Cette page montre **tous les matchs à venir** avec :
 
 @st.cache_data
 def load_predictions():
-    if UPCOMING.exists():
-        df = pd.read_csv(UPCOMING)
+    if dataset_exists(UPCOMING):
+        df = read_dataset(UPCOMING)
         df["Date"] = pd.to_datetime(df["Date"], errors="coerce")
         return df.sort_values("Date")
     else:
@@ -2,6 +2,8 @@ import streamlit as st
 import pandas as pd
 from pathlib import Path
 from src.ui_theme import apply_custom_theme, page_title
+from src.storage import dataset_exists, read_dataset
+from src.match_db import open_db
 
 apply_custom_theme()
 page_title("Analyse du match", "📊")
@@ -15,10 +17,11 @@ st.title("🧠 Analyse détaillée du Match")
 
 @st.cache_data
 def load_data():
-    if UPCOMING.exists():
-        df = pd.read_csv(UPCOMING)
+    if dataset_exists(UPCOMING):
+        df = read_dataset(UPCOMING)
         df["Date"] = pd.to_datetime(df["Date"], errors="coerce")
-        df["match"] = df["HomeTeam"] + " vs " + df["AwayTeam"]
+        # Équipes catégorielles (utils.loader) : concaténation sur des chaînes
+        df["match"] = df["HomeTeam"].astype(str) + " vs " + df["AwayTeam"].astype(str)
         return df
     return pd.DataFrame()
 
@@ -60,3 +63,22 @@ if "odds_home_mean" in row and not pd.isna(row["odds_home_mean"]):
 
 else:
     st.info("⚠️ Aucune cote disponible pour ce match. Je ne peux afficher que les probabilités IA.")
+
+# Forme récente : base SQLite optionnelle (python -m src.match_db import)
+db = open_db()
+if db is not None:
+    st.subheader("📅 Derniers matchs")
+
+    cols = st.columns(2)
+    for col, team in zip(cols, [row["HomeTeam"], row["AwayTeam"]]):
+        elo = db.elo_as_of(team, row["Date"])
+        col.markdown(f"**{team}**" + (f"  •  Elo {elo:.0f}" if elo is not None else ""))
+
+        last = db.last_matches(team, row["Date"], 5)
+        if last.empty:
+            col.caption("Aucun match dans l'historique.")
+        else:
+            col.dataframe(
+                last[["Date", "HomeTeam", "HomeGoals", "AwayGoals", "AwayTeam"]],
+                use_container_width=True, hide_index=True,
+            )
@@ -2,6 +2,7 @@ import streamlit as st
 import pandas as pd
 from pathlib import Path
 from src.ui_theme import apply_custom_theme, page_title
+from src.storage import dataset_exists, read_dataset
 
 apply_custom_theme()
 page_title("Value bets", "📊")
@@ -15,8 +16,8 @@ st.title("💰 Value Bets – IA PRO")
 
 @st.cache_data
 def load_bets():
-    if BETS.exists():
-        df = pd.read_csv(BETS)
+    if dataset_exists(BETS):
+        df = read_dataset(BETS)
         df["Date"] = pd.to_datetime(df["Date"])
         return df.sort_values("Date")
     return pd.DataFrame()
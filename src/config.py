@@ -30,6 +30,8 @@ DATA = ROOT / "data"
 RAW = DATA / "raw"
 PROCESSED = DATA / "processed"
 HISTORY = RAW / "history"
+# Historique partitionné par ligue / saison (src/history_store.py)
+HISTORY_STORE = HISTORY / "store"
 MODELS = ROOT / "models"
 
 # Créer auto les dossiers s'ils n'existent pas
@@ -52,6 +54,18 @@ UPCOMING_FEATURES = PROCESSED / "predictions_upcoming_features.csv"
 UPCOMING_PRED = PROCESSED / "predictions_upcoming.csv"
 VALUE_BETS = PROCESSED / "bets_recommendations.csv"
 
+# Checkpoint de l'état par équipe (rebuild incrémental des features)
+FEATURES_STATE = PROCESSED / "features_state.pkl"
+
+# Ratings Elo courants (mis à jour incrémentalement depuis results_api.csv)
+ELO_STATE = PROCESSED / "elo_state.pkl"
+
+# Dernier état par équipe (forme, totaux de saison) écrit au rebuild des features
+TEAM_SNAPSHOT = PROCESSED / "team_snapshot.csv"
+
+# Matrice d'entraînement X float32 / y int8 (memmap, src/model/feature_matrix.py)
+FEATURE_MATRIX = PROCESSED / "feature_matrix"
+
 # -----------------------------------------
 # 🧠 MODELS
 # -----------------------------------------
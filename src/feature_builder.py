@@ -1,7 +1,14 @@
+import os
 import pandas as pd
 import numpy as np
 from pathlib import Path
 
+from src.features.indexes import EloTimeline, TeamMatchIndex
+from src.features.snapshot_cache import get_snapshot
+from src.features.team_table import SeasonTable, TeamTable
+from src.match_db import MATCH_DB, open_db
+from utils.loader import load_dataset
+
 # ============================================================
 # PATHS & RAW DATA
 # ============================================================
@@ -10,15 +17,43 @@ ROOT = Path(__file__).resolve().parents[1]
 RAW = ROOT / "data" / "raw"
 PROCESSED = ROOT / "data" / "processed"
 
-# Lineups (optionnel – pour plus tard)
+# Lineups (optionnel – pour plus tard) : lus au premier accès, pas à l'import
 LINEUPS_PATH = RAW / "lineups_api.csv"
-df_lineups = pd.read_csv(LINEUPS_PATH) if LINEUPS_PATH.exists() else None
+_LINEUPS = {}
+
+# build_features(workers > 1) : en dessous, le coût fixe du pool
+# (~0.5 s : process, shared_memory, recollage) l'emporte → calcul série.
+# Mesuré (1 CPU) : 1 000 matchs 5.48 s série / 5.88 s parallèle,
+# 2 000 : 11.43 s / 11.44 s (point d'équilibre), 4 000 : 23.71 s / 22.85 s.
+PARALLEL_MIN_ROWS = 2000
+
+
+def get_lineups():
+    """lineups_api.csv (None si absent), chargé une seule fois."""
+    if "df" not in _LINEUPS:
+        _LINEUPS["df"] = load_dataset(LINEUPS_PATH, schema="lineups") if LINEUPS_PATH.exists() else None
+    return _LINEUPS["df"]
+
+
+def __getattr__(name):
+    # Compatibilité : `feature_builder.df_lineups` reste accessible (chargement paresseux)
+    if name == "df_lineups":
+        return get_lineups()
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
 
 
 # ============================================================
 # HELPERS
 # ============================================================
 
+def _match_db():
+    """Base SQLite (src/match_db.py) pour les helpers appelés avec df=None."""
+    db = open_db()
+    if db is None:
+        raise FileNotFoundError(f"Match DB not found → {MATCH_DB} (python -m src.match_db import)")
+    return db
+
+
 def normalize_team(x):
     return x.lower().strip() if isinstance(x, str) else x
 
@@ -49,50 +84,31 @@ def compute_market_probabilities(odds_H, odds_D, odds_A):
 # ============================================================
 
 def get_last_matches(df, team, date, n=10):
-    tmp = df[
-        ((df["HomeTeam"] == team) | (df["AwayTeam"] == team))
-        & (df["Date"] < date)
-    ].sort_values("Date", ascending=False).head(n)
-    return tmp
+    if df is None:
+        # Sans historique chargé : base SQLite indexée (team, date), si présente
+        return _match_db().last_matches(team, date, n)
+    positions = TeamMatchIndex.of(df).positions_before(team, date, n)
+    return df.iloc[positions]
 
 
 def compute_form(df, team, date):
-    last10 = get_last_matches(df, team, date, 10).copy()
-    last5 = last10.head(5).copy()
+    table = TeamTable.of(df)
+    i = table.row_before(team, date)
 
-    if last10.empty:
+    if i < 0:
         return dict(
             gf5=0.0, ga5=0.0, pts5=1.0,
             gf10=0.0, ga10=0.0, pts10=1.0
         )
 
-    def gf(row):
-        return row["HomeGoals"] if row["HomeTeam"] == team else row["AwayGoals"]
-
-    def ga(row):
-        return row["AwayGoals"] if row["HomeTeam"] == team else row["HomeGoals"]
-
-    last5["gf"] = last5.apply(gf, axis=1)
-    last5["ga"] = last5.apply(ga, axis=1)
-    last10["gf"] = last10.apply(gf, axis=1)
-    last10["ga"] = last10.apply(ga, axis=1)
-
-    pts5 = last5.apply(
-        lambda r: 3 if r["gf"] > r["ga"] else (1 if r["gf"] == r["ga"] else 0),
-        axis=1
-    ).mean()
-    pts10 = last10.apply(
-        lambda r: 3 if r["gf"] > r["ga"] else (1 if r["gf"] == r["ga"] else 0),
-        axis=1
-    ).mean()
-
+    st = table.stats
     return dict(
-        gf5=last5["gf"].mean(),
-        ga5=last5["ga"].mean(),
-        pts5=pts5,
-        gf10=last10["gf"].mean(),
-        ga10=last10["ga"].mean(),
-        pts10=pts10,
+        gf5=st["gf_last_5"][i],
+        ga5=st["ga_last_5"][i],
+        pts5=st["points_last_5"][i],
+        gf10=st["gf_last_10"][i],
+        ga10=st["ga_last_10"][i],
+        pts10=st["points_last_10"][i],
     )
 
 
@@ -101,11 +117,14 @@ def compute_form(df, team, date):
 # ============================================================
 
 def get_elo(df, team, date):
-    past = get_last_matches(df, team, date, 1)
-    if past.empty:
-        return 1500.0
-    row = past.iloc[0]
-    return float(row["elo_home"] if row["HomeTeam"] == team else row["elo_away"])
+    if df is None:
+        return _match_db().elo_as_of(team, date, default=1500.0)
+    return EloTimeline.of(df).rating(team, date)
+
+
+def get_elo_many(df, teams, dates):
+    """Elo as-of pour un lot de paires (équipe, date) en un seul appel."""
+    return EloTimeline.of(df).lookup(teams, dates)
 
 
 # ============================================================
@@ -120,28 +139,16 @@ def seasonal_stats(df, team, date):
     y = date.year
     season = get_season(y, date.month)
 
-    tmp = df[
-        ((df["HomeTeam"] == team) | (df["AwayTeam"] == team))
-        & (df["Season"] == season)
-        & (df["Date"] < date)
-    ].copy()
-
-    if tmp.empty:
+    # Totaux (équipe, saison) as-of : recherche dichotomique, pas de filtre
+    st = SeasonTable.of(df).as_of(team, date, season)
+    if st["played"] == 0:
         return dict(winrate=0.33, gf=1.2, ga=1.2)
 
-    def gf(row):
-        return row["HomeGoals"] if row["HomeTeam"] == team else row["AwayGoals"]
-
-    def ga(row):
-        return row["AwayGoals"] if row["HomeTeam"] == team else row["HomeGoals"]
-
-    tmp["gf"] = tmp.apply(gf, axis=1)
-    tmp["ga"] = tmp.apply(ga, axis=1)
-
+    played = st["played"]
     return dict(
-        winrate=(tmp["gf"] > tmp["ga"]).mean(),
-        gf=tmp["gf"].mean(),
-        ga=tmp["ga"].mean(),
+        winrate=st["win"] / played,
+        gf=st["gf"] / played,
+        ga=st["ga"] / played,
     )
 
 
@@ -153,26 +160,19 @@ def lineup_strength(team: str, date):
     """
     Estimation simple de la force de la compo:
     - basé sur forme récente + buts + Elo
-    - s’appuie sur le dataset processed historique
+    - s’appuie sur le dataset processed historique (snapshot en cache,
+      relu seulement si le fichier change)
     """
     base = 70.0  # neutre
 
     try:
-        df_hist = pd.read_csv(
-            PROCESSED / "all_matches_features.csv",
-            parse_dates=["Date"],
-            low_memory=False
-        )
-
-        df_team = df_hist[
-            ((df_hist["HomeTeam"] == team) | (df_hist["AwayTeam"] == team))
-            & (df_hist["Date"] < pd.to_datetime(date))
-        ].sort_values("Date", ascending=False).head(1)
-
-        if df_team.empty:
+        snap = get_snapshot(PROCESSED / "all_matches_features.csv")
+        if snap is None:
             return base
 
-        last = df_team.iloc[0]
+        last = snap.latest_before(team, date)
+        if last is None:
+            return base
 
         if last["HomeTeam"] == team:
             atk = last.get("home_gf_avg_last_5", 1.2)
@@ -209,7 +209,7 @@ def sos(df, team, date):
     opps = last_opponents(df, team, date, 5)
     if len(opps) == 0:
         return 1500.0
-    return float(np.mean([get_elo(df, o, date) for o in opps]))
+    return float(np.mean(get_elo_many(df, opps, date)))
 
 
 # ============================================================
@@ -221,27 +221,23 @@ def vs_group(df, team, date, group="top"):
     if past.empty:
         return 0.33
 
-    wins = 0
-    total = 0
+    is_home = (past["HomeTeam"] == team).to_numpy()
+    opps = np.where(is_home, past["AwayTeam"], past["HomeTeam"])
+    gf = np.where(is_home, past["HomeGoals"], past["AwayGoals"])
+    ga = np.where(is_home, past["AwayGoals"], past["HomeGoals"])
 
-    for _, r in past.iterrows():
-        if r["HomeTeam"] == team:
-            opp = r["AwayTeam"]
-            gf = r["HomeGoals"]
-            ga = r["AwayGoals"]
-        else:
-            opp = r["HomeTeam"]
-            gf = r["AwayGoals"]
-            ga = r["HomeGoals"]
+    # Elo de chaque adversaire à la date du match, en un seul lookup
+    opp_elo = get_elo_many(df, opps, past["Date"])
 
-        opp_elo = get_elo(df, opp, r["Date"])
+    if group == "top":
+        mask = opp_elo >= 1650
+    elif group == "bottom":
+        mask = opp_elo <= 1400
+    else:
+        mask = np.zeros(len(past), dtype=bool)
 
-        if group == "top" and opp_elo >= 1650:
-            wins += (gf > ga)
-            total += 1
-        elif group == "bottom" and opp_elo <= 1400:
-            wins += (gf > ga)
-            total += 1
+    wins = int((gf[mask] > ga[mask]).sum())
+    total = int(mask.sum())
 
     return wins / total if total > 0 else 0.33
 
@@ -320,17 +316,12 @@ def home_adv(df, team, date):
 # ============================================================
 
 def xg_proxy(df, team, date):
-    last10 = get_last_matches(df, team, date, 10)
-    if last10.empty:
+    table = TeamTable.of(df)
+    i = table.row_before(team, date)
+    if i < 0:
         return 1.3
-    avg_gf = last10.apply(
-        lambda r: r["HomeGoals"] if r["HomeTeam"] == team else r["AwayGoals"],
-        axis=1
-    ).mean()
-    avg_ga = last10.apply(
-        lambda r: r["AwayGoals"] if r["HomeTeam"] == team else r["HomeGoals"],
-        axis=1
-    ).mean()
+    avg_gf = table.stats["gf_last_10"][i]
+    avg_ga = table.stats["ga_last_10"][i]
     return avg_gf * 0.7 + avg_ga * 0.3
 
 
@@ -338,92 +329,132 @@ def xg_proxy(df, team, date):
 # MASTER BUILDER FUNCTION
 # ============================================================
 
-def build_features(df):
+def team_features(df, team, date):
+    """
+    Toutes les features d'un côté (équipe) pour un match à `date`,
+    calculées sur l'historique strictement antérieur.
+    """
+    return dict(
+        elo=get_elo(df, team, date),
+        form=compute_form(df, team, date),
+        season=seasonal_stats(df, team, date),
+        lineup=lineup_strength(team, date),
+        sos=sos(df, team, date),
+        vs_top=vs_group(df, team, date, "top"),
+        vs_bottom=vs_group(df, team, date, "bottom"),
+        momentum=momentum(df, team, date),
+        home_adv=home_adv(df, team, date),
+        xg=xg_proxy(df, team, date),
+    )
+
+
+def feature_row(home, away, date, h, a):
+    """Assemble la ligne de features d'un match à partir des deux côtés."""
+    fH, fA = h["form"], a["form"]
+    sH, sA = h["season"], a["season"]
+
+    return {
+        "HomeTeam": home,
+        "AwayTeam": away,
+        "Date": date,
+
+        # Elo
+        "elo_home": h["elo"],
+        "elo_away": a["elo"],
+
+        # form home
+        "home_gf5": fH["gf5"],
+        "home_ga5": fH["ga5"],
+        "home_pts5": fH["pts5"],
+        "home_gf10": fH["gf10"],
+        "home_ga10": fH["ga10"],
+        "home_pts10": fH["pts10"],
+
+        # form away
+        "away_gf5": fA["gf5"],
+        "away_ga5": fA["ga5"],
+        "away_pts5": fA["pts5"],
+        "away_gf10": fA["gf10"],
+        "away_ga10": fA["ga10"],
+        "away_pts10": fA["pts10"],
+
+        # seasonal
+        "home_winrate_season": sH["winrate"],
+        "home_goals_for_avg_season": sH["gf"],
+        "home_goals_against_avg_season": sH["ga"],
+        "away_winrate_season": sA["winrate"],
+        "away_goals_for_avg_season": sA["gf"],
+        "away_goals_against_avg_season": sA["ga"],
+
+        # h2h (remplis plus tard si besoin)
+        "h2h_home_adv": 0.0,
+        "h2h_away_adv": 0.0,
+
+        # lineup strength
+        "lineup_strength_home": h["lineup"],
+        "lineup_strength_away": a["lineup"],
+
+        # strength of schedule
+        "sos_home_last5": h["sos"],
+        "sos_away_last5": a["sos"],
+
+        # vs top / bottom
+        "home_vs_top6": h["vs_top"],
+        "home_vs_bottom6": h["vs_bottom"],
+        "away_vs_top6": a["vs_top"],
+        "away_vs_bottom6": a["vs_bottom"],
+
+        # momentum
+        "momentum_home": h["momentum"],
+        "momentum_away": a["momentum"],
+
+        # home advantage
+        "home_advantage": h["home_adv"],
+
+        # xG proxies
+        "xg_home": h["xg"],
+        "xg_away": a["xg"],
+    }
+
+
+def build_features(df, workers=None, shard_by="team"):
     """
     df doit contenir au minimum :
     - Date (datetime)
     - HomeTeam, AwayTeam
     - HomeGoals, AwayGoals
     - elo_home, elo_away (si déjà calculés, sinon tu peux les ajouter ensuite)
+
+    workers > 1 : calcul sur un pool de process, découpé par équipe
+    (shard_by="team") ou par ligue (shard_by="league") ; série en
+    dessous de PARALLEL_MIN_ROWS matchs ou sur une machine à 1 CPU.
+
+    Pour un rebuild complet en O(n), voir
+    src.features.rolling_state.build_features_streaming.
     """
+    if workers is not None and workers != 1:
+        from src.features.parallel import _resolve_workers, build_features_parallel
+        if len(df) < PARALLEL_MIN_ROWS or min(_resolve_workers(workers), os.cpu_count() or 1) < 2:
+            print(f"ℹ️ build_features : {len(df)} matchs / {os.cpu_count()} CPU → calcul série.")
+        else:
+            return build_features_parallel(df, workers=workers, shard_by=shard_by)
+
     all_feat = []
 
+    # Index équipe -> matchs et table long format construits une fois,
+    # réutilisés par tous les helpers
+    TeamMatchIndex.of(df)
+    TeamTable.of(df)
+    SeasonTable.of(df)
+
     for _, r in df.iterrows():
         home = r["HomeTeam"]
         away = r["AwayTeam"]
         date = r["Date"]
 
-        # form
-        fH = compute_form(df, home, date)
-        fA = compute_form(df, away, date)
+        h = team_features(df, home, date)
+        a = team_features(df, away, date)
 
-        # seasonal
-        sH = seasonal_stats(df, home, date)
-        sA = seasonal_stats(df, away, date)
-
-        row = {
-            "HomeTeam": home,
-            "AwayTeam": away,
-            "Date": date,
-
-            # Elo
-            "elo_home": get_elo(df, home, date),
-            "elo_away": get_elo(df, away, date),
-
-            # form home
-            "home_gf5": fH["gf5"],
-            "home_ga5": fH["ga5"],
-            "home_pts5": fH["pts5"],
-            "home_gf10": fH["gf10"],
-            "home_ga10": fH["ga10"],
-            "home_pts10": fH["pts10"],
-
-            # form away
-            "away_gf5": fA["gf5"],
-            "away_ga5": fA["ga5"],
-            "away_pts5": fA["pts5"],
-            "away_gf10": fA["gf10"],
-            "away_ga10": fA["ga10"],
-            "away_pts10": fA["pts10"],
-
-            # seasonal
-            "home_winrate_season": sH["winrate"],
-            "home_goals_for_avg_season": sH["gf"],
-            "home_goals_against_avg_season": sH["ga"],
-            "away_winrate_season": sA["winrate"],
-            "away_goals_for_avg_season": sA["gf"],
-            "away_goals_against_avg_season": sA["ga"],
-
-            # h2h (remplis plus tard si besoin)
-            "h2h_home_adv": 0.0,
-            "h2h_away_adv": 0.0,
-
-            # lineup strength
-            "lineup_strength_home": lineup_strength(home, date),
-            "lineup_strength_away": lineup_strength(away, date),
-
-            # strength of schedule
-            "sos_home_last5": sos(df, home, date),
-            "sos_away_last5": sos(df, away, date),
-
-            # vs top / bottom
-            "home_vs_top6": vs_group(df, home, date, "top"),
-            "home_vs_bottom6": vs_group(df, home, date, "bottom"),
-            "away_vs_top6": vs_group(df, away, date, "top"),
-            "away_vs_bottom6": vs_group(df, away, date, "bottom"),
-
-            # momentum
-            "momentum_home": momentum(df, home, date),
-            "momentum_away": momentum(df, away, date),
-
-            # home advantage
-            "home_advantage": home_adv(df, home, date),
-
-            # xG proxies
-            "xg_home": xg_proxy(df, home, date),
-            "xg_away": xg_proxy(df, away, date),
-        }
-
-        all_feat.append(row)
+        all_feat.append(feature_row(home, away, date, h, a))
 
     return pd.DataFrame(all_feat)
@@ -0,0 +1,182 @@
+# ============================================================
+# AS-OF JOIN ENGINE – UPCOMING FIXTURES (APUESDATA)
+# ============================================================
+#
+# Au lieu de scanner l'historique fixture par fixture :
+# 1) team_state_table : une ligne par (équipe, match) avec l'état
+#    POST-match (forme 5/10, totaux de saison, Elo) — calculée
+#    une fois, en sommes cumulées vectorisées
+# 2) asof_attach : tout le lot de fixtures est joint en une passe
+#    (pd.merge_asof by=team, strictement avant la date du match)
+#    → état de chaque équipe juste avant la fixture.
+# 3) team_snapshot / snapshot_attach : dernier état de chaque équipe
+#    (artefact écrit au rebuild) → lookup par clé, coût indépendant
+#    de la taille de l'historique.
+# ============================================================
+
+import numpy as np
+import pandas as pd
+
+from src.features.indexes import _to_datetime64
+from utils.standardize_features import normalize_team_name
+from src.features.team_table import (
+    STATS,
+    cumulative_totals,
+    rolling_means,
+    season_labels,
+    team_perspective,
+)
+
+STATE_WINDOWS = (5, 10)
+
+
+def team_keys(values):
+    """
+    Clé d'équipe des jointures (as-of et snapshot) : nom normalisé
+    (normalize_team_name), None si manquant. Une normalisation par nom
+    distinct, pas par ligne.
+    """
+    codes, uniques = pd.factorize(pd.Series(values, dtype=object))
+    keys = np.array([normalize_team_name(t) for t in uniques] + [None], dtype=object)
+    return keys[codes]
+
+
+def team_state_table(history, windows=STATE_WINDOWS, stats=STATS):
+    """
+    État post-match de chaque équipe après chacun de ses matchs, trié par Date.
+    Colonnes : team, Date, last_date, season, elo, {stat}_last_{n},
+               n_last_{n}, season_{stat}_sum, season_played.
+    Les saisons sont dérivées des dates (même règle que pour les fixtures).
+    Équipes identifiées par team_keys (comme les fixtures).
+    """
+    history = history.drop(columns=["Season"], errors="ignore").assign(
+        HomeTeam=team_keys(history["HomeTeam"]),
+        AwayTeam=team_keys(history["AwayTeam"]),
+    )
+    long = team_perspective(history)
+
+    roll = rolling_means(long, windows=windows, stats=stats, closed="both")
+    tot = cumulative_totals(long, by=("team", "season"), stats=stats, closed="both")
+
+    states = pd.concat(
+        [long[["team", "Date", "season", "elo"]], roll, tot.add_prefix("season_")],
+        axis=1,
+    )
+    states.insert(2, "last_date", states["Date"])
+    return states.sort_values("Date", kind="stable").reset_index(drop=True)
+
+
+def asof_attach(fixtures, states):
+    """
+    État de l'équipe home et away de chaque fixture (clé = team_keys,
+    comme snapshot_attach), as-of strictement avant sa date. Retourne (home, away) indexés 0..len(fixtures)-1
+    (last_date NaT si l'équipe n'a aucun match antérieur). Les totaux de saison
+    sont remis à 0 si le dernier match connu est d'une autre saison.
+    """
+    n = len(fixtures)
+    dates = _to_datetime64(fixtures["Date"])
+    fixture_season = season_labels(dates)
+
+    left = pd.DataFrame({
+        "row": np.concatenate([np.arange(n), np.arange(n)]),
+        "is_home": np.repeat([True, False], n),
+        "team": np.concatenate([team_keys(fixtures["HomeTeam"]), team_keys(fixtures["AwayTeam"])]),
+        "Date": np.concatenate([dates, dates]),
+        "fixture_season": np.concatenate([fixture_season, fixture_season]),
+    })
+    left = left[left["team"].notna() & left["Date"].notna()]
+    left = left.sort_values("Date", kind="stable")
+
+    merged = pd.merge_asof(
+        left, states,
+        on="Date", by="team",
+        direction="backward", allow_exact_matches=False,
+    )
+
+    other_season = merged["season"].notna() & (merged["season"] != merged["fixture_season"])
+    season_cols = [c for c in merged.columns if c.startswith("season_")]
+    merged.loc[other_season, season_cols] = 0
+
+    full = pd.RangeIndex(n)
+    is_home = merged["is_home"].to_numpy()
+    home = merged[is_home].set_index("row").reindex(full)
+    away = merged[~is_home].set_index("row").reindex(full)
+    return home, away
+
+
+# ============================================================
+# SNAPSHOT PAR ÉQUIPE (lookup par clé)
+# ============================================================
+
+def _played(history):
+    return (
+        history["Date"].notna()
+        & pd.to_numeric(history["HomeGoals"], errors="coerce").notna()
+        & pd.to_numeric(history["AwayGoals"], errors="coerce").notna()
+    ).to_numpy()
+
+
+def team_snapshot(history, windows=STATE_WINDOWS, stats=STATS):
+    """
+    Dernier état post-match de chaque équipe (une ligne par équipe, colonnes
+    de team_state_table), sur les matchs joués uniquement.
+    """
+    states = team_state_table(history[_played(history)], windows=windows, stats=stats)
+    return states.drop_duplicates("team", keep="last").sort_values("team").reset_index(drop=True)
+
+
+def snapshot_tail(history, windows=STATE_WINDOWS):
+    """
+    Matchs joués de history suffisants pour team_snapshot : pour chaque
+    équipe, ses max(windows) derniers matchs et ceux de sa dernière saison.
+    Sert de tampon borné quand l'historique est lu par blocs.
+    """
+    played = history[_played(history)]
+    long = team_perspective(played.drop(columns=["Season"], errors="ignore"))
+
+    by_team = long.groupby("team_code", sort=False)
+    recent = by_team.cumcount(ascending=False) < max(windows)
+    current = long["season"] == by_team["season"].transform("last")
+
+    rows = np.unique(long.loc[recent | current, "match"].to_numpy())
+    return played.iloc[rows]
+
+
+def snapshot_attach(fixtures, snapshot):
+    """
+    État home / away de chaque fixture lu dans le snapshot (clé = nom
+    d'équipe normalisé). Même format que asof_attach ; une équipe inconnue,
+    ou dont le dernier match n'est pas strictement antérieur à la
+    fixture, est laissée vide (last_date NaT).
+    """
+    n = len(fixtures)
+    dates = _to_datetime64(fixtures["Date"])
+    fixture_season = season_labels(dates)
+    by_team = snapshot.set_index("team")
+
+    sides = []
+    for col in ("HomeTeam", "AwayTeam"):
+        side = by_team.reindex(team_keys(fixtures[col])).reset_index()
+        side.index = pd.RangeIndex(n)
+
+        last = _to_datetime64(side["last_date"])
+        stale = ~np.isnat(last) & ~(last < dates)
+        side.loc[stale, side.columns[1:]] = np.nan
+        side["last_date"] = side["last_date"].where(~stale)
+
+        other_season = side["season"].notna().to_numpy() & (side["season"].to_numpy() != fixture_season)
+        season_cols = [c for c in side.columns if c.startswith("season_")]
+        side.loc[other_season, season_cols] = 0
+        sides.append(side)
+    return tuple(sides)
+
+
+def snapshot_covers(fixtures, snapshot):
+    """True si chaque fixture est postérieure au dernier match connu de ses équipes."""
+    last = snapshot.set_index("team")["last_date"]
+    dates = _to_datetime64(fixtures["Date"])
+    for col in ("HomeTeam", "AwayTeam"):
+        seen = _to_datetime64(last.reindex(team_keys(fixtures[col])))
+        if (~np.isnat(seen) & ~(seen < dates)).any():
+            return False
+    return True
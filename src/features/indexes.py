@@ -0,0 +1,199 @@
+# ============================================================
+# INDEXES PAR ÉQUIPE – APUESDATA
+# ============================================================
+#
+# Structures construites UNE fois par DataFrame d'historique et
+# partagées par les helpers de src/feature_builder.py :
+# - TeamMatchIndex : équipe -> positions de ses matchs triées par date
+# - EloTimeline    : équipe -> (dates, Elo) pour des lookups as-of
+# ============================================================
+
+import weakref
+
+import numpy as np
+import pandas as pd
+
+
+def _to_datetime64(values):
+    """Convertit une colonne / un scalaire de dates en datetime64[ns] naïf."""
+    if not pd.api.types.is_list_like(values):
+        ts = pd.Timestamp(values)
+        if ts is pd.NaT:
+            return np.datetime64("NaT", "ns")
+        if ts.tzinfo is not None:
+            ts = ts.tz_convert(None)
+        return ts.to_datetime64().astype("datetime64[ns]")
+
+    s = pd.to_datetime(pd.Series(values), errors="coerce")
+    if s.dt.tz is not None:
+        s = s.dt.tz_convert(None)
+    return s.to_numpy(dtype="datetime64[ns]")
+
+
+class TeamMatchIndex:
+    """
+    Index construit une seule fois par DataFrame :
+    équipe -> positions (iloc) de ses matchs, triées par date.
+
+    "N derniers matchs de T avant D" devient une bisection
+    (np.searchsorted) sur les dates de T + une slice, au lieu
+    d'un scan booléen complet + tri à chaque appel.
+    """
+
+    def __init__(self, df):
+        n = len(df)
+        dates = _to_datetime64(df["Date"])
+
+        teams = np.concatenate([
+            df["HomeTeam"].to_numpy(dtype=object),
+            df["AwayTeam"].to_numpy(dtype=object),
+        ])
+        positions = np.concatenate([np.arange(n), np.arange(n)])
+        all_dates = np.concatenate([dates, dates])
+
+        valid = ~np.isnat(all_dates) & pd.notna(teams)
+        teams, positions, all_dates = teams[valid], positions[valid], all_dates[valid]
+
+        codes, uniques = pd.factorize(teams)
+        order = np.lexsort((positions, all_dates, codes))
+        codes = codes[order]
+        positions = positions[order]
+        all_dates = all_dates[order]
+
+        bounds = np.searchsorted(codes, np.arange(len(uniques) + 1))
+
+        self.n_rows = n
+        self._positions = {}
+        self._dates = {}
+        for i, team in enumerate(uniques):
+            lo, hi = bounds[i], bounds[i + 1]
+            self._positions[team] = positions[lo:hi]
+            self._dates[team] = all_dates[lo:hi]
+
+    @property
+    def teams(self):
+        return list(self._positions)
+
+    def positions_before(self, team, date, n=None):
+        """
+        Positions des n derniers matchs de `team` strictement avant `date`,
+        du plus récent au plus ancien (n=None → tous).
+        """
+        dates = self._dates.get(team)
+        if dates is None:
+            return np.empty(0, dtype=np.int64)
+
+        d = _to_datetime64(date)
+        if np.isnat(d):
+            return np.empty(0, dtype=np.int64)
+
+        end = int(np.searchsorted(dates, d, side="left"))
+        start = 0 if n is None else max(0, end - n)
+        return self._positions[team][start:end][::-1]
+
+    @classmethod
+    def of(cls, df):
+        """Index mis en cache pour ce DataFrame (construit au premier appel)."""
+        return _cached_for_frame(df, cls)
+
+
+# Cache (id(df), classe) -> (weakref(df), objet) ; suppose que le
+# DataFrame n'est pas modifié en place après construction.
+_FRAME_CACHE = {}
+
+
+def _cached_for_frame(df, cls):
+    key = (id(df), cls)
+    cached = _FRAME_CACHE.get(key)
+    if cached is not None:
+        ref, obj = cached
+        if ref() is df and obj.n_rows == len(df):
+            return obj
+
+    obj = cls(df)
+    _FRAME_CACHE[key] = (weakref.ref(df, lambda _: _FRAME_CACHE.pop(key, None)), obj)
+    return obj
+
+
+# ============================================================
+# ELO TIMELINE
+# ============================================================
+
+class EloTimeline:
+    """
+    Timeline Elo par équipe, construite une fois depuis elo_home / elo_away :
+    tableaux NumPy parallèles (équipe, date, rating) triés par (équipe, date).
+
+    Lookup "as-of" : Elo de la ligne du dernier match de l'équipe
+    strictement avant la date (1500 si aucun), via np.searchsorted.
+    """
+
+    def __init__(self, df):
+        n = len(df)
+        dates = _to_datetime64(df["Date"])
+
+        teams = np.concatenate([
+            df["HomeTeam"].to_numpy(dtype=object),
+            df["AwayTeam"].to_numpy(dtype=object),
+        ])
+        ratings = np.concatenate([
+            df["elo_home"].to_numpy(dtype=float),
+            df["elo_away"].to_numpy(dtype=float),
+        ])
+        positions = np.concatenate([np.arange(n), np.arange(n)])
+        all_dates = np.concatenate([dates, dates])
+
+        valid = ~np.isnat(all_dates) & pd.notna(teams)
+        teams, ratings = teams[valid], ratings[valid]
+        positions, all_dates = positions[valid], all_dates[valid]
+
+        codes, uniques = pd.factorize(teams)
+        order = np.lexsort((positions, all_dates, codes))
+
+        self.n_rows = n
+        self.codes = codes[order]
+        self.dates = all_dates[order]
+        self.ratings = ratings[order]
+        self.team_codes = {t: i for i, t in enumerate(uniques)}
+
+        # Dates distinctes -> rangs : clé composite (équipe, rang) en int64
+        self._unique_dates = np.unique(self.dates)
+        self._stride = len(self._unique_dates) + 1
+        self._keys = (
+            self.codes.astype(np.int64) * self._stride
+            + np.searchsorted(self._unique_dates, self.dates)
+        )
+
+    @classmethod
+    def of(cls, df):
+        """Timeline mise en cache pour ce DataFrame."""
+        return _cached_for_frame(df, cls)
+
+    def lookup(self, teams, dates, default=1500.0):
+        """
+        Elo as-of vectorisé pour des paires (équipe, date).
+        `dates` peut être un scalaire (même date pour toutes les équipes).
+        """
+        teams = np.asarray(teams, dtype=object)
+        if not pd.api.types.is_list_like(dates):
+            dates = np.full(len(teams), _to_datetime64(dates))
+        else:
+            dates = _to_datetime64(dates)
+
+        codes = np.array([self.team_codes.get(t, -1) for t in teams], dtype=np.int64)
+        out = np.full(len(teams), default, dtype=float)
+
+        ok = (codes >= 0) & ~np.isnat(dates)
+        if not ok.any():
+            return out
+
+        ranks = np.searchsorted(self._unique_dates, dates[ok], side="left")
+        pos = np.searchsorted(self._keys, codes[ok] * self._stride + ranks, side="left") - 1
+
+        found = (pos >= 0) & (self.codes[np.maximum(pos, 0)] == codes[ok])
+        idx = np.flatnonzero(ok)
+        out[idx[found]] = self.ratings[pos[found]]
+        return out
+
+    def rating(self, team, date, default=1500.0):
+        return float(self.lookup([team], date, default)[0])
@@ -0,0 +1,301 @@
+# ============================================================
+# PARALLEL FEATURE BUILD – APUESDATA
+# ============================================================
+#
+# Mode multi-process pour build_features (feature_builder) et
+# rebuild_all_features (rebuild_features_pro) :
+# - les colonnes de l'historique sont publiées UNE fois dans
+#   multiprocessing.shared_memory (équipes / saisons encodées en int)
+# - chaque worker s'y attache (vues NumPy, pas de pickle du DataFrame)
+#   et ne reconstruit que les lignes de ses tâches (équipes en category)
+# - le calcul est découpé par équipe (ou par ligue) : chaque tâche
+#   produit les blocs "côté équipe" de ses matchs
+# - le process parent recolle home + away en lignes de match.
+# ============================================================
+
+import os
+from multiprocessing import get_context
+from multiprocessing.shared_memory import SharedMemory
+
+import numpy as np
+import pandas as pd
+
+from src.features.indexes import _to_datetime64
+
+LEAGUE_COLS = ("league_id", "Div")
+
+
+# ============================================================
+# SHARED MEMORY
+# ============================================================
+
+def _encode(values):
+    codes, uniques = pd.factorize(pd.Series(values, dtype=object))
+    return codes.astype(np.int32), np.asarray(uniques, dtype=object)
+
+
+class SharedHistory:
+    """
+    Colonnes de l'historique copiées une fois en mémoire partagée.
+    `spec` (picklable, léger) permet aux workers de s'y rattacher.
+    """
+
+    def __init__(self, df):
+        arrays = {
+            "Date": _to_datetime64(df["Date"]).view(np.int64),
+            "HomeGoals": pd.to_numeric(df["HomeGoals"], errors="coerce").to_numpy(dtype=float),
+            "AwayGoals": pd.to_numeric(df["AwayGoals"], errors="coerce").to_numpy(dtype=float),
+        }
+
+        teams = np.concatenate([
+            df["HomeTeam"].to_numpy(dtype=object),
+            df["AwayTeam"].to_numpy(dtype=object),
+        ])
+        team_codes, self.teams = _encode(teams)
+        arrays["HomeTeam"] = team_codes[:len(df)]
+        arrays["AwayTeam"] = team_codes[len(df):]
+
+        labels = {"HomeTeam": self.teams, "AwayTeam": self.teams}
+        for col in ("elo_home", "elo_away"):
+            if col in df.columns:
+                arrays[col] = df[col].to_numpy(dtype=float)
+        if "Season" in df.columns:
+            arrays["Season"], labels["Season"] = _encode(df["Season"])
+
+        self._shms = []
+        self.spec = {"n": len(df), "labels": labels, "columns": {}}
+        for name, arr in arrays.items():
+            arr = np.ascontiguousarray(arr)
+            shm = SharedMemory(create=True, size=max(arr.nbytes, 1))
+            np.ndarray(arr.shape, arr.dtype, buffer=shm.buf)[:] = arr
+            self._shms.append(shm)
+            self.spec["columns"][name] = (shm.name, arr.dtype.str, arr.shape)
+
+    def close(self):
+        for shm in self._shms:
+            shm.close()
+            shm.unlink()
+        self._shms = []
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+# État du worker (rempli par _init_worker)
+_WORKER = {}
+
+
+def _attach(spec):
+    """Vues NumPy sur la mémoire partagée (aucune copie, aucun décodage)."""
+    shms, arrays = [], {}
+    for name, (shm_name, dtype, shape) in spec["columns"].items():
+        shm = SharedMemory(name=shm_name)
+        shms.append(shm)
+        arrays[name] = np.ndarray(shape, np.dtype(dtype), buffer=shm.buf)
+    return shms, arrays
+
+
+def _frame(rows=None):
+    """
+    DataFrame de l'historique partagé, limité aux positions `rows` si
+    données : équipes / saisons en category sur les codes partagés
+    (pas de décodage en chaînes objet).
+    """
+    arrays, labels = _WORKER["arrays"], _WORKER["labels"]
+
+    def col(name):
+        return arrays[name] if rows is None else arrays[name][rows]
+
+    def categorical(name):
+        return pd.Categorical.from_codes(col(name), dtype=pd.CategoricalDtype(labels[name]))
+
+    df = pd.DataFrame({
+        "Date": col("Date").view("datetime64[ns]"),
+        "HomeTeam": categorical("HomeTeam"),
+        "AwayTeam": categorical("AwayTeam"),
+        "HomeGoals": col("HomeGoals"),
+        "AwayGoals": col("AwayGoals"),
+    })
+    for name in ("elo_home", "elo_away"):
+        if name in arrays:
+            df[name] = col(name)
+    if "Season" in arrays:
+        df["Season"] = categorical("Season")
+    return df
+
+
+def _init_worker(spec):
+    shms, arrays = _attach(spec)
+    _WORKER.update(shms=shms, arrays=arrays, labels=spec["labels"], teams=spec["labels"]["HomeTeam"])
+
+
+# ============================================================
+# SHARDING
+# ============================================================
+
+def _team_units(df, shard_by):
+    """
+    Unités de travail (listes de codes équipe, -1 = équipe manquante)
+    et nombre de matchs par code (décalé de 1).
+    shard_by="team" : une unité par équipe
+    shard_by="league" : équipes regroupées par ligue principale
+    """
+    home_codes, teams = _encode(np.concatenate([
+        df["HomeTeam"].to_numpy(dtype=object),
+        df["AwayTeam"].to_numpy(dtype=object),
+    ]))
+    n = len(df)
+    home, away = home_codes[:n], home_codes[n:]
+
+    if shard_by == "league":
+        col = next((c for c in LEAGUE_COLS if c in df.columns), None)
+        if col is None:
+            raise ValueError(f"❌ shard_by='league' nécessite une colonne parmi {LEAGUE_COLS}")
+
+        league = np.concatenate([df[col].to_numpy(dtype=object)] * 2)
+        sides = pd.DataFrame({"team": np.concatenate([home, away]), "league": league})
+        sides = sides[sides["team"] >= 0]
+        main = sides.groupby("team")["league"].agg(lambda s: s.mode().iloc[0] if s.notna().any() else None)
+        units = [list(g.index) for _, g in main.groupby(main.fillna("?"))]
+    elif shard_by == "team":
+        units = [[c] for c in range(len(teams))]
+    else:
+        raise ValueError(f"❌ shard_by inconnu : {shard_by}")
+
+    # Lignes sans équipe : unité à part (features par défaut)
+    both = np.concatenate([home, away])
+    if (both < 0).any():
+        units.append([-1])
+
+    counts = np.bincount(both + 1, minlength=len(teams) + 1)
+    return units, counts
+
+
+def _balanced_tasks(units, counts, n_tasks):
+    """Répartition gloutonne des unités en n_tasks lots de charge proche."""
+    weights = [int(counts[np.asarray(u) + 1].sum()) for u in units]
+    order = np.argsort(weights)[::-1]
+
+    tasks = [[] for _ in range(max(1, min(n_tasks, len(units))))]
+    load = np.zeros(len(tasks))
+    for i in order:
+        k = int(np.argmin(load))
+        tasks[k].extend(units[i])
+        load[k] += weights[i]
+    return [t for t in tasks if t]
+
+
+def _resolve_workers(workers):
+    if workers is None or workers <= 0:
+        return os.cpu_count() or 1
+    return workers
+
+
+# ============================================================
+# build_features (feature_builder) EN PARALLÈLE
+# ============================================================
+
+def _side_features_task(team_codes):
+    from src.feature_builder import team_features
+
+    # Historique complet (Elo / forme des adversaires), construit une fois par worker
+    df = _WORKER.get("df")
+    if df is None:
+        df = _WORKER["df"] = _frame()
+    teams = _WORKER["teams"]
+    home = _WORKER["arrays"]["HomeTeam"]
+    away = _WORKER["arrays"]["AwayTeam"]
+    dates = df["Date"]
+
+    out = []
+    for code in team_codes:
+        team = teams[code] if code >= 0 else None
+        for pos in np.flatnonzero(home == code):
+            out.append((int(pos), True, team_features(df, team, dates.iloc[pos])))
+        for pos in np.flatnonzero(away == code):
+            out.append((int(pos), False, team_features(df, team, dates.iloc[pos])))
+    return out
+
+
+def build_features_parallel(df, workers=None, shard_by="team"):
+    """
+    Même sortie que feature_builder.build_features, calculée sur un pool
+    de process ; l'historique est partagé via shared_memory.
+    """
+    from src.feature_builder import feature_row
+
+    workers = _resolve_workers(workers)
+    units, counts = _team_units(df, shard_by)
+    tasks = _balanced_tasks(units, counts, workers * 4)
+
+    home_blocks = [None] * len(df)
+    away_blocks = [None] * len(df)
+
+    with SharedHistory(df) as shared:
+        ctx = get_context()
+        with ctx.Pool(workers, initializer=_init_worker, initargs=(shared.spec,)) as pool:
+            for block in pool.imap_unordered(_side_features_task, tasks):
+                for pos, is_home, feats in block:
+                    if is_home:
+                        home_blocks[pos] = feats
+                    else:
+                        away_blocks[pos] = feats
+
+    rows = [
+        feature_row(home, away, date, home_blocks[i], away_blocks[i])
+        for i, (home, away, date) in enumerate(zip(df["HomeTeam"], df["AwayTeam"], df["Date"]))
+    ]
+    return pd.DataFrame(rows)
+
+
+# ============================================================
+# rebuild_all_features (rebuild_features_pro) EN PARALLÈLE
+# ============================================================
+
+def _rolling_task(args):
+    from src.features.team_table import team_perspective, rolling_means
+
+    team_codes, windows, stats = args
+    arrays = _WORKER["arrays"]
+
+    # Seules les lignes du lot sont reconstruites
+    wanted = np.asarray(team_codes)
+    rows = np.flatnonzero(np.isin(arrays["HomeTeam"], wanted) | np.isin(arrays["AwayTeam"], wanted))
+
+    long = team_perspective(_frame(rows))
+    mine = np.isin(long["team"].to_numpy(dtype=object), _WORKER["teams"][wanted[wanted >= 0]])
+    roll = rolling_means(long, windows, stats)[mine]
+
+    match = rows[long["match"].to_numpy()[mine]]
+    return match, long["is_home"].to_numpy()[mine], roll
+
+
+def rolling_sides_parallel(df, windows=(5, 10), stats=("gf", "ga", "points"),
+                           workers=None, shard_by="team"):
+    """
+    Équivalent parallèle de team_table.rolling_means + match_sides :
+    retourne (home, away) indexés par position de match.
+    """
+    workers = _resolve_workers(workers)
+    units, counts = _team_units(df, shard_by)
+    units = [[c for c in u if c >= 0] for u in units]
+    tasks = _balanced_tasks([u for u in units if u], counts, workers * 4)
+
+    full = pd.RangeIndex(len(df))
+    parts_home, parts_away = [], []
+
+    with SharedHistory(df) as shared:
+        ctx = get_context()
+        with ctx.Pool(workers, initializer=_init_worker, initargs=(shared.spec,)) as pool:
+            args = [(t, tuple(windows), tuple(stats)) for t in tasks]
+            for match, is_home, roll in pool.imap_unordered(_rolling_task, args):
+                roll = roll.set_axis(match)
+                parts_home.append(roll[is_home])
+                parts_away.append(roll[~is_home])
+
+    home = pd.concat(parts_home).reindex(full) if parts_home else pd.DataFrame(index=full)
+    away = pd.concat(parts_away).reindex(full) if parts_away else pd.DataFrame(index=full)
+    return home, away
@@ -0,0 +1,332 @@
+# ============================================================
+# FEATURE REGISTRY – APUESDATA
+# ============================================================
+#
+# Chaque feature du modèle est déclarée une fois : nom + état
+# intermédiaire dont elle dépend. Le builder part de FEATURE_COLS
+# (models/feature_cols.json), résout les intermédiaires nécessaires
+# et ne calcule que ceux-là, partagés entre features :
+#
+#   ("window", n, stat)  moyenne pré-match de `stat` sur les n
+#                        derniers matchs joués de l'équipe
+#   ("season", stat)     total pré-match sur la saison du match
+#   ("elo",)             Elo pré-match (colonne du match, sinon
+#                        dernier Elo connu as-of, 1500 par défaut)
+#   ("column", name)     colonne brute du match (cotes…)
+#
+# Les mêmes définitions servent au chemin historique (une ligne
+# par match de l'historique, rebuild_features_pro) et au chemin
+# upcoming (fixtures sans score, état de chaque équipe joint as-of
+# — voir asof_join).
+# ============================================================
+
+import numpy as np
+import pandas as pd
+
+from src.features.asof_join import STATE_WINDOWS, asof_attach, snapshot_attach, team_state_table
+from src.features.indexes import EloTimeline, _to_datetime64
+from src.features.team_table import (
+    STATS,
+    cumulative_totals,
+    match_sides,
+    rolling_means,
+    team_perspective,
+)
+
+SIDES = ("home", "away")
+DEFAULT_ELO = 1500.0
+WINDOWS = (5, 10)
+BOOKMAKERS = ("B365", "BW", "IW", "WH", "VC", "PS")
+
+BASE_COLS = ["Date", "HomeTeam", "AwayTeam", "HomeGoals", "AwayGoals", "elo_home", "elo_away"]
+
+
+class Feature:
+    """Une feature : nom, intermédiaires requis, fonction ctx -> array."""
+
+    def __init__(self, name, requires, compute):
+        self.name = name
+        self.requires = tuple(requires)
+        self.compute = compute
+
+    def __repr__(self):
+        return f"Feature({self.name!r}, requires={self.requires})"
+
+
+REGISTRY = {}
+
+
+def register(name, requires, compute):
+    REGISTRY[name] = Feature(name, requires, compute)
+
+
+# ============================================================
+# DÉFINITIONS
+# ============================================================
+
+def _side_value(side, key):
+    return lambda ctx: ctx.side(key, side)
+
+
+def _side_ratio(side, num, den):
+    def compute(ctx):
+        n = ctx.side(num, side)
+        d = ctx.side(den, side)
+        with np.errstate(invalid="ignore", divide="ignore"):
+            return np.where(d > 0, n / np.maximum(d, 1), np.nan)
+    return compute
+
+
+def _column(name):
+    return lambda ctx: ctx.values[("column", name)]
+
+
+WINDOW_STATS = (
+    ("gf", "gf_avg"),
+    ("ga", "ga_avg"),
+    ("points", "points_avg"),
+    ("btts", "btts_rate"),
+    ("over25", "over25_rate"),
+)
+
+SEASON_STATS = (
+    ("win", "winrate_season"),
+    ("draw", "drawrate_season"),
+    ("loss", "lossrate_season"),
+    ("gf", "goals_for_avg_season"),
+    ("ga", "goals_against_avg_season"),
+)
+
+
+def _register_defaults():
+    for side in SIDES:
+        for n in WINDOWS:
+            for stat, label in WINDOW_STATS:
+                key = ("window", n, stat)
+                register(f"{side}_{label}_last_{n}", [key], _side_value(side, key))
+
+        for stat, label in SEASON_STATS:
+            register(
+                f"{side}_{label}",
+                [("season", stat), ("season", "played")],
+                _side_ratio(side, ("season", stat), ("season", "played")),
+            )
+
+    # Noms courts du rebuild historique (rebuild_features_pro : home_gf5…)
+    for side in SIDES:
+        for n in WINDOWS:
+            for stat, label in (("gf", "gf"), ("ga", "ga"), ("points", "pts")):
+                key = ("window", n, stat)
+                register(f"{side}_{label}{n}", [key], _side_value(side, key))
+
+    register("elo_home", [("elo",)], _side_value("home", ("elo",)))
+    register("elo_away", [("elo",)], _side_value("away", ("elo",)))
+    register(
+        "elo_diff", [("elo",)],
+        lambda ctx: ctx.side(("elo",), "home") - ctx.side(("elo",), "away"),
+    )
+
+    for book in BOOKMAKERS:
+        for res in "HDA":
+            register(f"{book}{res}", [("column", f"{book}{res}")], _column(f"{book}{res}"))
+
+
+_register_defaults()
+
+
+# ============================================================
+# RÉSOLUTION + CALCUL DES INTERMÉDIAIRES
+# ============================================================
+
+def resolve(feature_cols):
+    """
+    Features connues (ordre de feature_cols), noms inconnus,
+    et ensemble des intermédiaires à calculer.
+    """
+    features, unknown, keys = [], [], set()
+    for name in feature_cols:
+        feat = REGISTRY.get(name)
+        if feat is None:
+            unknown.append(name)
+            continue
+        features.append(feat)
+        keys.update(feat.requires)
+    return features, unknown, keys
+
+
+class FeatureContext:
+    """
+    Intermédiaires calculés pour les lignes cibles.
+    values[key] = (home, away) pour les stats par équipe,
+                  array pour les colonnes brutes.
+    """
+
+    def __init__(self, values):
+        self.values = values
+
+    def side(self, key, side):
+        home, away = self.values[key]
+        return home if side == "home" else away
+
+
+def _base_frame(df):
+    out = pd.DataFrame({
+        c: df[c].to_numpy() if c in df.columns else np.full(len(df), np.nan)
+        for c in BASE_COLS[1:]
+    })
+    out.insert(0, "Date", _to_datetime64(df["Date"]))
+    return out
+
+
+def _split_keys(keys):
+    windows = {}
+    season_stats = set()
+    for key in keys:
+        if key[0] == "window":
+            windows.setdefault(key[1], set()).add(key[2])
+        elif key[0] == "season" and key[1] != "played":
+            season_stats.add(key[1])
+    needs_season = bool(season_stats) or ("season", "played") in keys
+    return windows, season_stats, needs_season
+
+
+def _column_values(keys, matches, values):
+    for key in keys:
+        if key[0] == "column":
+            col = key[1]
+            values[key] = (
+                pd.to_numeric(matches[col], errors="coerce").to_numpy(dtype=float)
+                if col in matches.columns else np.full(len(matches), np.nan)
+            )
+
+
+def compute_intermediates(keys, matches, history=None, states=None, snapshot=None):
+    """
+    Calcule les intermédiaires `keys` pour chaque ligne de `matches`.
+    Sans `history` / `states` / `snapshot`, chaque ligne voit les lignes
+    précédentes de `matches` (chemin historique). Sinon, l'état de chaque
+    équipe est joint as-of à la date du match (chemin upcoming, voir
+    asof_join), ou lu par clé dans le snapshot par équipe.
+    """
+    if snapshot is not None or states is not None or (history is not None and len(history)):
+        return _asof_intermediates(keys, matches, history, states, snapshot)
+
+    frame = _base_frame(matches)
+    windows, season_stats, needs_season = _split_keys(keys)
+    values = {}
+
+    long = None
+    if windows or needs_season:
+        long = team_perspective(frame)
+
+    for n, stats in windows.items():
+        roll = rolling_means(long, windows=(n,), stats=tuple(sorted(stats)))
+        home, away = match_sides(long, roll, len(frame))
+        for stat in stats:
+            col = f"{stat}_last_{n}"
+            values[("window", n, stat)] = (home[col].to_numpy(), away[col].to_numpy())
+
+    if needs_season:
+        tot = cumulative_totals(long, by=("team", "season"), stats=tuple(sorted(season_stats)))
+        home, away = match_sides(long, tot, len(frame))
+        for stat in season_stats:
+            values[("season", stat)] = (
+                home[f"{stat}_sum"].to_numpy(), away[f"{stat}_sum"].to_numpy()
+            )
+        values[("season", "played")] = (
+            home["played"].fillna(0).to_numpy(), away["played"].fillna(0).to_numpy()
+        )
+
+    if ("elo",) in keys:
+        values[("elo",)] = _elo_sides(frame)
+
+    _column_values(keys, matches, values)
+    return FeatureContext(values)
+
+
+def _asof_intermediates(keys, matches, history, states, snapshot=None):
+    """Chemin upcoming : une jointure as-of de tout le lot sur la table d'états (ou le snapshot)."""
+    windows, season_stats, needs_season = _split_keys(keys)
+    if snapshot is not None:
+        home, away = snapshot_attach(matches, snapshot)
+    else:
+        if states is None:
+            states = team_state_table(
+                history,
+                windows=tuple(sorted(windows)) or STATE_WINDOWS,
+                stats=tuple(sorted({s for st in windows.values() for s in st} | season_stats)) or STATS,
+            )
+        home, away = asof_attach(matches, states)
+    values = {}
+
+    for n, stats in windows.items():
+        for stat in stats:
+            col = f"{stat}_last_{n}"
+            values[("window", n, stat)] = (home[col].to_numpy(dtype=float), away[col].to_numpy(dtype=float))
+
+    if needs_season:
+        for stat in season_stats:
+            col = f"season_{stat}_sum"
+            values[("season", stat)] = (home[col].to_numpy(dtype=float), away[col].to_numpy(dtype=float))
+        values[("season", "played")] = (
+            home["season_played"].fillna(0).to_numpy(dtype=float),
+            away["season_played"].fillna(0).to_numpy(dtype=float),
+        )
+
+    if ("elo",) in keys:
+        sides = []
+        for state, elo_col in ((home, "elo_home"), (away, "elo_away")):
+            elo = (
+                pd.to_numeric(matches[elo_col], errors="coerce").to_numpy(dtype=float, copy=True)
+                if elo_col in matches.columns else np.full(len(matches), np.nan)
+            )
+            missing = np.isnan(elo)
+            found = state["last_date"].notna().to_numpy()
+            elo[missing] = np.where(found, state["elo"].to_numpy(dtype=float), DEFAULT_ELO)[missing]
+            sides.append(elo)
+        values[("elo",)] = tuple(sides)
+
+    _column_values(keys, matches, values)
+    return FeatureContext(values)
+
+
+def _elo_sides(frame):
+    """Elo de la ligne si connu, sinon as-of sur les matchs précédents."""
+    timeline = EloTimeline(frame)
+
+    sides = []
+    for team_col, elo_col in (("HomeTeam", "elo_home"), ("AwayTeam", "elo_away")):
+        elo = pd.to_numeric(frame[elo_col], errors="coerce").to_numpy(dtype=float, copy=True)
+        missing = np.isnan(elo)
+        if missing.any():
+            elo[missing] = timeline.lookup(
+                frame[team_col].to_numpy(dtype=object)[missing],
+                frame["Date"].to_numpy()[missing],
+                default=DEFAULT_ELO,
+            )
+        sides.append(elo)
+    return tuple(sides)
+
+
+def build_feature_frame(matches, feature_cols, history=None, states=None, snapshot=None):
+    """
+    DataFrame des colonnes `feature_cols` (dans cet ordre) pour `matches`.
+    Seuls les intermédiaires requis par ces colonnes sont calculés ;
+    les colonnes inconnues du registre sont laissées à NaN.
+    `states` : table asof_join.team_state_table déjà calculée (sinon
+    construite depuis `history`).
+    `snapshot` : asof_join.team_snapshot (dernier état par équipe) → lookup par clé.
+    """
+    features, unknown, keys = resolve(feature_cols)
+    if unknown:
+        print(f"⚠️ {len(unknown)} feature(s) hors registre (NaN) : {unknown[:10]}")
+
+    ctx = compute_intermediates(keys, matches, history, states, snapshot)
+
+    out = {}
+    for feat in features:
+        out[feat.name] = np.asarray(feat.compute(ctx), dtype=float)
+    for name in unknown:
+        out[name] = np.full(len(matches), np.nan)
+
+    return pd.DataFrame(out, columns=list(feature_cols))
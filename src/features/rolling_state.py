@@ -0,0 +1,309 @@
+# ============================================================
+# ROLLING STATE ENGINE – APUESDATA
+# ============================================================
+#
+# Moteur "single pass" pour build_features :
+# l'historique est parcouru UNE fois dans l'ordre chronologique,
+# avec un état par équipe (buffer des 20 derniers résultats +
+# agrégats par saison + dernier Elo connu).
+#
+# Pour chaque date, les lignes de features sont émises à partir
+# de l'état AVANT les matchs de cette date, puis l'état est mis
+# à jour. L'absence de fuite (leakage) est donc garantie par
+# construction, et non par des filtres `Date < date`.
+# ============================================================
+
+from collections import deque
+
+import numpy as np
+import pandas as pd
+
+from src.feature_builder import (
+    feature_row,
+    get_season,
+    lineup_strength,
+)
+from src.features.indexes import _to_datetime64
+
+WINDOWS = (5, 10, 20)
+MAX_WINDOW = max(WINDOWS)
+
+DEFAULT_ELO = 1500.0
+TOP_ELO = 1650
+BOTTOM_ELO = 1400
+
+
+class TeamState:
+    """
+    État glissant d'une équipe.
+
+    recent : derniers résultats (plus récent en dernier), chaque entrée =
+             (gf, ga, is_home, opponent, opp_elo, elo_before)
+    seasons : saison -> [matchs, victoires, buts pour, buts contre]
+    elo : Elo de la ligne du dernier match joué (None si aucun)
+    """
+
+    __slots__ = ("recent", "seasons", "elo")
+
+    def __init__(self):
+        self.recent = deque(maxlen=MAX_WINDOW)
+        self.seasons = {}
+        self.elo = None
+
+    def current_elo(self):
+        return DEFAULT_ELO if self.elo is None else float(self.elo)
+
+    def last(self, n):
+        """n derniers résultats, du plus récent au plus ancien."""
+        k = min(n, len(self.recent))
+        return [self.recent[-i] for i in range(1, k + 1)]
+
+    def push(self, gf, ga, is_home, opponent, opp_elo, season, elo):
+        self.recent.append((gf, ga, is_home, opponent, opp_elo, self.elo))
+
+        agg = self.seasons.setdefault(season, [0, 0, 0, 0])
+        agg[0] += 1
+        agg[1] += gf > ga
+        agg[2] += gf
+        agg[3] += ga
+
+        self.elo = elo
+
+
+# ============================================================
+# FEATURES À PARTIR DE L'ÉTAT
+# ============================================================
+
+def _points(gf, ga):
+    return 3 if gf > ga else (1 if gf == ga else 0)
+
+
+def _form(state):
+    last10 = state.last(10)
+    if not last10:
+        return dict(
+            gf5=0.0, ga5=0.0, pts5=1.0,
+            gf10=0.0, ga10=0.0, pts10=1.0
+        )
+
+    last5 = last10[:5]
+    return dict(
+        gf5=np.mean([m[0] for m in last5]),
+        ga5=np.mean([m[1] for m in last5]),
+        pts5=np.mean([_points(m[0], m[1]) for m in last5]),
+        gf10=np.mean([m[0] for m in last10]),
+        ga10=np.mean([m[1] for m in last10]),
+        pts10=np.mean([_points(m[0], m[1]) for m in last10]),
+    )
+
+
+def _season(state, date):
+    agg = state.seasons.get(get_season(date.year, date.month))
+    if not agg:
+        return dict(winrate=0.33, gf=1.2, ga=1.2)
+
+    played, wins, gf, ga = agg
+    return dict(winrate=wins / played, gf=gf / played, ga=ga / played)
+
+
+def _sos(state, states):
+    opps = [m[3] for m in state.last(5)]
+    if not opps:
+        return DEFAULT_ELO
+    return float(np.mean([
+        states[o].current_elo() if o in states else DEFAULT_ELO
+        for o in opps
+    ]))
+
+
+def _vs_group(state, group):
+    past = state.last(10)
+    if not past:
+        return 0.33
+
+    wins = 0
+    total = 0
+    for gf, ga, _, _, opp_elo, _ in past:
+        if group == "top" and opp_elo >= TOP_ELO:
+            wins += (gf > ga)
+            total += 1
+        elif group == "bottom" and opp_elo <= BOTTOM_ELO:
+            wins += (gf > ga)
+            total += 1
+
+    return wins / total if total > 0 else 0.33
+
+
+def _momentum(state):
+    last5 = state.last(5)
+    if not last5:
+        return 0.0
+
+    wins = sum(1 for m in last5 if m[0] > m[1])
+    goal_diff = sum(m[0] - m[1] for m in last5)
+
+    # Elo juste avant le plus ancien des 5 derniers matchs
+    elo_then = last5[-1][5]
+    elo_then = DEFAULT_ELO if elo_then is None else float(elo_then)
+    elo_delta = state.current_elo() - elo_then
+
+    return wins * 0.6 + goal_diff * 0.3 + (elo_delta / 40.0) * 0.1
+
+
+def _home_adv(state):
+    home_games = [m for m in state.last(20) if m[2]]
+    if not home_games:
+        return 0.05
+
+    winrate = np.mean([m[0] > m[1] for m in home_games])
+    return float(winrate - 0.33)
+
+
+def _xg(state):
+    last10 = state.last(10)
+    if not last10:
+        return 1.3
+    avg_gf = np.mean([m[0] for m in last10])
+    avg_ga = np.mean([m[1] for m in last10])
+    return avg_gf * 0.7 + avg_ga * 0.3
+
+
+def state_features(state, states, team, date):
+    """Équivalent de feature_builder.team_features, lu depuis l'état."""
+    return dict(
+        elo=state.current_elo(),
+        form=_form(state),
+        season=_season(state, date),
+        lineup=lineup_strength(team, date),
+        sos=_sos(state, states),
+        vs_top=_vs_group(state, "top"),
+        vs_bottom=_vs_group(state, "bottom"),
+        momentum=_momentum(state),
+        home_adv=_home_adv(state),
+        xg=_xg(state),
+    )
+
+
+# ============================================================
+# MOTEUR
+# ============================================================
+
+class RollingStateEngine:
+    """
+    Parcourt des matchs triés par date et maintient l'état de chaque équipe.
+
+    engine.process(df) émet une ligne par match (calculée avant le match)
+    et met l'état à jour ; engine.advance(df) met seulement l'état à jour.
+    Les deux peuvent être rappelés sur des blocs successifs tant que leurs
+    dates sont croissantes (l'état est picklable → checkpoint).
+
+    row_fn(engine, home, away, date) -> dict construit la ligne émise
+    (par défaut : colonnes de feature_builder.build_features).
+    """
+
+    def __init__(self, row_fn=None):
+        self.states = {}
+        self.row_fn = row_fn
+
+    def state(self, team):
+        st = self.states.get(team)
+        if st is None:
+            st = self.states[team] = TeamState()
+        return st
+
+    def emit(self, home, away, date):
+        if self.row_fn is not None:
+            return self.row_fn(self, home, away, date)
+        h = state_features(self.state(home), self.states, home, date)
+        a = state_features(self.state(away), self.states, away, date)
+        return feature_row(home, away, date, h, a)
+
+    def apply_day(self, matches):
+        """
+        Met à jour l'état avec les matchs d'une même date.
+        matches : liste de (home, away, hg, ag, season, elo_home, elo_away)
+        Les Elo adverses sont figés avant toute mise à jour du jour ;
+        les matchs sans score (pas encore joués) sont ignorés.
+        """
+        matches = [m for m in matches if not (pd.isna(m[2]) or pd.isna(m[3]))]
+
+        before = {
+            t: self.state(t).current_elo()
+            for m in matches for t in (m[0], m[1])
+        }
+
+        for home, away, hg, ag, season, elo_h, elo_a in matches:
+            self.state(home).push(hg, ag, True, away, before[away], season, elo_h)
+            self.state(away).push(ag, hg, False, home, before[home], season, elo_a)
+
+    def _walk(self, df, emit):
+        n = len(df)
+        rows = [None] * n
+        if n == 0:
+            return rows
+
+        dates = _to_datetime64(df["Date"])
+        homes = df["HomeTeam"].to_numpy(dtype=object)
+        aways = df["AwayTeam"].to_numpy(dtype=object)
+        hg = df["HomeGoals"].to_numpy()
+        ag = df["AwayGoals"].to_numpy()
+        none = np.full(n, None, dtype=object)
+        elo_h = df["elo_home"].to_numpy() if "elo_home" in df.columns else none
+        elo_a = df["elo_away"].to_numpy() if "elo_away" in df.columns else none
+        if "Season" in df.columns:
+            seasons = df["Season"].to_numpy(dtype=object)
+        else:
+            seasons = np.array([
+                None if np.isnat(d) else get_season(pd.Timestamp(d).year, pd.Timestamp(d).month)
+                for d in dates
+            ], dtype=object)
+
+        date_col = df["Date"]
+
+        # Lignes sans date : aucun historique visible, pas de mise à jour
+        if emit:
+            for i in np.flatnonzero(np.isnat(dates)):
+                empty = RollingStateEngine(self.row_fn)
+                rows[i] = empty.emit(homes[i], aways[i], date_col.iloc[i])
+
+        valid = np.flatnonzero(~np.isnat(dates))
+        order = valid[np.argsort(dates[valid], kind="stable")]
+
+        start = 0
+        while start < len(order):
+            day = dates[order[start]]
+            end = start
+            while end < len(order) and dates[order[end]] == day:
+                end += 1
+
+            block = order[start:end]
+            if emit:
+                for i in block:
+                    rows[i] = self.emit(homes[i], aways[i], date_col.iloc[i])
+
+            self.apply_day([
+                (homes[i], aways[i], hg[i], ag[i], seasons[i], elo_h[i], elo_a[i])
+                for i in block
+            ])
+            start = end
+
+        return rows
+
+    def process(self, df):
+        """
+        Émet les lignes de df (une par match, ordre de df conservé)
+        puis intègre df dans l'état.
+        """
+        return pd.DataFrame(self._walk(df, emit=True))
+
+    def advance(self, df):
+        """Intègre df dans l'état sans rien émettre."""
+        self._walk(df, emit=False)
+
+
+def build_features_streaming(df):
+    """
+    Remplaçant O(n) de feature_builder.build_features : mêmes colonnes,
+    un seul passage chronologique sur l'historique.
+    """
+    return RollingStateEngine().process(df)
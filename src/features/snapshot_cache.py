@@ -0,0 +1,76 @@
+# ============================================================
+# SNAPSHOT CACHE – DATASETS PROCESSED (APUESDATA)
+# ============================================================
+#
+# Cache process-level des datasets processed (all_matches_features…,
+# CSV ou Parquet via src.storage) : le fichier est lu une seule fois
+# tant qu'il ne change pas. Clé = chemin logique ; le snapshot est
+# invalidé dès que le fichier lu, son mtime ou sa taille changent.
+# ============================================================
+
+from pathlib import Path
+
+from src.features.indexes import TeamMatchIndex
+from src.storage import read_dataset, resolve_dataset
+
+_SNAPSHOTS = {}
+
+
+class DatasetSnapshot:
+    """DataFrame figé d'un fichier + index par équipe construit à la demande."""
+
+    def __init__(self, path, stamp, df):
+        self.path = path
+        self.stamp = stamp
+        self.df = df
+        self._index = None
+
+    @property
+    def index(self):
+        if self._index is None:
+            self._index = TeamMatchIndex(self.df)
+        return self._index
+
+    def latest_before(self, team, date):
+        """Dernière ligne où `team` joue strictement avant `date` (None sinon)."""
+        positions = self.index.positions_before(team, date, 1)
+        if len(positions) == 0:
+            return None
+        return self.df.iloc[positions[0]]
+
+
+def _stamp(path: Path):
+    st = path.stat()
+    return path, st.st_mtime_ns, st.st_size
+
+
+def get_snapshot(path, date_cols=("Date",)):
+    """
+    Snapshot (mis en cache) du dataset `path` (CSV ou Parquet, voir
+    src.storage), ou None si le fichier n'existe pas.
+    Le DataFrame retourné est partagé : ne pas le modifier en place.
+    """
+    path = Path(path).resolve()
+
+    physical = resolve_dataset(path)
+    try:
+        stamp = _stamp(physical) if physical is not None else None
+    except FileNotFoundError:
+        stamp = None
+    if stamp is None:
+        _SNAPSHOTS.pop(path, None)
+        return None
+
+    snap = _SNAPSHOTS.get(path)
+    if snap is not None and snap.stamp == stamp:
+        return snap
+
+    df = read_dataset(physical, date_cols=date_cols)
+
+    snap = DatasetSnapshot(path, stamp, df)
+    _SNAPSHOTS[path] = snap
+    return snap
+
+
+def clear_snapshots():
+    _SNAPSHOTS.clear()
@@ -0,0 +1,336 @@
+# ============================================================
+# TEAM PERSPECTIVE TABLE – APUESDATA
+# ============================================================
+#
+# Table "long format" : 2 lignes par match (une par équipe) avec
+# team, opponent, is_home, gf, ga, points, season, Date, elo.
+# Construite une fois, en NumPy vectorisé, triée par (équipe, date).
+#
+# Les stats de forme / saison / BTTS / over 2.5 sont ensuite des
+# différences de sommes cumulées par groupe — plus aucun
+# apply(axis=1) ni iterrows.
+# ============================================================
+
+import numpy as np
+import pandas as pd
+
+from src.features.indexes import _cached_for_frame, _to_datetime64
+
+STATS = ("gf", "ga", "points", "win", "draw", "loss", "btts", "over25")
+
+
+def season_labels(dates):
+    """Saison "YYYY/YYYY+1" (bascule en juillet), vectorisé ; None si NaT."""
+    dates = pd.DatetimeIndex(dates)
+    valid = ~dates.isna()
+
+    labels = np.full(len(dates), None, dtype=object)
+    if valid.any():
+        d = dates[valid]
+        start = np.where(d.month < 7, d.year - 1, d.year)
+        labels[valid] = [f"{s}/{s + 1}" for s in start]
+    return labels
+
+
+def team_perspective(df):
+    """
+    Table long format (2 lignes par match), triée par (team, Date, match).
+    `match` = position (iloc) de la ligne d'origine dans df.
+    Les lignes sans équipe ou sans date sont écartées.
+    """
+    n = len(df)
+    match = np.arange(n)
+
+    home = df["HomeTeam"].to_numpy(dtype=object)
+    away = df["AwayTeam"].to_numpy(dtype=object)
+    hg = pd.to_numeric(df["HomeGoals"], errors="coerce").to_numpy(dtype=float)
+    ag = pd.to_numeric(df["AwayGoals"], errors="coerce").to_numpy(dtype=float)
+    dates = _to_datetime64(df["Date"])
+
+    if "Season" in df.columns:
+        season = df["Season"].to_numpy(dtype=object)
+    else:
+        season = season_labels(dates)
+
+    nan = np.full(n, np.nan)
+    elo_h = df["elo_home"].to_numpy(dtype=float) if "elo_home" in df.columns else nan
+    elo_a = df["elo_away"].to_numpy(dtype=float) if "elo_away" in df.columns else nan
+
+    gf = np.concatenate([hg, ag])
+    ga = np.concatenate([ag, hg])
+
+    long = pd.DataFrame({
+        "match": np.concatenate([match, match]),
+        "team": np.concatenate([home, away]),
+        "opponent": np.concatenate([away, home]),
+        "is_home": np.repeat([True, False], n),
+        "Date": np.concatenate([dates, dates]),
+        "season": np.concatenate([season, season]),
+        "gf": gf,
+        "ga": ga,
+        "elo": np.concatenate([elo_h, elo_a]),
+    })
+
+    long["played"] = ~np.isnan(gf) & ~np.isnan(ga)
+    long["points"] = np.where(gf > ga, 3, np.where(gf == ga, 1, 0))
+    long["win"] = gf > ga
+    long["draw"] = gf == ga
+    long["loss"] = gf < ga
+    long["btts"] = (gf > 0) & (ga > 0)
+    long["over25"] = (gf + ga) >= 3
+
+    keep = pd.notna(long["team"]).to_numpy() & ~np.isnat(long["Date"].to_numpy())
+    long = long[keep]
+
+    codes, _ = pd.factorize(long["team"])
+    order = np.lexsort((long["match"].to_numpy(), long["Date"].to_numpy(), codes))
+    long = long.iloc[order].reset_index(drop=True)
+    long["team_code"] = codes[order]
+
+    return long
+
+
+# ============================================================
+# SOMMES CUMULÉES PAR GROUPE
+# ============================================================
+
+def _group_start(*keys):
+    """Pour chaque ligne, index de la première ligne de son groupe (keys contiguës)."""
+    n = len(keys[0])
+    if n == 0:
+        return np.empty(0, dtype=np.int64)
+
+    change = np.zeros(n, dtype=bool)
+    change[0] = True
+    for k in keys:
+        k = np.asarray(k)
+        change[1:] |= k[1:] != k[:-1]
+
+    starts = np.flatnonzero(change)
+    return starts[np.cumsum(change) - 1]
+
+
+def _window_sums(values, played, group_start, n=None, closed="left"):
+    """
+    Somme et effectif des n derniers matchs JOUÉS de chaque groupe.
+
+    closed="left" : avant la ligne (état pré-match)
+    closed="both" : ligne incluse (état post-match)
+    n=None        : depuis le début du groupe
+    """
+    values = np.asarray(values, dtype=float)
+    played = np.asarray(played, dtype=bool)
+
+    # Préfixes sur les seuls matchs joués
+    count_prefix = np.concatenate([[0], np.cumsum(played)])
+    value_prefix = np.concatenate([[0.0], np.cumsum(values[played])])
+
+    rows = np.arange(len(values))
+    end = count_prefix[rows + 1] if closed == "both" else count_prefix[rows]
+    lo = count_prefix[group_start]
+    if n is not None:
+        lo = np.maximum(lo, end - n)
+
+    return value_prefix[end] - value_prefix[lo], end - lo
+
+
+def rolling_means(long, windows=(5, 10), stats=STATS, closed="left"):
+    """
+    Moyennes des `stats` sur les n derniers matchs de chaque équipe
+    → colonnes "{stat}_last_{n}" (NaN si aucun match dans la fenêtre).
+    """
+    starts = _group_start(long["team_code"].to_numpy())
+    played = long["played"].to_numpy()
+
+    out = {}
+    for n in windows:
+        for stat in stats:
+            sums, counts = _window_sums(long[stat].to_numpy(), played, starts, n, closed)
+            with np.errstate(invalid="ignore", divide="ignore"):
+                out[f"{stat}_last_{n}"] = np.where(counts > 0, sums / np.maximum(counts, 1), np.nan)
+        out[f"n_last_{n}"] = counts
+
+    return pd.DataFrame(out, index=long.index)
+
+
+def cumulative_totals(long, by=("team",), stats=STATS, closed="left"):
+    """
+    Totaux cumulés par groupe (équipe, ou équipe + saison) :
+    colonnes "played" et "{stat}_sum".
+    """
+    keys = []
+    for col in by:
+        if col == "team":
+            keys.append(long["team_code"].to_numpy())
+        else:
+            keys.append(pd.factorize(long[col])[0])
+    starts = _group_start(*keys)
+    played = long["played"].to_numpy()
+
+    out = {}
+    for stat in stats:
+        sums, counts = _window_sums(long[stat].to_numpy(), played, starts, None, closed)
+        out[f"{stat}_sum"] = sums
+    out["played"] = counts
+
+    return pd.DataFrame(out, index=long.index)
+
+
+def match_sides(long, frame, n_matches):
+    """
+    Ramène des colonnes alignées sur `long` au niveau match :
+    (home, away), deux DataFrames indexés 0..n_matches-1.
+    """
+    frame = frame.copy()
+    frame["match"] = long["match"].to_numpy()
+    is_home = long["is_home"].to_numpy()
+
+    full = pd.RangeIndex(n_matches)
+    home = frame[is_home].set_index("match").reindex(full)
+    away = frame[~is_home].set_index("match").reindex(full)
+    return home, away
+
+
+# ============================================================
+# TABLE EN CACHE POUR LES HELPERS DE feature_builder
+# ============================================================
+
+class TeamTable:
+    """
+    Table long format + stats post-match (forme 5/10) d'un DataFrame.
+    row_before(team, date) donne la dernière ligne de l'équipe strictement
+    avant date : ses stats post-match = l'état pré-match à `date`.
+    """
+
+    def __init__(self, df):
+        self.n_rows = len(df)
+        self.long = long = team_perspective(df)
+
+        form = rolling_means(long, (5, 10), ("gf", "ga", "points"), closed="both")
+        self.stats = {c: form[c].to_numpy() for c in form.columns}
+
+        codes = long["team_code"].to_numpy()
+        self._dates = long["Date"].to_numpy(dtype="datetime64[ns]")
+        starts = np.flatnonzero(np.r_[True, codes[1:] != codes[:-1]]) if len(codes) else np.empty(0, int)
+        ends = np.r_[starts[1:], len(codes)]
+        teams = long["team"].to_numpy(dtype=object)
+        self._bounds = {teams[s]: (s, e) for s, e in zip(starts, ends)}
+
+    @classmethod
+    def of(cls, df):
+        return _cached_for_frame(df, cls)
+
+    def row_before(self, team, date):
+        """Index (dans self.long) du dernier match de team avant date, -1 sinon."""
+        bounds = self._bounds.get(team)
+        if bounds is None:
+            return -1
+
+        d = _to_datetime64(date)
+        if np.isnat(d):
+            return -1
+
+        lo, hi = bounds
+        i = lo + int(np.searchsorted(self._dates[lo:hi], d, side="left")) - 1
+        return i if i >= lo else -1
+
+
+# ============================================================
+# AGRÉGATS PAR (ÉQUIPE, SAISON)
+# ============================================================
+
+SEASON_AGG = ("win", "draw", "loss", "gf", "ga")
+
+
+class SeasonTable:
+    """
+    Agrégats cumulés par (équipe, saison) : après chaque match joué, totaux
+    de la saison (played, win, draw, loss, gf, ga), triés par date dans
+    chaque groupe. Clé composite (groupe, rang de date) en int64 :
+    as_of / lookup = totaux de la saison de `date` strictement avant
+    `date`, en O(log n) (np.searchsorted).
+
+    totals : une ligne par (équipe, saison) avec les totaux de fin de saison.
+    """
+
+    def __init__(self, df):
+        self.n_rows = len(df)
+        long = team_perspective(df)
+        long = long[long["played"].to_numpy() & long["season"].notna().to_numpy()].reset_index(drop=True)
+
+        cum = cumulative_totals(long, by=("team", "season"), stats=SEASON_AGG, closed="both")
+        values = {"played": cum["played"].to_numpy()}
+        values.update({stat: cum[f"{stat}_sum"].to_numpy() for stat in SEASON_AGG})
+
+        groups, pairs = pd.MultiIndex.from_arrays([long["team"], long["season"]]).factorize()
+        self.group_codes = {pair: code for code, pair in enumerate(pairs)}
+
+        dates = long["Date"].to_numpy(dtype="datetime64[ns]")
+        self._unique_dates = np.unique(dates)
+        self._stride = len(self._unique_dates) + 1
+        keys = groups.astype(np.int64) * self._stride + np.searchsorted(self._unique_dates, dates)
+
+        order = np.argsort(keys, kind="stable")
+        self._keys = keys[order]
+        self.values = {k: v[order] for k, v in values.items()}
+
+        # Dernière ligne de chaque groupe = totaux de fin de saison
+        group_of = self._keys // self._stride
+        ends = np.flatnonzero(np.r_[group_of[1:] != group_of[:-1], True]) if len(keys) else np.empty(0, int)
+        self.totals = pd.DataFrame({
+            "team": pairs.get_level_values(0)[group_of[ends]],
+            "season": pairs.get_level_values(1)[group_of[ends]],
+            **{k: v[ends] for k, v in self.values.items()},
+        })
+
+    @classmethod
+    def of(cls, df):
+        """Table mise en cache pour ce DataFrame."""
+        return _cached_for_frame(df, cls)
+
+    def lookup(self, teams, dates, seasons=None):
+        """
+        Totaux de saison as-of vectorisés pour des paires (équipe, date) :
+        DataFrame (played, win, draw, loss, gf, ga), 0 si aucun match.
+        `seasons` : saison de chaque date (défaut : season_labels(dates)).
+        """
+        teams = np.asarray(teams, dtype=object)
+        dates = _to_datetime64(dates) if pd.api.types.is_list_like(dates) else np.full(
+            len(teams), _to_datetime64(dates)
+        )
+        if seasons is None:
+            seasons = season_labels(dates)
+
+        codes = np.array(
+            [self.group_codes.get((t, s), -1) for t, s in zip(teams, seasons)], dtype=np.int64
+        )
+        out = {k: np.zeros(len(teams), dtype=float) for k in self.values}
+
+        ok = (codes >= 0) & ~np.isnat(dates)
+        if ok.any():
+            ranks = np.searchsorted(self._unique_dates, dates[ok], side="left")
+            pos = np.searchsorted(self._keys, codes[ok] * self._stride + ranks, side="left") - 1
+            pos_c = np.maximum(pos, 0)
+            found = (pos >= 0) & (self._keys[pos_c] // self._stride == codes[ok])
+            idx = np.flatnonzero(ok)[found]
+            for k, v in self.values.items():
+                out[k][idx] = v[pos_c[found]]
+
+        return pd.DataFrame(out)
+
+    def as_of(self, team, date, season=None):
+        """Totaux de la saison de `date` pour `team`, strictement avant `date` (dict)."""
+        d = _to_datetime64(date)
+        if season is None:
+            season = season_labels([d])[0]
+
+        out = dict.fromkeys(self.values, 0.0)
+        code = self.group_codes.get((team, season))
+        if code is None or np.isnat(d):
+            return out
+
+        rank = np.searchsorted(self._unique_dates, d, side="left")
+        pos = int(np.searchsorted(self._keys, code * self._stride + rank, side="left")) - 1
+        if pos < 0 or self._keys[pos] // self._stride != code:
+            return out
+        return {k: float(v[pos]) for k, v in self.values.items()}
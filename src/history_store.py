@@ -0,0 +1,252 @@
+# =========================================
+# HISTORY STORE – APUESDATA
+# =========================================
+#
+# Historique des matchs partitionné par ligue et saison :
+#
+#   data/raw/history/store/league=39/season=2024-2025.csv   (ou .parquet)
+#   data/raw/history/store/_index.json   (lignes, dates min / max par partition)
+#
+# - load_history(leagues=, seasons=, columns=, since=) : seules les
+#   partitions qui correspondent sont lues (filtre sur l'index, puis
+#   projection de colonnes via src.storage)
+# - append_history(df) : seules les partitions touchées par les nouvelles
+#   lignes sont réécrites (dédoublonnage fixture_id, sinon Date + équipes)
+#
+# Clé de ligue : league_id, sinon Div, sinon "unknown".
+# Clé de saison : Season ("2024/2025"), sinon season (année API),
+# sinon déduite de Date (bascule en juillet).
+#
+#   python -m src.history_store import data/raw/history/history.csv
+#   python -m src.history_store                (liste des partitions)
+# =========================================
+
+import json
+import shutil
+import sys
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+from src.config import HISTORY, HISTORY_STORE
+from src.features.team_table import season_labels
+from src.storage import dataset_exists, read_dataset, write_dataset
+from utils import loader
+from utils.loader import cast, memory_report, to_dates
+
+SCHEMA = "history"
+INDEX_FILE = "_index.json"
+MATCH_KEY = ["Date", "HomeTeam", "AwayTeam"]
+
+
+# ------------------------------------------
+# Clés de partition
+# ------------------------------------------
+def _season_key(season):
+    """2024 / "2024" / "2024/2025" / "2024-2025" → "2024/2025"."""
+    s = str(season).strip().replace("-", "/")
+    if "/" not in s:
+        y = int(float(s))
+        s = f"{y}/{y + 1}"
+    return s
+
+
+def partition_keys(df):
+    """(ligue, saison) de chaque ligne, en chaînes (jamais NaN)."""
+    n = len(df)
+    league = np.full(n, "unknown", dtype=object)
+    for col in ("Div", "league_id"):  # league_id prioritaire (écrit en dernier)
+        if col in df.columns:
+            s = df[col]
+            ok = s.notna().to_numpy()
+            league[ok] = s[ok].astype(str).to_numpy()
+
+    season = season_labels(to_dates(df["Date"])) if "Date" in df.columns else np.full(n, None, dtype=object)
+    if "season" in df.columns:
+        s = pd.to_numeric(df["season"], errors="coerce")
+        ok = s.notna().to_numpy()
+        season[ok] = [_season_key(y) for y in s[ok]]
+    if "Season" in df.columns:
+        s = df["Season"]
+        ok = s.notna().to_numpy()
+        season[ok] = [_season_key(v) for v in s[ok]]
+    season[pd.isna(season)] = "unknown"
+    return league, season
+
+
+def partition_path(league, season, root=HISTORY_STORE):
+    """Chemin logique (.csv, voir src.storage) de la partition (ligue, saison)."""
+    return Path(root) / f"league={league}" / f"season={season.replace('/', '-')}.csv"
+
+
+# ------------------------------------------
+# Index des partitions
+# ------------------------------------------
+def read_index(root=HISTORY_STORE):
+    """{nom: {league, season, rows, min_date, max_date}} ({} si store vide)."""
+    try:
+        with open(Path(root) / INDEX_FILE) as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+
+def _write_index(index, root):
+    tmp = Path(root) / (INDEX_FILE + ".tmp")
+    with open(tmp, "w") as f:
+        json.dump(index, f, indent=1, sort_keys=True)
+    tmp.replace(Path(root) / INDEX_FILE)
+
+
+def _entry(league, season, df):
+    dates = df["Date"].dropna() if "Date" in df.columns else pd.Series(dtype="datetime64[ns]")
+    return {
+        "league": league,
+        "season": season,
+        "rows": len(df),
+        "min_date": dates.min().isoformat() if len(dates) else None,
+        "max_date": dates.max().isoformat() if len(dates) else None,
+    }
+
+
+def _name(league, season):
+    return f"league={league}/season={season.replace('/', '-')}"
+
+
+# ------------------------------------------
+# Écriture
+# ------------------------------------------
+def _dedupe(df):
+    """Dernière version de chaque match : par fixture_id, sinon Date + équipes."""
+    has_id = df["fixture_id"].notna() if "fixture_id" in df.columns else pd.Series(False, index=df.index)
+    dup = pd.Series(False, index=df.index)
+    if has_id.any():
+        dup[has_id] = df.loc[has_id, "fixture_id"].duplicated(keep="last")
+    if (~has_id).any() and all(c in df.columns for c in MATCH_KEY):
+        dup[~has_id] = df.loc[~has_id, MATCH_KEY].duplicated(keep="last")
+    return df[~dup.to_numpy()]
+
+
+def _write_partition(df, league, season, root):
+    df = df.sort_values("Date", kind="stable").reset_index(drop=True)
+    path = partition_path(league, season, root)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    write_dataset(df, path, schema=SCHEMA)
+    return _entry(league, season, df)
+
+
+def _groups(df):
+    league, season = partition_keys(df)
+    keys = pd.DataFrame({"league": league, "season": season}, index=df.index)
+    for (lg, ss), idx in keys.groupby(["league", "season"], sort=True).groups.items():
+        yield lg, ss, df.loc[idx]
+
+
+def write_history(df, root=HISTORY_STORE):
+    """(Re)crée tout le store depuis df (partitions existantes supprimées)."""
+    root = Path(root)
+    if root.exists():
+        shutil.rmtree(root)
+    root.mkdir(parents=True)
+
+    df = cast(df.reset_index(drop=True), SCHEMA)
+    index = {}
+    for lg, ss, part in _groups(df):
+        index[_name(lg, ss)] = _write_partition(_dedupe(part), lg, ss, root)
+    _write_index(index, root)
+    print(f"💾 History store → {root}  ({len(df)} rows, {len(index)} partitions)")
+    return index
+
+
+def append_history(df, root=HISTORY_STORE):
+    """
+    Ajoute / met à jour des matchs : seules les partitions (ligue, saison)
+    des lignes de df sont relues et réécrites. Retourne les partitions touchées.
+    """
+    root = Path(root)
+    root.mkdir(parents=True, exist_ok=True)
+    if df.empty:
+        return []
+
+    df = cast(df.reset_index(drop=True), SCHEMA)
+    index = read_index(root)
+    touched = []
+    for lg, ss, part in _groups(df):
+        path = partition_path(lg, ss, root)
+        if dataset_exists(path):
+            old = read_dataset(path, schema=SCHEMA, report=False)
+            part = pd.concat([old, part], ignore_index=True)
+        name = _name(lg, ss)
+        index[name] = _write_partition(_dedupe(cast(part, SCHEMA)), lg, ss, root)
+        touched.append(name)
+
+    _write_index(index, root)
+    print(f"💾 History store: {len(df)} rows → {len(touched)} partition(s) rewritten")
+    return touched
+
+
+# ------------------------------------------
+# Lecture
+# ------------------------------------------
+def select_partitions(leagues=None, seasons=None, since=None, root=HISTORY_STORE):
+    """Noms des partitions à lire (index seul, aucun fichier de données ouvert)."""
+    leagues = None if leagues is None else {str(l) for l in np.atleast_1d(leagues)}
+    seasons = None if seasons is None else {_season_key(s) for s in np.atleast_1d(seasons)}
+    since = None if since is None else pd.Timestamp(since)
+
+    names = []
+    for name, e in read_index(root).items():
+        if leagues is not None and e["league"] not in leagues:
+            continue
+        if seasons is not None and e["season"] not in seasons:
+            continue
+        if since is not None and (e["max_date"] is None or pd.Timestamp(e["max_date"]) < since):
+            continue
+        names.append(name)
+    return sorted(names)
+
+
+def load_history(leagues=None, seasons=None, columns=None, since=None, root=HISTORY_STORE):
+    """
+    Historique des partitions sélectionnées (ligues, saisons, matchs à
+    partir de `since`), trié par Date. columns : projection (Date est lue
+    en plus si `since` est donné). DataFrame vide si rien ne correspond.
+    """
+    root = Path(root)
+    index = read_index(root)
+    names = select_partitions(leagues, seasons, since, root)
+    names.sort(key=lambda n: (index[n]["min_date"] or "", n))
+
+    read_cols = None if columns is None else list(dict.fromkeys(list(columns) + (["Date"] if since is not None else [])))
+    parts = []
+    for name in names:
+        e = index[name]
+        part = read_dataset(partition_path(e["league"], e["season"], root), columns=read_cols, schema=SCHEMA, report=False)
+        if since is not None:
+            part = part[part["Date"] >= pd.Timestamp(since)]
+        parts.append(part)
+
+    if not parts:
+        return pd.DataFrame(columns=columns)
+
+    df = pd.concat(parts, ignore_index=True)
+    df = cast(df, SCHEMA).sort_values("Date", kind="stable").reset_index(drop=True)
+    if columns is not None:
+        df = df[[c for c in columns if c in df.columns]]
+    if loader.REPORT_MEMORY:
+        memory_report(df, f"history store ({len(parts)}/{len(index)} partitions)")
+    return df
+
+
+def import_history(path=HISTORY / "history.csv", root=HISTORY_STORE):
+    """Crée le store depuis un historique monolithique (history.csv…)."""
+    return write_history(read_dataset(path, schema=SCHEMA), root)
+
+
+if __name__ == "__main__":
+    if len(sys.argv) > 1 and sys.argv[1] == "import":
+        import_history(Path(sys.argv[2]) if len(sys.argv) > 2 else HISTORY / "history.csv")
+    else:
+        for name, e in sorted(read_index().items()):
+            print(f"{name:<40} {e['rows']:>7} rows  {e['min_date']} → {e['max_date']}")
@@ -0,0 +1,412 @@
+# =========================================
+# MATCH DB – APUESDATA
+# =========================================
+#
+# Base embarquée SQLite (stdlib, optionnelle) : data/processed/matches.sqlite
+#
+#   matches       : un match par clé (fixture_id, sinon Date + équipes)
+#   team_matches  : une ligne par (équipe, date, match) → clé primaire
+#                   (team, date) : "N derniers matchs de X avant D"
+#   team_aliases  : nom brut → nom canonique (normalize_team_name par défaut)
+#   elo           : ratings Elo par (équipe, date du dernier match)
+#   features      : all_matches_features (colonnes du CSV), index fixture_id
+#
+# Index : team_matches (team, date), matches (league, season, date),
+# matches (fixture_id), features (fixture_id). Tables WITHOUT ROWID :
+# une recherche par clé = une descente de B-tree, quelle que soit la
+# taille de l'historique.
+#
+# Optionnelle : utilisée seulement si le fichier existe (open_db() → None
+# sinon). update_history / update_elo_state la tiennent alors à jour.
+#
+#   python -m src.match_db import     (crée / remplit la base)
+#   python -m src.match_db            (comptes par table)
+# =========================================
+
+import sqlite3
+import sys
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+from utils.loader import to_dates
+from utils.standardize_features import normalize_team_name
+
+# Pas de src.config ici : les pages Streamlit l'importent sans .env
+ROOT = Path(__file__).resolve().parents[1]
+MATCH_DB = ROOT / "data" / "processed" / "matches.sqlite"
+
+# ⚠️ Incrémenter si le schéma change (base recréée par `import`)
+DB_VERSION = 1
+
+DATE_FMT = "%Y-%m-%d %H:%M:%S"
+
+# Colonnes renvoyées (noms de l'historique)
+MATCH_COLUMNS = [
+    "fixture_id", "Date", "league", "season",
+    "HomeTeam", "AwayTeam", "HomeGoals", "AwayGoals", "elo_home", "elo_away",
+]
+NUMERIC_COLUMNS = {"fixture_id", "HomeGoals", "AwayGoals", "elo_home", "elo_away"}
+
+SCHEMA_SQL = """
+CREATE TABLE IF NOT EXISTS meta (
+    key TEXT PRIMARY KEY,
+    value TEXT
+) WITHOUT ROWID;
+
+CREATE TABLE IF NOT EXISTS matches (
+    match_key TEXT PRIMARY KEY,
+    fixture_id INTEGER,
+    date TEXT,
+    league TEXT,
+    season TEXT,
+    home_team TEXT,
+    away_team TEXT,
+    home_goals INTEGER,
+    away_goals INTEGER,
+    elo_home REAL,
+    elo_away REAL
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS matches_fixture ON matches (fixture_id);
+CREATE INDEX IF NOT EXISTS matches_league_season ON matches (league, season, date);
+
+CREATE TABLE IF NOT EXISTS team_matches (
+    team TEXT,
+    date TEXT,
+    match_key TEXT,
+    PRIMARY KEY (team, date, match_key)
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS team_matches_key ON team_matches (match_key);
+
+CREATE TABLE IF NOT EXISTS team_aliases (
+    alias TEXT PRIMARY KEY,
+    team TEXT NOT NULL
+) WITHOUT ROWID;
+
+CREATE TABLE IF NOT EXISTS elo (
+    team TEXT,
+    date TEXT,
+    rating REAL,
+    n_matches INTEGER,
+    PRIMARY KEY (team, date)
+) WITHOUT ROWID;
+"""
+
+_SELECT_MATCH = (
+    "SELECT m.fixture_id, m.date, m.league, m.season, m.home_team, m.away_team,"
+    " m.home_goals, m.away_goals, m.elo_home, m.elo_away FROM matches m"
+)
+
+
+def _date_key(value):
+    """Timestamp / chaîne → 'YYYY-MM-DD HH:MM:SS' (naïf UTC), None si invalide."""
+    try:
+        d = pd.Timestamp(value)
+    except (TypeError, ValueError):
+        return None
+    if pd.isna(d):
+        return None
+    if d.tzinfo is not None:
+        d = d.tz_convert("UTC").tz_localize(None)
+    return d.strftime(DATE_FMT)
+
+
+def _none(values):
+    """Tableau objet, NaN / NA → None (paramètres SQLite)."""
+    out = np.array(values, dtype=object)
+    out[pd.isna(out)] = None
+    return out
+
+
+class MatchDB:
+    """Dépôt SQLite : matchs, alias d'équipes, Elo, features (voir en-tête)."""
+
+    def __init__(self, path=MATCH_DB):
+        self.path = Path(path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        # Lecture depuis plusieurs threads (Streamlit) ; écritures séquentielles
+        self.con = sqlite3.connect(self.path, check_same_thread=False)
+        self.con.execute("PRAGMA journal_mode=WAL")
+        self.con.execute("PRAGMA synchronous=NORMAL")
+        self.con.executescript(SCHEMA_SQL)
+        with self.con:
+            self.con.execute("INSERT OR IGNORE INTO meta VALUES ('version', ?)", (str(DB_VERSION),))
+        self._aliases = None
+
+    def close(self):
+        self.con.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    @property
+    def version(self):
+        row = self.con.execute("SELECT value FROM meta WHERE key = 'version'").fetchone()
+        return int(row[0]) if row else None
+
+    # ----------------------------------------------
+    # Alias d'équipes
+    # ----------------------------------------------
+    def aliases(self):
+        """{alias: équipe canonique} (mis en cache jusqu'au prochain add_aliases)."""
+        if self._aliases is None:
+            self._aliases = dict(self.con.execute("SELECT alias, team FROM team_aliases"))
+        return self._aliases
+
+    def add_aliases(self, mapping):
+        """Ajoute / remplace des alias {nom: équipe canonique} (nom brut et normalisé)."""
+        rows = {}
+        for alias, team in mapping.items():
+            team = normalize_team_name(team)
+            rows.setdefault(normalize_team_name(alias), team)
+            rows[str(alias)] = team
+        with self.con:
+            self.con.executemany("INSERT OR REPLACE INTO team_aliases VALUES (?, ?)", list(rows.items()))
+        self._aliases = None
+
+    def resolve(self, team):
+        """Nom canonique : alias exact, alias du nom normalisé, sinon normalize_team_name."""
+        aliases = self.aliases()
+        if team in aliases:
+            return aliases[team]
+        norm = normalize_team_name(team)
+        return aliases.get(norm, norm)
+
+    def _resolve_column(self, s):
+        # Une résolution par nom distinct, pas par ligne
+        codes, uniques = pd.factorize(s.astype(object), use_na_sentinel=False)
+        names = np.array([self.resolve(u) for u in uniques], dtype=object)
+        return names[codes]
+
+    # ----------------------------------------------
+    # Écriture
+    # ----------------------------------------------
+    def upsert_matches(self, df):
+        """
+        Ajoute / met à jour des matchs (Date, HomeTeam, AwayTeam, buts,
+        fixture_id, league_id / Div, Season / season, elo_* optionnels).
+        Les noms bruts sont enregistrés comme alias. Retourne le nb de lignes.
+        """
+        from src.history_store import partition_keys
+
+        df = df.rename(columns={
+            "date": "Date", "home_name": "HomeTeam", "away_name": "AwayTeam",
+            "home_goals": "HomeGoals", "away_goals": "AwayGoals",
+        })
+        df = df.dropna(subset=["HomeTeam", "AwayTeam"]).reset_index(drop=True)
+        if df.empty:
+            return 0
+
+        n = len(df)
+        dates = to_dates(df["Date"]) if "Date" in df.columns else pd.Series(pd.NaT, index=df.index)
+        date_txt = _none(dates.dt.strftime(DATE_FMT))
+        league, season = partition_keys(df)
+
+        # Nouveaux noms bruts → alias vers leur nom canonique
+        known = self.aliases()
+        raw = pd.unique(pd.concat([df["HomeTeam"], df["AwayTeam"]]).astype(str))
+        new = {r: self.resolve(r) for r in raw if r not in known}
+        if new:
+            self.add_aliases(new)
+        home = self._resolve_column(df["HomeTeam"])
+        away = self._resolve_column(df["AwayTeam"])
+
+        def col(name, kind):
+            if name not in df.columns:
+                return np.full(n, None, dtype=object)
+            v = pd.to_numeric(df[name], errors="coerce")
+            return _none(v.astype("Int64") if kind == "int" else v.astype(float))
+
+        fixture_id = col("fixture_id", "int")
+        keys = np.array([
+            f"fx:{fx}" if fx is not None else f"{d}|{h}|{a}"
+            for fx, d, h, a in zip(fixture_id, date_txt, home, away)
+        ], dtype=object)
+
+        rows = list(zip(
+            keys, fixture_id, date_txt, league, season, home, away,
+            col("HomeGoals", "int"), col("AwayGoals", "int"),
+            col("elo_home", "float"), col("elo_away", "float"),
+        ))
+        team_rows = [
+            (t, d, k)
+            for k, d, h, a in zip(keys, date_txt, home, away)
+            if d is not None
+            for t in (h, a)
+        ]
+
+        with self.con:
+            # Un match reprogrammé change de date : anciennes lignes équipe retirées
+            self.con.executemany("DELETE FROM team_matches WHERE match_key = ?", [(k,) for k in keys])
+            self.con.executemany("INSERT OR REPLACE INTO matches VALUES (?,?,?,?,?,?,?,?,?,?,?)", rows)
+            self.con.executemany("INSERT OR IGNORE INTO team_matches VALUES (?,?,?)", team_rows)
+        return n
+
+    def save_elo(self, store):
+        """Ratings d'un EloStore, datés du dernier match de chaque équipe."""
+        frame = store.to_frame().dropna(subset=["last_date"])
+        rows = [
+            (self.resolve(t), d.strftime(DATE_FMT), float(r), int(m))
+            for t, d, r, m in zip(frame["team"], frame["last_date"], frame["rating"], frame["n_matches"])
+        ]
+        with self.con:
+            self.con.executemany("INSERT OR REPLACE INTO elo VALUES (?,?,?,?)", rows)
+        return len(rows)
+
+    def save_features(self, df):
+        """Remplace la table features (colonnes du DataFrame), index fixture_id."""
+        df = df.copy()
+        for c in df.columns:
+            if pd.api.types.is_datetime64_any_dtype(df[c]):
+                df[c] = _none(df[c].dt.strftime(DATE_FMT))
+            elif isinstance(df[c].dtype, pd.CategoricalDtype):
+                df[c] = df[c].astype(object)
+        with self.con:
+            df.to_sql("features", self.con, if_exists="replace", index=False, chunksize=10_000)
+            if "fixture_id" in df.columns:
+                self.con.execute("CREATE INDEX IF NOT EXISTS features_fixture ON features (fixture_id)")
+        return len(df)
+
+    # ----------------------------------------------
+    # Lecture
+    # ----------------------------------------------
+    @staticmethod
+    def _frame(rows):
+        # Colonne par colonne : bien moins coûteux que DataFrame(rows) sur 10 lignes
+        cols = list(zip(*rows)) if rows else [()] * len(MATCH_COLUMNS)
+        data = {
+            name: np.array(c, dtype=float if name in NUMERIC_COLUMNS else object)
+            for name, c in zip(MATCH_COLUMNS, cols)
+        }
+        data["Date"] = np.array(data["Date"], dtype="datetime64[ns]")
+        return pd.DataFrame(data, copy=False)
+
+    def match(self, fixture_id):
+        """Match d'un fixture_id (dict), None si inconnu."""
+        row = self.con.execute(_SELECT_MATCH + " WHERE m.fixture_id = ?", (int(fixture_id),)).fetchone()
+        return None if row is None else dict(zip(MATCH_COLUMNS, row))
+
+    def last_match_rows(self, team, date, n=10):
+        """n derniers matchs de `team` strictement avant `date` (tuples, du plus récent au plus ancien)."""
+        d = _date_key(date)
+        if d is None:
+            return []
+        return self.con.execute(
+            _SELECT_MATCH + " JOIN team_matches t ON t.match_key = m.match_key"
+            " WHERE t.team = ? AND t.date < ? ORDER BY t.date DESC LIMIT ?",
+            (self.resolve(team), d, -1 if n is None else int(n)),
+        ).fetchall()
+
+    def last_matches(self, team, date, n=10):
+        """Comme feature_builder.get_last_matches : DataFrame, du plus récent au plus ancien."""
+        return self._frame(self.last_match_rows(team, date, n))
+
+    def league_season(self, league, season=None):
+        """Matchs d'une ligue (league_id ou Div), d'une saison si donnée, par date."""
+        from src.history_store import _season_key
+
+        if season is None:
+            rows = self.con.execute(
+                _SELECT_MATCH + " WHERE m.league = ? ORDER BY m.date", (str(league),)
+            ).fetchall()
+        else:
+            rows = self.con.execute(
+                _SELECT_MATCH + " WHERE m.league = ? AND m.season = ? ORDER BY m.date",
+                (str(league), _season_key(season)),
+            ).fetchall()
+        return self._frame(rows)
+
+    def elo_as_of(self, team, date=None, default=None):
+        """Dernier rating Elo enregistré de `team` strictement avant `date` (ou le plus récent)."""
+        sql = "SELECT rating FROM elo WHERE team = ?"
+        params = [self.resolve(team)]
+        if date is not None:
+            sql += " AND date < ?"
+            params.append(_date_key(date))
+        row = self.con.execute(sql + " ORDER BY date DESC LIMIT 1", params).fetchone()
+        return default if row is None else row[0]
+
+    def features(self, fixture_id):
+        """Ligne de features d'un fixture_id (dict), None si inconnue ou table absente."""
+        try:
+            cur = self.con.execute("SELECT * FROM features WHERE fixture_id = ?", (int(fixture_id),))
+        except sqlite3.OperationalError:
+            return None
+        row = cur.fetchone()
+        return None if row is None else dict(zip([c[0] for c in cur.description], row))
+
+    def teams(self):
+        return [t for (t,) in self.con.execute("SELECT DISTINCT team FROM team_matches ORDER BY team")]
+
+    def counts(self):
+        out = {}
+        for table in ("matches", "team_matches", "team_aliases", "elo", "features"):
+            try:
+                out[table] = self.con.execute(f"SELECT COUNT(*) FROM {table}").fetchone()[0]
+            except sqlite3.OperationalError:
+                out[table] = 0
+        return out
+
+
+# ------------------------------------------
+# Accès
+# ------------------------------------------
+_OPEN = {}
+
+
+def open_db(path=MATCH_DB, create=False):
+    """
+    Base partagée pour `path` (connexion gardée ouverte), None si le
+    fichier n'existe pas et create=False : la base reste optionnelle.
+    """
+    path = Path(path)
+    db = _OPEN.get(path)
+    if db is None:
+        if not create and not path.exists():
+            return None
+        db = _OPEN[path] = MatchDB(path)
+    return db
+
+
+def import_all(path=MATCH_DB):
+    """(Re)crée la base depuis history.csv, l'état Elo et all_matches_features."""
+    from src.config import ELO_STATE, HISTORY, PROCESSED
+    from src.storage import dataset_exists, read_dataset
+    from src.update.elo_advanced import EloStore
+
+    path = Path(path)
+    db = _OPEN.pop(path, None)
+    if db is not None:
+        db.close()
+    for suffix in ("", "-wal", "-shm"):
+        Path(str(path) + suffix).unlink(missing_ok=True)
+    db = open_db(path, create=True)
+
+    history = HISTORY / "history.csv"
+    if dataset_exists(history):
+        print(f"📥 Matches ← {history}")
+        db.upsert_matches(read_dataset(history, schema="history"))
+
+    store = EloStore.load(ELO_STATE)
+    if store is not None:
+        db.save_elo(store)
+
+    features = PROCESSED / "all_matches_features.csv"
+    if dataset_exists(features):
+        print(f"📥 Features ← {features}")
+        db.save_features(read_dataset(features, schema="features", report=False))
+
+    print(f"💾 Match DB → {path}  {db.counts()}")
+    return db
+
+
+if __name__ == "__main__":
+    if len(sys.argv) > 1 and sys.argv[1] == "import":
+        import_all()
+    else:
+        db = open_db()
+        print("⚠️ No match DB (python -m src.match_db import)" if db is None else db.counts())
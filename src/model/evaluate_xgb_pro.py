@@ -3,7 +3,6 @@
 # ============================================
 
 import json
-import pandas as pd
 import numpy as np
 from pathlib import Path
 from sklearn.metrics import (
@@ -14,9 +13,11 @@ from sklearn.metrics import (
 )
 import joblib
 from src.config import MODELS
+from src.model.feature_matrix import READ_SCHEMA, open_matrix
+from src.storage import read_dataset
 
 # --------------------------
-# Load artifacts
+# Artifacts (chargés par evaluate(), pas à l'import)
 # --------------------------
 MODEL_FILE = MODELS / "xgb_model.pkl"
 CALIB_FILE = MODELS / "calibrators.pkl"
@@ -24,66 +25,92 @@ FEATURE_COLS_FILE = MODELS / "feature_cols.json"
 MEDIANS_FILE = MODELS / "medians.json"
 DATASET = Path("data/processed/all_matches_features.csv")
 
-model = joblib.load(MODEL_FILE)
 
-try:
-    calibrator = joblib.load(CALIB_FILE)
-    USE_CALIBRATOR = True
-except:
-    calibrator = model
-    USE_CALIBRATOR = False
+def load_artifacts():
+    model = joblib.load(MODEL_FILE)
 
-with open(FEATURE_COLS_FILE, "r") as f:
-    FEATURE_COLS = json.load(f)
+    try:
+        calibrator = joblib.load(CALIB_FILE)
+        use_calibrator = True
+    except:
+        calibrator = model
+        use_calibrator = False
 
-with open(MEDIANS_FILE, "r") as f:
-    MEDIANS = json.load(f)
+    with open(FEATURE_COLS_FILE, "r") as f:
+        feature_cols = json.load(f)
 
+    with open(MEDIANS_FILE, "r") as f:
+        medians = json.load(f)
 
-# --------------------------
-# Load dataset
-# --------------------------
-print("📥 Loading dataset…")
-df = pd.read_csv(DATASET, low_memory=False)
+    return calibrator, use_calibrator, feature_cols, medians
 
-df = df[df["target_1x2"].isin([0, 1, 2])]
 
-X = df[FEATURE_COLS].copy()
-y = df["target_1x2"].copy()
+def _same_medians(a, b, cols):
+    # medians.json : arrondi à 10 décimales (to_json), NaN écrit null
+    if any(c not in a or c not in b for c in cols):
+        return False
+    x = np.array([a[c] for c in cols], dtype=float)
+    y = np.array([b[c] for c in cols], dtype=float)
+    return bool(np.allclose(x, y, rtol=1e-9, atol=1e-9, equal_nan=True))
 
-# Fill missing with medians
-X = X.fillna(MEDIANS)
 
+def evaluate():
+    calibrator, use_calibrator, feature_cols, medians = load_artifacts()
 
-# --------------------------
-# Prediction
-# --------------------------
-print("🔮 Predicting…")
+    # --------------------------
+    # Load dataset
+    # --------------------------
+    # Matrice memmap (déjà complétée par les médianes de l'entraînement) ;
+    # médianes différentes (modèle entraîné sur d'autres données) → CSV
+    fm = open_matrix(DATASET, feature_cols)
+    if _same_medians(fm.medians, medians, feature_cols):
+        print("📥 Loading feature matrix…")
+        X = fm.frame()
+        y = fm.y
+    else:
+        print("📥 Loading dataset…")
+        df = read_dataset(DATASET, columns=feature_cols + ["target_1x2"], schema=READ_SCHEMA)
 
-probs = calibrator.predict_proba(X)
-preds = np.argmax(probs, axis=1)
+        df = df[df["target_1x2"].isin([0, 1, 2])]
 
-# --------------------------
-# Metrics
-# --------------------------
-acc = accuracy_score(y, preds)
-cm = confusion_matrix(y, preds)
-ll = log_loss(y, probs)
+        X = df[feature_cols].copy()
+        y = df["target_1x2"].astype("int8")
+
+        # Fill missing with medians
+        X = X.fillna(medians)
+
+    # --------------------------
+    # Prediction
+    # --------------------------
+    print("🔮 Predicting…")
+
+    probs = calibrator.predict_proba(X)
+    preds = np.argmax(probs, axis=1)
+
+    # --------------------------
+    # Metrics
+    # --------------------------
+    acc = accuracy_score(y, preds)
+    cm = confusion_matrix(y, preds)
+    ll = log_loss(y, probs)
+
+    print("\n==============================")
+    print("📊 MODEL PERFORMANCE (XGB PRO)")
+    print("==============================\n")
 
-print("\n==============================")
-print("📊 MODEL PERFORMANCE (XGB PRO)")
-print("==============================\n")
+    print(f"✔ Accuracy: {acc*100:.2f}%")
+    print(f"✔ Log Loss: {ll:.4f}")
+    print("\nConfusion Matrix:")
+    print(cm)
 
-print(f"✔ Accuracy: {acc*100:.2f}%")
-print(f"✔ Log Loss: {ll:.4f}")
-print("\nConfusion Matrix:")
-print(cm)
+    print("\nClassification Report:")
+    print(classification_report(y, preds, digits=3))
 
-print("\nClassification Report:")
-print(classification_report(y, preds, digits=3))
+    print("\nCalibration:")
+    print(f"Calibrator used: {use_calibrator}")
 
-print("\nCalibration:")
-print(f"Calibrator used: {USE_CALIBRATOR}")
+    print("\nDone ✓")
 
-print("\nDone ✓")
 
+if __name__ == "__main__":
+    evaluate()
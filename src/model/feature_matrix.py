@@ -0,0 +1,156 @@
+# ============================================================
+# FEATURE MATRIX – APUESDATA
+# ============================================================
+#
+# Matrice d'entraînement figée sur disque (data/processed/feature_matrix/) :
+# - X.npy         : float32 contigu (lignes × feature_cols), inf → NaN → médianes
+#                   (médianes et remplissage calculés en float64)
+# - y.npy         : int8 (target_1x2 ∈ {0, 1, 2})
+# - rows.csv      : métadonnées par ligne (fixture_id, Date, équipes)
+# - manifest.json : colonnes, médianes, empreinte du dataset source
+#
+# Construite une fois par version du dataset / de la liste de features,
+# puis ouverte en memmap (np.load mmap_mode="r") : train, evaluate et
+# backtests démarrent sans relire le CSV et partagent les pages via le
+# cache de l'OS.
+#
+#   python -m src.model.feature_matrix    (construction si périmée)
+# ============================================================
+
+import json
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+from src.config import FEATURE_MATRIX, MODELS, PROCESSED
+from src.storage import read_dataset, resolve_dataset, write_dataset
+from utils.loader import SCHEMAS
+
+# ⚠️ Incrémenter si le contenu de la matrice change (nettoyage, dtypes…)
+MATRIX_VERSION = 2
+
+TARGET = "target_1x2"
+ROW_COLS = ["fixture_id", "Date", "HomeTeam", "AwayTeam"]
+
+DATASET = PROCESSED / "all_matches_features.csv"
+
+# Features lues en float64 (comme un read_csv brut) : médianes et
+# remplissage en float64, X converti en float32 seulement à l'écriture
+READ_SCHEMA = dict(SCHEMAS["features"], default=None)
+FEATURE_COLS_FILE = MODELS / "feature_cols.json"
+
+
+class FeatureMatrix:
+    """X (float32) / y (int8) en memmap + colonnes, médianes et métadonnées."""
+
+    def __init__(self, path, manifest):
+        self.path = Path(path)
+        self.manifest = manifest
+        self.feature_cols = manifest["feature_cols"]
+        self.medians = manifest["medians"]
+        self.X = np.load(self.path / "X.npy", mmap_mode="r")
+        self.y = np.load(self.path / "y.npy", mmap_mode="r")
+        self._rows = None
+
+    def __len__(self):
+        return len(self.y)
+
+    def frame(self):
+        """X en DataFrame (vue sur le memmap, noms de colonnes du modèle)."""
+        return pd.DataFrame(self.X, columns=self.feature_cols, copy=False)
+
+    @property
+    def rows(self):
+        """Métadonnées par ligne (fixture_id, Date, équipes), lues au premier accès."""
+        if self._rows is None:
+            self._rows = read_dataset(self.path / "rows.csv")
+        return self._rows
+
+
+def _fingerprint(dataset, feature_cols):
+    """Empreinte du dataset lu (fichier, mtime, taille) + liste de features."""
+    physical = resolve_dataset(dataset)
+    if physical is None:
+        raise FileNotFoundError(f"Dataset not found → {dataset}")
+    st = physical.stat()
+    return {
+        "version": MATRIX_VERSION,
+        "source": str(physical.resolve()),
+        "mtime_ns": st.st_mtime_ns,
+        "size": st.st_size,
+        "feature_cols": list(feature_cols),
+    }
+
+
+def _read_manifest(path):
+    try:
+        with open(Path(path) / "manifest.json") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+
+def _save_array(path, arr):
+    tmp = path.with_suffix(".tmp")
+    with open(tmp, "wb") as f:
+        np.save(f, np.ascontiguousarray(arr))
+    tmp.replace(path)
+
+
+def build_matrix(dataset=DATASET, feature_cols=None, path=FEATURE_MATRIX):
+    """
+    (Re)construit la matrice depuis `dataset` : même nettoyage que
+    l'entraînement (cible ∈ {0, 1, 2}, inf → NaN, NaN → médianes).
+    """
+    feature_cols = list(feature_cols if feature_cols is not None else load_feature_cols())
+    path = Path(path)
+    path.mkdir(parents=True, exist_ok=True)
+    key = _fingerprint(dataset, feature_cols)
+
+    print(f"🧱 Building feature matrix ({len(feature_cols)} features) from {Path(key['source']).name}…")
+    df = read_dataset(dataset, columns=ROW_COLS + feature_cols + [TARGET], schema=READ_SCHEMA)
+    df = df[df[TARGET].isin([0, 1, 2])]
+
+    values = df[feature_cols + [TARGET]].astype({TARGET: "float64"}).replace([np.inf, -np.inf], np.nan)
+    medians = values.median()
+
+    # Manifest retiré d'abord : une construction interrompue reste invalide
+    (path / "manifest.json").unlink(missing_ok=True)
+    _save_array(path / "X.npy", values[feature_cols].fillna(medians).to_numpy(dtype=np.float32))
+    _save_array(path / "y.npy", df[TARGET].to_numpy(dtype=np.int8))
+    write_dataset(df[[c for c in ROW_COLS if c in df.columns]].reset_index(drop=True), path / "rows.csv")
+
+    manifest = dict(key, n_rows=len(df), target=TARGET, medians={k: float(v) for k, v in medians.items()})
+    tmp = path / "manifest.tmp"
+    with open(tmp, "w") as f:
+        json.dump(manifest, f)
+    tmp.replace(path / "manifest.json")
+
+    print(f"💾 Feature matrix → {path}  ({len(df)} rows × {len(feature_cols)} features)")
+    return FeatureMatrix(path, manifest)
+
+
+def open_matrix(dataset=DATASET, feature_cols=None, path=FEATURE_MATRIX, build=True):
+    """
+    Matrice à jour pour `dataset` / `feature_cols` (memmap). Périmée ou
+    absente : reconstruite (build=True) ou None.
+    """
+    feature_cols = list(feature_cols if feature_cols is not None else load_feature_cols())
+    manifest = _read_manifest(path)
+    key = _fingerprint(dataset, feature_cols)
+    if manifest is not None and all(manifest.get(k) == v for k, v in key.items()):
+        return FeatureMatrix(path, manifest)
+    if not build:
+        return None
+    return build_matrix(dataset, feature_cols, path)
+
+
+def load_feature_cols():
+    with open(FEATURE_COLS_FILE) as f:
+        return json.load(f)
+
+
+if __name__ == "__main__":
+    fm = open_matrix()
+    print(f"✔ Feature matrix OK: {len(fm)} rows, X {fm.X.shape} {fm.X.dtype}, y {fm.y.dtype}")
@@ -5,6 +5,8 @@ import numpy as np
 import pickle
 from pathlib import Path
 
+from src.storage import read_dataset, write_dataset
+
 ROOT = Path(__file__).resolve().parents[2]
 DATA = ROOT / "data"
 PROCESSED = DATA / "processed"
@@ -22,7 +24,7 @@ def load_bundle():
 
 def predict_upcoming():
     print("📥 Loading upcoming PRO features…")
-    df = pd.read_csv(UPCOMING_FEATURES)
+    df = read_dataset(UPCOMING_FEATURES)
 
     scaler, model, calibrator, feat_cols = load_bundle()
 
@@ -47,8 +49,8 @@ def predict_upcoming():
     output["p_draw"] = preds[:, 1] * 100
     output["p_away"] = preds[:, 0] * 100
 
-    output.to_csv(OUTPUT, index=False)
-    print(f"💾 Saved calibrated predictions → {OUTPUT}")
+    saved = write_dataset(output, OUTPUT)
+    print(f"💾 Saved calibrated predictions → {saved}")
 
     return output
 
@@ -4,7 +4,6 @@
 
 import json
 import pandas as pd
-import numpy as np
 from pathlib import Path
 from sklearn.model_selection import train_test_split
 from sklearn.calibration import CalibratedClassifierCV
@@ -12,13 +11,17 @@ from xgboost import XGBClassifier
 import joblib
 
 from src.config import MODELS
+from src.model.feature_matrix import open_matrix
 
 # -----------------------------------------
-# Load feature columns
+# Feature columns (lues à l'entraînement, pas à l'import)
 # -----------------------------------------
 feature_cols_path = MODELS / "feature_cols.json"
-with open(feature_cols_path, "r") as f:
-    FEATURE_COLS = json.load(f)
+
+
+def load_feature_cols():
+    with open(feature_cols_path, "r") as f:
+        return json.load(f)
 
 # -----------------------------------------
 # Paths
@@ -33,27 +36,24 @@ MEDIANS_FILE = MODELS / "medians.json"
 # TRAINING FUNCTION
 # =========================================
 def train_model():
-    print("🔧 Loading dataset...")
+    print("🔧 Loading feature matrix...")
 
-    df = pd.read_csv(DATASET)
+    FEATURE_COLS = load_feature_cols()
 
     # --------- CLEANING ----------
-    df = df[df["target_1x2"].isin([0, 1, 2])]
-
-    df = df[FEATURE_COLS + ["target_1x2"]].copy()
-
-    df = df.replace([np.inf, -np.inf], np.nan)
-    medians = df.median()
-    df = df.fillna(medians)
+    # Cible ∈ {0, 1, 2}, inf → NaN, médianes : appliqués une seule fois
+    # à la construction de la matrice (memmap X float32 / y int8)
+    fm = open_matrix(DATASET, FEATURE_COLS)
 
+    medians = pd.Series(fm.medians)
     medians.to_json(MEDIANS_FILE)
     print(f"💾 Saved medians → {MEDIANS_FILE}")
 
     # -----------------------------------
     # SPLIT DATA
     # -----------------------------------
-    X = df[FEATURE_COLS]
-    y = df["target_1x2"]
+    X = fm.frame()
+    y = fm.y
 
     X_train, X_test, y_train, y_test = train_test_split(
         X, y, test_size=0.15, random_state=42, stratify=y
@@ -4,6 +4,7 @@ import pickle
 from pathlib import Path
 import numpy as np
 from src.model_loader import load_model_bundle
+from src.storage import read_dataset, write_dataset
 
 ROOT = Path(__file__).resolve().parents[2]
 DATA = ROOT / "data" / "processed"
@@ -14,7 +15,7 @@ OUT = DATA / "predictions_upcoming.csv"
 
 def predict():
     print("📥 Loading upcoming features from", FEATURES)
-    df = pd.read_csv(FEATURES)
+    df = read_dataset(FEATURES)
 
     # -------------------------
     # 1) Load model + metadata
@@ -57,8 +58,8 @@ def predict():
     # -------------------------
     # 4) Save final CSV
     # -------------------------
-    df.to_csv(OUT, index=False)
-    print("📦 Saved calibrated predictions →", OUT, "(shape=", df.shape, ")")
+    saved = write_dataset(df, OUT)
+    print("📦 Saved calibrated predictions →", saved, "(shape=", df.shape, ")")
     print("✔️ Predict upcoming fixtures OK")
 
 
@@ -0,0 +1,225 @@
+# =========================================
+# STORAGE LAYER – APUESDATA
+# =========================================
+#
+# Lecture / écriture des datasets processed derrière les chemins
+# de src/config.py (noms logiques en .csv) :
+# - format "parquet" (pyarrow) : fichier .parquet à côté du chemin
+#   logique, dtypes du schéma du fichier (utils.loader.SCHEMAS) fixés
+#   avant écriture, lecture des seules colonnes demandées
+# - format "csv" (ou pyarrow absent) : CSV comme avant
+# - export CSV optionnel en plus du Parquet (APUESDATA_CSV_EXPORT=1)
+# - écriture par blocs (rebuilds en flux / ajouts) : DatasetWriter
+#
+# Les lecteurs prennent la version la plus récente qui existe
+# (.parquet ou .csv), ce qui permet de changer de format sans migration.
+#
+#   python -m src.storage data/processed/all_matches_features.csv   (CSV → Parquet)
+# =========================================
+
+import os
+import sys
+from pathlib import Path
+
+import pandas as pd
+
+from utils import loader
+from utils.loader import cast, load_dataset, memory_report, schema_for, to_dates
+
+try:
+    import pyarrow  # noqa: F401
+except ImportError:  # pyarrow optionnel : tout reste en CSV
+    pyarrow = None
+
+STORAGE_FORMAT = os.getenv("APUESDATA_STORAGE", "parquet").lower()
+CSV_EXPORT = os.getenv("APUESDATA_CSV_EXPORT", "0") == "1"
+
+DATE_COLS = ("Date",)
+
+
+def parquet_enabled(fmt=None):
+    return (fmt or STORAGE_FORMAT) == "parquet" and pyarrow is not None
+
+
+def parquet_path(path):
+    return Path(path).with_suffix(".parquet")
+
+
+def dataset_target(path, fmt=None):
+    """Fichier principal écrit pour le chemin logique `path` (voir write_dataset)."""
+    return parquet_path(path) if parquet_enabled(fmt) else Path(path)
+
+
+def resolve_dataset(path):
+    """
+    Fichier physique à lire pour le chemin logique `path` : la version la
+    plus récente entre .parquet (si pyarrow) et .csv ; None si aucune.
+    """
+    path = Path(path)
+    candidates = [p for p in (parquet_path(path), path) if p.exists()]
+    if pyarrow is None:
+        candidates = [p for p in candidates if p.suffix != ".parquet"]
+    if not candidates:
+        return None
+    return max(candidates, key=lambda p: p.stat().st_mtime_ns)
+
+
+def dataset_exists(path):
+    return resolve_dataset(path) is not None
+
+
+def read_dataset(path, columns=None, date_cols=DATE_COLS, schema=None, report=None):
+    """
+    Charge le dataset logique `path` (Parquet ou CSV, voir resolve_dataset)
+    aux dtypes de son schéma (utils.loader.SCHEMAS ; None : d'après le nom).
+    columns : seules ces colonnes sont lues (celles absentes du fichier
+    sont ignorées). Dates converties en datetime64. FileNotFoundError si absent.
+    report : rapport mémoire (défaut : utils.loader.REPORT_MEMORY).
+    """
+    physical = resolve_dataset(path)
+    if physical is None:
+        raise FileNotFoundError(f"Dataset not found → {path}")
+    schema = schema_for(path) if schema is None else schema
+
+    if physical.suffix == ".parquet":
+        if columns is not None:
+            import pyarrow.parquet as pq
+            available = set(pq.read_schema(physical).names)
+            columns = [c for c in columns if c in available]
+        df = cast(pd.read_parquet(physical, columns=columns), schema)
+        if loader.REPORT_MEMORY if report is None else report:
+            memory_report(df, physical.name)
+    else:
+        df = load_dataset(physical, schema=schema, columns=columns, report=report)
+
+    for col in date_cols:
+        if col in df.columns:
+            df[col] = to_dates(df[col])
+    return df
+
+
+def write_dataset(df, path, fmt=None, csv=None, schema=None):
+    """
+    Écrit df au chemin logique `path` : Parquet typé (+ CSV si csv / CSV_EXPORT),
+    ou CSV seul si format "csv" ou pyarrow absent. Retourne le fichier principal.
+    """
+    path = Path(path)
+    if not parquet_enabled(fmt):
+        tmp = path.with_suffix(".csv.tmp")
+        df.to_csv(tmp, index=False)
+        tmp.replace(path)
+        return path
+
+    # Export CSV d'abord : le Parquet reste la version la plus récente (lue en priorité)
+    if CSV_EXPORT if csv is None else csv:
+        df.to_csv(path, index=False)
+
+    target = parquet_path(path)
+    tmp = target.with_suffix(".parquet.tmp")
+    cast(df.copy(), schema, path=path).to_parquet(tmp, index=False)
+    tmp.replace(target)
+    return target
+
+
+class DatasetWriter:
+    """
+    Écriture par blocs du dataset logique `path` (rebuilds en flux), même
+    format que write_dataset :
+    - CSV : blocs ajoutés au fichier, position = offset en octets
+    - Parquet : un row group par bloc (dtypes du schéma), position = nb de
+      lignes ; fichier remplacé à la fermeture
+    resume : position (tell) d'un writer précédent de même format → le
+    dataset est tronqué à cette position puis complété. CSV : troncature
+    en place ; Parquet : lignes conservées relues et réécrites (pas
+    d'ajout possible dans un Parquet).
+    """
+
+    def __init__(self, path, fmt=None, csv=None, schema=None, resume=None):
+        self.path = Path(path)
+        self.schema = schema_for(path) if schema is None else schema
+        self.parquet = parquet_enabled(fmt)
+        self.target = dataset_target(path, fmt)
+        self._rows = 0
+        self._header = True
+        self._writer = None
+        self._columns = None
+        self._csv = None
+
+        if not self.parquet:
+            if resume is None:
+                self._csv = open(self.path, "wb")
+            else:
+                self._csv = open(self.path, "r+b")
+                self._csv.seek(resume)
+                self._csv.truncate()
+                self._header = False
+            return
+
+        kept = pd.read_parquet(self.target).iloc[:resume] if resume else None
+        if CSV_EXPORT if csv is None else csv:
+            self._csv = open(self.path, "wb")
+        self._tmp = self.target.with_suffix(".parquet.tmp")
+        if kept is not None:
+            self.write(kept)
+
+    def write(self, df):
+        if self._csv is not None:
+            self._csv.write(df.to_csv(index=False, header=self._header).encode("utf-8"))
+            self._header = False
+        if not self.parquet:
+            return
+        if df.empty:
+            # Colonnes retenues pour un dataset vide (aucun row group écrit)
+            self._columns = list(df.columns) if self._columns is None else self._columns
+            return
+
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+        table = pa.Table.from_pandas(cast(df.copy(), self.schema, path=self.path), preserve_index=False)
+        if self._writer is None:
+            self._writer = pq.ParquetWriter(self._tmp, table.schema)
+        else:
+            table = table.cast(self._writer.schema)
+        self._writer.write_table(table)
+        self._rows += len(df)
+
+    def tell(self):
+        return self._rows if self.parquet else self._csv.tell()
+
+    def close(self, abort=False):
+        if self._csv is not None:
+            self._csv.close()
+        if self.parquet and abort:
+            # Erreur en cours d'écriture : le Parquet précédent reste en place
+            if self._writer is not None:
+                self._writer.close()
+            self._tmp.unlink(missing_ok=True)
+        elif self.parquet:
+            if self._writer is None:
+                pd.DataFrame(columns=self._columns or []).to_parquet(self._tmp, index=False)
+            else:
+                self._writer.close()
+            self._tmp.replace(self.target)
+        return self.target
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, *exc):
+        self.close(abort=exc_type is not None)
+
+
+def convert(path):
+    """Convertit un CSV existant en Parquet typé (même chemin logique)."""
+    df = read_dataset(path)
+    target = write_dataset(df, path, fmt="parquet", csv=False)
+    print(f"💾 {path} → {target} ({len(df)} rows, {df.shape[1]} columns)")
+    return target
+
+
+if __name__ == "__main__":
+    if pyarrow is None:
+        print("❌ pyarrow is not installed: pip install pyarrow")
+        sys.exit(1)
+    for arg in sys.argv[1:]:
+        convert(Path(arg))
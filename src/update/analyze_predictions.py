@@ -1,5 +1,6 @@
 import pandas as pd
 from src.config import PROCESSED
+from src.storage import read_dataset
 
 def normalize_column(df, name_options):
     """Choisit la 1ère colonne existante parmi plusieurs noms possibles."""
@@ -10,7 +11,7 @@ def normalize_column(df, name_options):
 
 
 def analyze():
-    df = pd.read_csv(PROCESSED / "predictions_upcoming.csv")
+    df = read_dataset(PROCESSED / "predictions_upcoming.csv")
 
     # Detect column names dynamically
     col_home = normalize_column(df, ["HomeTeam", "home_team", "home"])
@@ -2,6 +2,7 @@ import pandas as pd
 from pathlib import Path
 
 from src.config import RAW, RAW_FIX, RAW_RES
+from utils.loader import load_dataset
 
 def bootstrap_history():
     history_file = RAW / "history" / "history.csv"
@@ -10,10 +11,8 @@ def bootstrap_history():
         print("❌ history.csv not found.")
         return
 
-    df = pd.read_csv(history_file)
-
-    # Standard columns
-    df["Date"] = pd.to_datetime(df["Date"], errors="coerce")
+    # Standard columns (dates converties par le schéma "history")
+    df = load_dataset(history_file, schema="history")
 
     # Fixtures file (everything)
     df.to_csv(RAW_FIX, index=False)
@@ -1,57 +1,215 @@
 # =============================================
 # BUILD HISTORY FROM MULTIPLE CSVs (APUESDATA)
 # =============================================
-import pandas as pd
+#
+# Ingestion des fichiers football-data (data/raw/csv/*.csv : B1.csv,
+# "B1 (10).csv", E0.csv…) :
+# - un fichier = une tâche d'un pool de processus (lecture C typée :
+#   seules les colonnes conservées, cotes en float32)
+# - colonnes ramenées au schéma canonique de l'historique
+#   (FTHG → HomeGoals, Home → HomeTeam, BbMxH → MaxH, PH → PSH…) :
+#   division, date, équipes, buts et toutes les cotes (ODDS_PREFIXES)
+# - résultats envoyés au store partitionné (src/history_store.py) par
+#   lots de BATCH_ROWS lignes, au fil de la lecture
+#
+#   python -m src.update.build_history_from_csv [--workers N] [--no-store]
+# =============================================
+import argparse
+import csv
+import re
+from multiprocessing import get_context
 from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
 from src.config import RAW, HISTORY
+from src.features.parallel import _resolve_workers
+from src.history_store import MATCH_KEY, append_history
+from utils import loader
+from utils.loader import ODDS_PREFIXES, cast, memory_report, to_dates
+
+BASE_COLUMNS = ["Div", "Season", "Date", "HomeTeam", "AwayTeam", "HomeGoals", "AwayGoals"]
+REQUIRED = ["Date", "HomeTeam", "AwayTeam", "HomeGoals", "AwayGoals"]
+
+# Noms football-data (anciens formats, fichiers "extra leagues") → schéma canonique
+COLUMN_ALIASES = {
+    "FTHG": "HomeGoals", "HG": "HomeGoals",
+    "FTAG": "AwayGoals", "AG": "AwayGoals",
+    "Home": "HomeTeam", "Away": "AwayTeam",
+    # Max / moyenne marché avant 2019/2020 (Betbrain)
+    "BbMxH": "MaxH", "BbMxD": "MaxD", "BbMxA": "MaxA",
+    "BbAvH": "AvgH", "BbAvD": "AvgD", "BbAvA": "AvgA",
+    "BbMx>2.5": "Max>2.5", "BbMx<2.5": "Max<2.5",
+    "BbAv>2.5": "Avg>2.5", "BbAv<2.5": "Avg<2.5",
+    # Pinnacle dans les fichiers "extra leagues"
+    "PH": "PSH", "PD": "PSD", "PA": "PSA",
+}
+
+# Dates football-data : jour d'abord (16/08/2024, puis 16/08/24)
+DATE_FORMATS = ("%d/%m/%Y", "%d/%m/%y")
+
+# dtypes de lecture (objets NumPy : pas de résolution de chaîne par colonne)
+GOALS_DTYPE = np.dtype("float64")
+ODDS_DTYPE = np.dtype("float32")
+
+# Lignes accumulées avant chaque écriture dans le store
+BATCH_ROWS = 100_000
+
+
+# ---------------------------------------------
+# Lecture d'un fichier (worker)
+# ---------------------------------------------
+def canonical_columns(columns):
+    """{colonne du fichier: colonne canonique} des colonnes conservées (première occurrence)."""
+    out = {}
+    for col in columns:
+        name = COLUMN_ALIASES.get(col.strip(), col.strip())
+        if (name in BASE_COLUMNS or name.startswith(ODDS_PREFIXES)) and name not in out.values():
+            out[col] = name
+    return out
+
+
+def parse_dates(values):
+    """
+    Dates football-data (jour d'abord) : format choisi une fois par fichier
+    d'après la première valeur ; le reste via utils.loader.to_dates.
+    """
+    s = values.str.strip()
+    first = s.dropna()
+    fmt = DATE_FORMATS[0] if len(first) and len(first.iloc[0]) == 10 else DATE_FORMATS[1]
+    out = pd.to_datetime(s, format=fmt, errors="coerce")
+    bad = out.isna() & s.notna()
+    if bad.any():
+        out[bad] = to_dates(s[bad])
+    return out
+
+
+def _read(path, encoding):
+    with open(path, newline="", encoding=encoding) as f:
+        header = next(csv.reader(f), [])
+    mapping = canonical_columns(header)
+    # Buts lus en float64 (NA possible), cotes en float32, le reste en texte
+    dtypes = {
+        col: GOALS_DTYPE if name in ("HomeGoals", "AwayGoals") else ODDS_DTYPE if name.startswith(ODDS_PREFIXES) else str
+        for col, name in mapping.items()
+    }
+    try:
+        df = pd.read_csv(path, usecols=list(mapping), dtype=dtypes, encoding=encoding)
+    except (ValueError, TypeError):
+        # Valeur non numérique (ex. "-" dans une cote) : conversion avec coercition par cast
+        df = pd.read_csv(path, usecols=list(mapping), dtype=str, encoding=encoding)
+    return df.rename(columns=mapping)
 
-def build_history():
-    csv_folder = RAW / "csv"
+
+def read_football_data(path):
+    """Un fichier football-data au schéma canonique (ValueError si colonnes manquantes)."""
+    path = Path(path)
+    try:
+        df = _read(path, "utf-8-sig")
+    except UnicodeDecodeError:
+        df = _read(path, "latin-1")
+
+    missing = [c for c in REQUIRED if c not in df.columns]
+    if missing:
+        raise ValueError(f"colonnes manquantes = {missing}")
+
+    if "Div" not in df.columns:
+        # Fichiers "extra leagues" (ARG.csv…) : la division est le nom du fichier
+        df.insert(0, "Div", re.sub(r"\s*\(\d+\)$", "", path.stem))
+
+    df["Date"] = parse_dates(df["Date"])
+    df = df.dropna(subset=["Date", "HomeTeam", "AwayTeam"])
+    df["HomeTeam"] = df["HomeTeam"].str.strip()
+    df["AwayTeam"] = df["AwayTeam"].str.strip()
+
+    cols = [c for c in BASE_COLUMNS if c in df.columns]
+    return df[cols + [c for c in df.columns if c not in cols]].reset_index(drop=True)
+
+
+def _ingest_file(path):
+    try:
+        return path.name, read_football_data(path), None
+    except Exception as e:
+        return path.name, None, str(e)
+
+
+def _ingested(files, workers):
+    """(nom, DataFrame, erreur) par fichier, dans l'ordre de `files`."""
+    if workers == 1:
+        yield from map(_ingest_file, files)
+        return
+    ctx = get_context()
+    with ctx.Pool(workers) as pool:
+        yield from pool.imap(_ingest_file, files, chunksize=4)
+
+
+def _merge(frames):
+    return cast(pd.concat(frames, ignore_index=True), "history")
+
+
+# ---------------------------------------------
+# Construction de l'historique
+# ---------------------------------------------
+def build_history(workers=None, store=True, csv_folder=None):
+    csv_folder = Path(csv_folder or RAW / "csv")
     output_file = HISTORY / "all_history.csv"
 
     print(f"📂 Loading CSV files from: {csv_folder}")
 
-    files = list(csv_folder.glob("*.csv"))
+    files = sorted(csv_folder.glob("*.csv"))
     if not files:
         print("❌ Aucun fichier CSV trouvé dans /data/raw/csv")
         return
 
+    workers = min(_resolve_workers(workers), len(files))
+    print(f"⚙️ {len(files)} files, {workers} worker(s)")
+
     all_rows = []
+    batch, batch_rows = [], 0
 
-    for f in files:
-        try:
-            df = pd.read_csv(f)
-        except Exception as e:
-            print(f"⚠️ Erreur lecture {f.name} : {e}")
+    for name, df, error in _ingested(files, workers):
+        if error is not None:
+            print(f"⚠️ {name} ignoré : {error}")
             continue
 
-        # Normalisation colonnes attendues
-        expected = ["Date", "HomeTeam", "AwayTeam", "HomeGoals", "AwayGoals"]
+        print(f"✔️ Loaded {name} ({df.shape[0]} rows)")
+        all_rows.append(df)
 
-        missing = [c for c in expected if c not in df.columns]
-        if missing:
-            print(f"⚠️ {f.name} ignoré : colonnes manquantes = {missing}")
-            continue
+        # Store alimenté au fil de l'eau : un lot = quelques partitions réécrites
+        if store:
+            batch.append(df)
+            batch_rows += len(df)
+            if batch_rows >= BATCH_ROWS:
+                append_history(_merge(batch))
+                batch, batch_rows = [], 0
 
-        print(f"✔️ Loaded {f.name} ({df.shape[0]} rows)")
-        all_rows.append(df[expected])
+    if store and batch:
+        append_history(_merge(batch))
 
     if not all_rows:
         print("❌ Aucun CSV valide lu.")
         return
 
-    df_all = pd.concat(all_rows, ignore_index=True)
+    df_all = _merge(all_rows)
 
-    df_all = df_all.drop_duplicates()
-    df_all = df_all.sort_values("Date")
+    # Même match présent dans plusieurs fichiers : dernière version
+    df_all = df_all.drop_duplicates(subset=MATCH_KEY, keep="last")
+    df_all = df_all.sort_values("Date", kind="stable").reset_index(drop=True)
 
     output_file.parent.mkdir(parents=True, exist_ok=True)
     df_all.to_csv(output_file, index=False)
 
+    if loader.REPORT_MEMORY:
+        memory_report(df_all, output_file.name)
     print(f"\n💾 Fichier historique créé : {output_file}")
     print(f"➡️ Total lignes : {df_all.shape[0]}")
     return df_all
 
 
 if __name__ == "__main__":
-    build_history()
+    parser = argparse.ArgumentParser(description="Historique depuis les CSV football-data.")
+    parser.add_argument("--workers", type=int, default=None)
+    parser.add_argument("--no-store", action="store_true", help="all_history.csv seulement")
+    args = parser.parse_args()
+    build_history(workers=args.workers, store=not args.no_store)
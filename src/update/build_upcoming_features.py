@@ -2,6 +2,9 @@ import os
 import pandas as pd
 from pathlib import Path
 
+from src.storage import dataset_exists, read_dataset, write_dataset
+from utils.loader import load_dataset
+
 ROOT = Path(__file__).resolve().parents[2]
 PROCESSED = ROOT / "data" / "processed"
 
@@ -13,14 +16,14 @@ OUT = PROCESSED / "predictions_upcoming_features.csv"
 def build_upcoming_features():
     print("🔧 Loading datasets...")
 
-    if not HIST.exists():
+    if not dataset_exists(HIST):
         raise FileNotFoundError(f"❌ Missing historical features: {HIST}")
 
     if not UPCOMING.exists():
         raise FileNotFoundError(f"❌ Missing upcoming API file: {UPCOMING}")
 
-    df_hist = pd.read_csv(HIST, parse_dates=["Date"], low_memory=False)
-    df_upc = pd.read_csv(UPCOMING)
+    df_hist = read_dataset(HIST)
+    df_upc = load_dataset(UPCOMING, schema="upcoming")
 
     print(f"📥 History: {df_hist.shape}")
     print(f"📥 Upcoming: {df_upc.shape}")
@@ -56,9 +59,9 @@ def build_upcoming_features():
 
     # Sauvegarde
     os.makedirs(PROCESSED, exist_ok=True)
-    df.to_csv(OUT, index=False)
+    saved = write_dataset(df, OUT)
 
-    print(f"💾 Saved: {OUT} (shape={df.shape})")
+    print(f"💾 Saved: {saved} (shape={df.shape})")
     print("✔ Upcoming features ready for prediction.")
 
 
@@ -4,108 +4,94 @@
 
 import pandas as pd
 import numpy as np
-from pathlib import Path
-from tqdm import tqdm
 import json
-from src.config import DATA, MODELS
+from src.config import DATA, MODELS, UPCOMING_FEATURES
+from src.features.asof_join import snapshot_covers, team_keys
+from src.features.registry import build_feature_frame, resolve
+from src.update.elo_advanced import load_elo_state
+from src.update.rebuild_features_pro import load_team_snapshot
+from src.storage import read_dataset, write_dataset
+from utils.loader import load_dataset
 
-# Load feature list expected by model
-FEATURE_COLS = json.load(open(MODELS / "feature_cols.json"))
+FEATURE_COLS_FILE = MODELS / "feature_cols.json"
+HISTORY_FILE = DATA / "processed" / "all_matches_features.csv"
 
-# Load historical dataset (full features)
-HISTORY = pd.read_csv(DATA / "processed" / "all_matches_features.csv", low_memory=False)
-HISTORY["Date"] = pd.to_datetime(HISTORY["Date"], errors="coerce")
+# Colonnes de l'historique utilisées par le registre (jointure as-of)
+HISTORY_COLUMNS = ["Date", "HomeTeam", "AwayTeam", "HomeGoals", "AwayGoals", "elo_home", "elo_away"]
 
-# Fast indexes
-INDEXED = {
-    "teams": list(set(HISTORY["HomeTeam"]) | set(HISTORY["AwayTeam"]))
-}
+# Données chargées au premier accès (import sans lecture de fichier)
+_CACHE = {}
 
 
-# ----------------------------------------------------------
-# Helper: last N match stats
-# ----------------------------------------------------------
-def last_n_matches(team, n):
-    df = HISTORY[(HISTORY["HomeTeam"] == team) | (HISTORY["AwayTeam"] == team)]
-    df = df.sort_values("Date").tail(n)
+def load_feature_cols():
+    """Feature list expected by model."""
+    if "feature_cols" not in _CACHE:
+        with open(FEATURE_COLS_FILE) as f:
+            _CACHE["feature_cols"] = json.load(f)
+    return _CACHE["feature_cols"]
 
-    if df.empty:
-        return {
-            "gf": 0, "ga": 0, "pts": 0, "btts": 0, "over25": 0
-        }
 
-    gf, ga, pts, btts, over25 = [], [], [], [], []
+def load_history():
+    """Historical dataset (full features)."""
+    if "history" not in _CACHE:
+        _CACHE["history"] = read_dataset(HISTORY_FILE, columns=HISTORY_COLUMNS)
+    return _CACHE["history"]
 
-    for _, m in df.iterrows():
-        if m["HomeTeam"] == team:
-            g_for, g_against = m["HomeGoals"], m["AwayGoals"]
-        else:
-            g_for, g_against = m["AwayGoals"], m["HomeGoals"]
 
-        gf.append(g_for)
-        ga.append(g_against)
+def get_indexed():
+    """Fast indexes."""
+    if "indexed" not in _CACHE:
+        history = load_history()
+        _CACHE["indexed"] = {
+            "teams": list(set(history["HomeTeam"]) | set(history["AwayTeam"]))
+        }
+    return _CACHE["indexed"]
 
-        pts.append(3 if g_for > g_against else 1 if g_for == g_against else 0)
-        btts.append(1 if g_for > 0 and g_against > 0 else 0)
-        over25.append(1 if (g_for + g_against) >= 3 else 0)
 
-    return {
-        "gf": np.mean(gf),
-        "ga": np.mean(ga),
-        "pts": np.mean(pts),
-        "btts": np.mean(btts),
-        "over25": np.mean(over25),
-    }
+def clear_cache():
+    _CACHE.clear()
 
 
-# ----------------------------------------------------------
-# Season-level stats
-# ----------------------------------------------------------
-def season_stats(team):
-    df = HISTORY[(HISTORY["HomeTeam"] == team) | (HISTORY["AwayTeam"] == team)]
+_LAZY = {"FEATURE_COLS": load_feature_cols, "HISTORY": load_history, "INDEXED": get_indexed}
 
-    if df.empty:
-        return {
-            "winrate": 0, "drawrate": 0, "lossrate": 0,
-            "gf_avg": 0, "ga_avg": 0
-        }
 
-    wins, draws, losses, gf, ga = 0, 0, 0, 0, 0
+def __getattr__(name):
+    # Compatibilité : FEATURE_COLS / HISTORY / INDEXED restent des attributs du module
+    if name in _LAZY:
+        return _LAZY[name]()
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
 
-    for _, m in df.iterrows():
-        if m["HomeTeam"] == team:
-            g_for, g_against = m["HomeGoals"], m["AwayGoals"]
-        else:
-            g_for, g_against = m["AwayGoals"], m["HomeGoals"]
 
-        gf += g_for
-        ga += g_against
+def warn_unknown_teams(up, known):
+    """Signale les fixtures dont une équipe est inconnue (features d'équipe NaN)."""
+    known = set(known)
+    found = [np.isin(team_keys(up[col]), list(known)) for col in ("HomeTeam", "AwayTeam")]
+    missing = ~(found[0] & found[1])
+    if missing.any():
+        print(f"⚠️ {int(missing.sum())}/{len(up)} fixture(s) with a team unknown to the history → NaN team features.")
+    return int(missing.sum())
 
-        if g_for > g_against:
-            wins += 1
-        elif g_for == g_against:
-            draws += 1
-        else:
-            losses += 1
 
-    total = len(df)
-    return {
-        "winrate": wins / total,
-        "drawrate": draws / total,
-        "lossrate": losses / total,
-        "gf_avg": gf / total,
-        "ga_avg": ga / total
-    }
+def placeholder_cols(feature_cols, available):
+    """Features que les fixtures ne peuvent pas fournir : hors registre, ou colonne brute absente."""
+    features, unknown, _ = resolve(feature_cols)
+    raw_missing = [
+        f.name for f in features
+        if f.requires and all(k[0] == "column" and k[1] not in available for k in f.requires)
+    ]
+    return unknown + raw_missing
 
 
 # ----------------------------------------------------------
 # MAIN BUILD FUNCTION
 # ----------------------------------------------------------
 def build():
-    print(f"📌 Model expects {len(FEATURE_COLS)} features.")
+    feature_cols = load_feature_cols()
+    print(f"📌 Model expects {len(feature_cols)} features.")
 
     # Load API fixtures
-    upcoming = pd.read_csv(DATA / "raw" / "upcoming_api.csv")
+    # Dates (ISO8601 → naïves UTC), équipes catégorielles : voir utils.loader
+    upcoming = load_dataset(DATA / "raw" / "upcoming_api.csv", schema="upcoming")
 
     upcoming.rename(columns={
         "home_name": "HomeTeam",
@@ -113,81 +99,45 @@ def build():
         "date": "Date",
     }, inplace=True)
 
-    upcoming["Date"] = pd.to_datetime(upcoming["Date"], errors="coerce")
     up = upcoming.dropna(subset=["HomeTeam", "AwayTeam"])
 
     print(f"📚 Loaded {len(up)} upcoming fixtures.")
 
-    rows = []
-
-    for _, r in tqdm(up.iterrows(), total=len(up)):
-        home, away = r["HomeTeam"], r["AwayTeam"]
-
-        # Retrieve stats
-        h5 = last_n_matches(home, 5)
-        a5 = last_n_matches(away, 5)
-        h10 = last_n_matches(home, 10)
-        a10 = last_n_matches(away, 10)
-
-        sh = season_stats(home)
-        sa = season_stats(away)
-
-        row = {
-            "elo_home": 1500,  # placeholder if missing
-            "elo_away": 1500,
-            "home_gf_avg_last_5": h5["gf"],
-            "home_ga_avg_last_5": h5["ga"],
-            "home_points_avg_last_5": h5["pts"],
-            "home_btts_rate_last_5": h5["btts"],
-            "home_over25_rate_last_5": h5["over25"],
-            "home_gf_avg_last_10": h10["gf"],
-            "home_ga_avg_last_10": h10["ga"],
-            "home_points_avg_last_10": h10["pts"],
-            "home_btts_rate_last_10": h10["btts"],
-            "home_over25_rate_last_10": h10["over25"],
-
-            "away_gf_avg_last_5": a5["gf"],
-            "away_ga_avg_last_5": a5["ga"],
-            "away_points_avg_last_5": a5["pts"],
-            "away_btts_rate_last_5": a5["btts"],
-            "away_over25_rate_last_5": a5["over25"],
-            "away_gf_avg_last_10": a10["gf"],
-            "away_ga_avg_last_10": a10["ga"],
-            "away_points_avg_last_10": a10["pts"],
-            "away_btts_rate_last_10": a10["btts"],
-            "away_over25_rate_last_10": a10["over25"],
-
-            "home_winrate_season": sh["winrate"],
-            "home_drawrate_season": sh["drawrate"],
-            "home_lossrate_season": sh["lossrate"],
-            "home_goals_for_avg_season": sh["gf_avg"],
-            "home_goals_against_avg_season": sh["ga_avg"],
-
-            "away_winrate_season": sa["winrate"],
-            "away_drawrate_season": sa["drawrate"],
-            "away_lossrate_season": sa["lossrate"],
-            "away_goals_for_avg_season": sa["gf_avg"],
-            "away_goals_against_avg_season": sa["ga_avg"],
-
-            # BOOKMAKER placeholders (0 to avoid crash)
-            "BWH": 0, "BWD": 0, "BWA": 0,
-            "IWH": 0, "IWD": 0, "IWA": 0,
-            "WHH": 0, "WHD": 0, "WHA": 0,
-            "VCH": 0, "VCD": 0, "VCA": 0,
-        }
-
-        # Add missing columns that model expects but not produced
-        for col in FEATURE_COLS:
-            if col not in row:
-                row[col] = row.get(col, 0)
-
-        rows.append(row)
-
-    df = pd.DataFrame(rows)
-
-    df.to_csv(DATA / "processed" / "predictions_upcoming_features.csv", index=False)
-
-    print(f"💾 Saved → {DATA / 'processed/predictions_upcoming_features.csv'} (shape={df.shape})")
+    # Elo courant (store incrémental) ; équipes inconnues → as-of historique
+    elo = load_elo_state()
+    if elo is not None:
+        up = up.assign(
+            elo_home=elo.lookup(up["HomeTeam"]),
+            elo_away=elo.lookup(up["AwayTeam"]),
+        )
+    else:
+        print("⚠️ No Elo state → Elo as-of history.")
+
+    # Features déclarées dans le registre : seules celles du modèle
+    # (et leurs intermédiaires) sont calculées. État des équipes lu par
+    # clé dans le snapshot du rebuild ; historique complet en secours.
+    snapshot = load_team_snapshot()
+    if snapshot is not None and snapshot_covers(up, snapshot):
+        feats = build_feature_frame(up, feature_cols, snapshot=snapshot)
+        warn_unknown_teams(up, snapshot["team"])
+    else:
+        print("⚠️ No usable team snapshot → as-of join on full history.")
+        history = load_history()
+        feats = build_feature_frame(up, feature_cols, history=history)
+        warn_unknown_teams(up, np.concatenate([team_keys(history["HomeTeam"]), team_keys(history["AwayTeam"])]))
+
+    # Comme l'ancien builder : features hors registre ou colonnes brutes
+    # absentes des fixtures (cotes) à 0 (placeholder), colonnes du modèle
+    # en tête, méta des fixtures à la suite (predict_* sélectionne les
+    # features par nom).
+    feats[placeholder_cols(feature_cols, up.columns)] = 0
+    meta = [c for c in ("fixture_id", "Date", "league_id", "HomeTeam", "AwayTeam")
+            if c in up.columns and c not in feats.columns]
+    df = pd.concat([feats, up[meta].reset_index(drop=True)], axis=1)
+
+    saved = write_dataset(df, UPCOMING_FEATURES)
+
+    print(f"💾 Saved → {saved} (shape={df.shape})")
     print("✔ build_upcoming_features_pro OK.")
 
 
@@ -6,6 +6,7 @@ import pandas as pd
 import numpy as np
 from pathlib import Path
 from src.config import PROCESSED
+from src.storage import read_dataset, write_dataset
 
 PRED_FILE = PROCESSED / "predictions_upcoming.csv"
 OUTPUT_FILE = PROCESSED / "bets_recommendations.csv"
@@ -13,7 +14,7 @@ OUTPUT_FILE = PROCESSED / "bets_recommendations.csv"
 def compute_value_bets():
     print(f"📥 Loading predictions from {PRED_FILE}")
 
-    df = pd.read_csv(PRED_FILE)
+    df = read_dataset(PRED_FILE)
 
     # Ensure required columns exist
     required = ["fixture_id", "HomeTeam", "AwayTeam",
@@ -58,8 +59,8 @@ def compute_value_bets():
         })
 
     out = pd.DataFrame(rows)
-    out.to_csv(OUTPUT_FILE, index=False)
-    print(f"💾 Saved value bets → {OUTPUT_FILE}")
+    saved = write_dataset(out, OUTPUT_FILE)
+    print(f"💾 Saved value bets → {saved}")
 
 
 if __name__ == "__main__":
@@ -1,6 +1,18 @@
+import os
+import pickle
+from pathlib import Path
+
 import pandas as pd
 import numpy as np
 
+from utils.loader import load_dataset
+from utils.standardize_features import normalize_team_name
+
+try:
+    from numba import njit
+except ImportError:  # Numba optionnel : boucle Python sur listes sinon
+    njit = None
+
 # --------------------------------------------------
 # Advanced Elo System for APUESDATA
 # --------------------------------------------------
@@ -26,26 +38,386 @@ def update_elo(r_home, r_away, goals_home, goals_away):
 
     return new_home, new_away
 
-def compute_elo(df):
-    teams = pd.unique(df[["HomeTeam", "AwayTeam"]].values.ravel())
-    ratings = {t: 1500 for t in teams}
-
-    elo_home_list = []
-    elo_away_list = []
+def _elo_kernel(home, away, goals_home, goals_away, ratings, out_home, out_away, k, home_adv,
+                season, last_season, regress, mean):
+    """
+    Boucle séquentielle sur codes équipe entiers (même arithmétique
+    que update_elo / expected_score, dans le même ordre).
+    regress > 0 : au 1er match d'une nouvelle saison, le rating de
+    l'équipe est ramené vers `mean` (r = mean + (1 - regress) * (r - mean)).
+    Compilée par Numba si disponible, sinon exécutée sur des listes.
+    """
+    for i in range(len(home)):
+        h = home[i]
+        a = away[i]
 
-    for _, row in df.iterrows():
-        h, a = row["HomeTeam"], row["AwayTeam"]
-        hg, ag = row["HomeGoals"], row["AwayGoals"]
+        if regress > 0.0:
+            sn = season[i]
+            if last_season[h] >= 0 and last_season[h] != sn:
+                ratings[h] = mean + (1 - regress) * (ratings[h] - mean)
+            if last_season[a] >= 0 and last_season[a] != sn:
+                ratings[a] = mean + (1 - regress) * (ratings[a] - mean)
+            last_season[h] = sn
+            last_season[a] = sn
 
         r_home = ratings[h]
         r_away = ratings[a]
+        out_home[i] = r_home
+        out_away[i] = r_away
+
+        exp_home = 1 / (1 + 10 ** ((r_away - (r_home + home_adv)) / 400))
+
+        hg = goals_home[i]
+        ag = goals_away[i]
+        if hg > ag:
+            s_home = 1.0
+        elif hg == ag:
+            s_home = 0.5
+        else:
+            s_home = 0.0
+
+        ratings[h] = r_home + k * (s_home - exp_home)
+        ratings[a] = r_away + k * ((1 - s_home) - (1 - exp_home))
+
 
-        elo_home_list.append(r_home)
-        elo_away_list.append(r_away)
+_elo_kernel_jit = njit(cache=True)(_elo_kernel) if njit is not None else None
 
-        new_r_home, new_r_away = update_elo(r_home, r_away, hg, ag)
-        ratings[h], ratings[a] = new_r_home, new_r_away
 
-    df["elo_home"] = elo_home_list
-    df["elo_away"] = elo_away_list
+def elo_arrays(home_codes, away_codes, goals_home, goals_away, n_teams,
+               initial=1500.0, ratings=None, k=None, home_adv=None,
+               seasons=None, regress=0.0, mean=1500.0):
+    """
+    Elo pré-match (home, away) pour des matchs déjà ordonnés.
+    Équipes = codes 0..n_teams-1 ; ratings dans un tableau NumPy
+    (`ratings` : ratings de départ, sinon `initial` pour tous).
+    k / home_adv : K et HOME_ADV du module par défaut.
+    seasons + regress : régression vers `mean` à chaque changement de saison
+    (codes saison entiers croissants).
+    Retourne aussi les ratings finaux.
+    """
+    n = len(home_codes)
+    if ratings is None:
+        ratings = np.full(n_teams, float(initial))
+    else:
+        ratings = np.array(ratings, dtype=float)
+    k = K if k is None else k
+    home_adv = HOME_ADV if home_adv is None else home_adv
+
+    season = np.zeros(n, dtype=np.int64) if seasons is None else np.asarray(seasons, dtype=np.int64)
+    last_season = np.full(len(ratings), -1, dtype=np.int64)
+    out_home = np.empty(n)
+    out_away = np.empty(n)
+
+    if _elo_kernel_jit is not None:
+        _elo_kernel_jit(
+            np.asarray(home_codes, dtype=np.int64), np.asarray(away_codes, dtype=np.int64),
+            np.asarray(goals_home, dtype=float), np.asarray(goals_away, dtype=float),
+            ratings, out_home, out_away, float(k), float(home_adv),
+            season, last_season, float(regress), float(mean),
+        )
+        return out_home, out_away, ratings
+
+    # Fallback : floats Python (même arrondi que update_elo), sans iterrows
+    r = ratings.tolist()
+    oh = [0.0] * n
+    oa = [0.0] * n
+    _elo_kernel(
+        np.asarray(home_codes).tolist(), np.asarray(away_codes).tolist(),
+        np.asarray(goals_home, dtype=float).tolist(), np.asarray(goals_away, dtype=float).tolist(),
+        r, oh, oa, k, home_adv,
+        season.tolist(), last_season.tolist(), regress, mean,
+    )
+    return np.asarray(oh), np.asarray(oa), np.asarray(r)
+
+
+def compute_elo(df):
+    """
+    Ajoute elo_home / elo_away (Elo AVANT chaque match, ordre des lignes de df).
+    Équipes codées en entiers, ratings dans un tableau NumPy, boucle compilée.
+    """
+    codes, teams = pd.factorize(
+        np.concatenate([df["HomeTeam"].to_numpy(dtype=object), df["AwayTeam"].to_numpy(dtype=object)]),
+        use_na_sentinel=False,
+    )
+    n = len(df)
+
+    elo_home, elo_away, _ = elo_arrays(
+        codes[:n], codes[n:],
+        pd.to_numeric(df["HomeGoals"], errors="coerce").to_numpy(dtype=float),
+        pd.to_numeric(df["AwayGoals"], errors="coerce").to_numpy(dtype=float),
+        len(teams),
+    )
+
+    df["elo_home"] = elo_home
+    df["elo_away"] = elo_away
     return df
+
+
+# --------------------------------------------------
+# Persistent Elo state (ratings courants)
+# --------------------------------------------------
+
+ELO_STATE_VERSION = 1
+INITIAL_RATING = 1500.0
+FINISHED_STATUSES = ("FT", "AET", "PEN")
+
+# Construction initiale du store par pools de ligue en parallèle
+# (src/update/elo_leagues.py) : exacte sans match inter-ligues,
+# approchée sinon → désactivée par défaut
+ELO_MULTI_LEAGUE = os.getenv("APUESDATA_ELO_MULTI_LEAGUE", "0") == "1"
+
+
+def _utc_naive(values):
+    dates = pd.to_datetime(pd.Series(values), errors="coerce", utc=True)
+    return dates.dt.tz_convert(None).to_numpy(dtype="datetime64[ns]")
+
+
+class EloStore:
+    """
+    Ratings courants par équipe : rating, date du dernier match, nb de matchs.
+    team -> code (dict, lookup O(1)) + tableaux NumPy indexés par code.
+    `applied` = fixture_id déjà intégrés (un résultat n'est jamais compté 2 fois).
+    """
+
+    def __init__(self):
+        self.codes = {}
+        self.ratings = np.empty(0)
+        self.last_date = np.empty(0, dtype="datetime64[ns]")
+        self.n_matches = np.empty(0, dtype=np.int64)
+        self.applied = set()
+        self.params = (K, HOME_ADV, INITIAL_RATING)
+
+    def __len__(self):
+        return len(self.codes)
+
+    def _code(self, team):
+        code = self.codes.get(team)
+        if code is None:
+            code = self.codes[team] = len(self.codes)
+        return code
+
+    def _grow(self):
+        n = len(self.codes) - len(self.ratings)
+        if n > 0:
+            self.ratings = np.r_[self.ratings, np.full(n, INITIAL_RATING)]
+            self.last_date = np.r_[self.last_date, np.full(n, np.datetime64("NaT", "ns"))]
+            self.n_matches = np.r_[self.n_matches, np.zeros(n, dtype=np.int64)]
+
+    # ----------------------------------------------
+    # Lookups
+    # ----------------------------------------------
+    def rating(self, team, default=INITIAL_RATING):
+        code = self.codes.get(normalize_team_name(team))
+        return default if code is None else float(self.ratings[code])
+
+    def lookup(self, teams, default=np.nan):
+        """Ratings courants d'une liste d'équipes (default si inconnue)."""
+        codes = np.array([self.codes.get(normalize_team_name(t), -1) for t in teams], dtype=np.int64)
+        out = np.full(len(codes), default, dtype=float)
+        known = codes >= 0
+        out[known] = self.ratings[codes[known]]
+        return out
+
+    def to_frame(self):
+        return pd.DataFrame({
+            "team": list(self.codes),
+            "rating": self.ratings,
+            "last_date": self.last_date,
+            "n_matches": self.n_matches,
+        })
+
+    # ----------------------------------------------
+    # Mise à jour
+    # ----------------------------------------------
+    def _new_matches(self, matches):
+        """Matchs terminés pas encore appliqués, triés par date (stable)."""
+        df = matches.copy()
+        df["Date"] = _utc_naive(df["Date"])
+        df["HomeGoals"] = pd.to_numeric(df["HomeGoals"], errors="coerce")
+        df["AwayGoals"] = pd.to_numeric(df["AwayGoals"], errors="coerce")
+        df = df.dropna(subset=["HomeTeam", "AwayTeam", "HomeGoals", "AwayGoals"])
+
+        if "fixture_id" in df.columns:
+            df = df.drop_duplicates(subset=["fixture_id"], keep="last")
+            df = df[~df["fixture_id"].isin(self.applied)]
+        return df.sort_values("Date", kind="stable")
+
+    def _record(self, df, home, away):
+        """Nb de matchs, dernière date et fixture_id des matchs intégrés."""
+        teams = np.concatenate([home, away])
+        dates = np.concatenate([df["Date"].to_numpy(), df["Date"].to_numpy()])
+        np.add.at(self.n_matches, teams, 1)
+        valid = ~np.isnat(dates)
+        np.fmax.at(self.last_date, teams[valid], dates[valid])
+
+        if "fixture_id" in df.columns:
+            self.applied.update(df["fixture_id"].dropna().tolist())
+
+    def apply(self, matches):
+        """
+        Intègre des matchs terminés (Date, HomeTeam, AwayTeam, HomeGoals,
+        AwayGoals, fixture_id optionnel), dans l'ordre chronologique.
+        Les fixture_id déjà appliqués sont ignorés. Retourne le nb intégré.
+        """
+        df = self._new_matches(matches)
+        if df.empty:
+            return 0
+
+        home = [self._code(normalize_team_name(t)) for t in df["HomeTeam"]]
+        away = [self._code(normalize_team_name(t)) for t in df["AwayTeam"]]
+        self._grow()
+
+        _, _, self.ratings = elo_arrays(
+            home, away,
+            df["HomeGoals"].to_numpy(dtype=float), df["AwayGoals"].to_numpy(dtype=float),
+            len(self.codes), ratings=self.ratings,
+        )
+
+        self._record(df, home, away)
+        return len(df)
+
+    def apply_multi_league(self, matches, workers=None):
+        """
+        Comme apply sur un store vide, mais rejoué par pools de ligue en
+        parallèle (elo_leagues.compute_elo_multi_league). Identique à apply
+        sans match inter-ligues ; sinon les ratings des équipes concernées
+        sont approchés (réconciliation des matchs inter-pools, voir
+        elo_leagues). Retourne le nb intégré.
+        """
+        from src.features.parallel import LEAGUE_COLS
+        from src.update.elo_leagues import compute_elo_multi_league, post_match_ratings
+
+        if len(self):
+            raise ValueError("❌ apply_multi_league : store vide uniquement (rejeu complet)")
+        if not any(c in matches.columns for c in LEAGUE_COLS):
+            print(f"⚠️ Pas de colonne de ligue ({', '.join(LEAGUE_COLS)}) → rejeu séquentiel.")
+            return self.apply(matches)
+        df = self._new_matches(matches)
+        if df.empty:
+            return 0
+
+        df["HomeTeam"] = [normalize_team_name(t) for t in df["HomeTeam"]]
+        df["AwayTeam"] = [normalize_team_name(t) for t in df["AwayTeam"]]
+        home = np.array([self._code(t) for t in df["HomeTeam"]], dtype=np.int64)
+        away = np.array([self._code(t) for t in df["AwayTeam"]], dtype=np.int64)
+        self._grow()
+
+        df = compute_elo_multi_league(df.reset_index(drop=True), workers=workers)
+        post_h, post_a = post_match_ratings(df)
+
+        # Rating final = rating après le dernier match de chaque équipe
+        n = len(df)
+        teams = np.concatenate([home, away])
+        order = np.lexsort((np.concatenate([np.arange(n), np.arange(n)]), teams))
+        last = np.r_[teams[order][1:] != teams[order][:-1], True]
+        self.ratings[teams[order][last]] = np.concatenate([post_h, post_a])[order][last]
+
+        self._record(df, home, away)
+        return n
+
+    # ----------------------------------------------
+    # Persistance
+    # ----------------------------------------------
+    def save(self, path):
+        path = Path(path)
+        tmp = path.with_suffix(".tmp")
+        with open(tmp, "wb") as f:
+            pickle.dump({"version": ELO_STATE_VERSION, "store": self}, f)
+        tmp.replace(path)
+
+    @classmethod
+    def load(cls, path):
+        """Store persisté, ou None (absent, illisible, version ou paramètres changés)."""
+        path = Path(path)
+        if not path.exists():
+            return None
+        try:
+            with open(path, "rb") as f:
+                data = pickle.load(f)
+        except Exception as e:
+            print("⚠️ Unreadable Elo state:", e)
+            return None
+
+        store = data.get("store")
+        if data.get("version") != ELO_STATE_VERSION or store.params != (K, HOME_ADV, INITIAL_RATING):
+            print("⚠️ Elo parameters changed → Elo state ignored.")
+            return None
+        return store
+
+    @classmethod
+    def from_history(cls, df, multi_league=False, workers=None):
+        """
+        Store construit en rejouant tout un historique (une seule fois).
+        multi_league : rejeu par pools de ligue en parallèle (approché en
+        présence de matchs inter-ligues, voir apply_multi_league).
+        """
+        store = cls()
+        if multi_league:
+            store.apply_multi_league(_match_columns(df), workers=workers)
+        else:
+            store.apply(_match_columns(df))
+        return store
+
+
+def _match_columns(df):
+    return df.rename(columns={
+        "date": "Date", "home_name": "HomeTeam", "away_name": "AwayTeam",
+        "home_goals": "HomeGoals", "away_goals": "AwayGoals",
+    })
+
+
+def _finished(results):
+    if results.empty:
+        return results
+    results = _match_columns(results)
+    if "status" in results.columns:
+        results = results[results["status"].isin(FINISHED_STATUSES)]
+    return results
+
+
+def update_elo_state(results_path=None, state_path=None, history_path=None,
+                     multi_league=None, workers=None):
+    """
+    Met à jour le store Elo persisté avec les résultats terminés de
+    results_api.csv (seuls les fixture_id nouveaux sont rejoués).
+    Sans store valide : construit une fois depuis l'historique, par pools
+    de ligue en parallèle si multi_league (défaut : APUESDATA_ELO_MULTI_LEAGUE).
+    """
+    multi_league = ELO_MULTI_LEAGUE if multi_league is None else multi_league
+    from src.config import ELO_STATE, HISTORY, RAW_RES
+
+    results_path = Path(results_path or RAW_RES)
+    state_path = Path(state_path or ELO_STATE)
+    history_path = Path(history_path or HISTORY / "history.csv")
+
+    store = EloStore.load(state_path)
+    if store is None:
+        if history_path.exists():
+            print("🔧 Building Elo state from history (one-off)...")
+            store = EloStore.from_history(
+                load_dataset(history_path, schema="history"),
+                multi_league=multi_league, workers=workers,
+            )
+        else:
+            store = EloStore()
+
+    n_new = 0
+    if results_path.exists() and results_path.stat().st_size > 0:
+        n_new = store.apply(_finished(load_dataset(results_path, schema="results")))
+
+    state_path.parent.mkdir(parents=True, exist_ok=True)
+    store.save(state_path)
+    print(f"💾 Elo state → {state_path} ({len(store)} teams, +{n_new} results)")
+
+    # Ratings datés dans la base SQLite optionnelle (si elle existe)
+    from src.match_db import open_db
+    db = open_db()
+    if db is not None:
+        db.save_elo(store)
+    return store
+
+
+def load_elo_state(state_path=None):
+    """Store Elo courant (lecture seule), None si absent."""
+    from src.config import ELO_STATE
+    return EloStore.load(state_path or ELO_STATE)
@@ -0,0 +1,238 @@
+# =========================================
+# ELO HYPERPARAMETER SWEEP – APUESDATA
+# =========================================
+#
+# Évalue des réglages (K, HOME_ADV, rating initial, régression
+# de saison) en rejouant l'historique avec le kernel Elo de
+# elo_advanced, sur un pool de process. Score = log-loss des
+# probabilités H/D/A implicites de l'Elo pré-match, hors saison
+# de rodage. Résultats triés → leaderboard CSV.
+#
+#   python -m src.update.elo_sweep                 (grille)
+#   python -m src.update.elo_sweep --random 200    (tirage aléatoire)
+#   python -m src.update.elo_sweep --leagues E0 --seasons 2023/2024 2024/2025
+#       (seules ces partitions du store src/history_store.py sont lues)
+# =========================================
+
+import argparse
+import itertools
+from multiprocessing import get_context
+
+import numpy as np
+import pandas as pd
+
+from src.config import HISTORY_STORE, PROCESSED
+from src.features.parallel import _resolve_workers
+from src.features.team_table import season_labels
+from src.update.elo_advanced import INITIAL_RATING, elo_arrays
+
+LEADERBOARD = PROCESSED / "elo_sweep_leaderboard.csv"
+
+# initial = rating d'une équipe à sa première apparition (promus…) ;
+# la régression de saison ramène vers INITIAL_RATING (1500)
+GRID = {
+    "k": (10, 15, 20, 25, 30, 40),
+    "home_adv": (0, 40, 60, 80, 100, 120),
+    "initial": (1400, 1450, 1500),
+    "regress": (0.0, 0.1, 0.2, 0.33),
+}
+
+RANDOM_RANGES = {
+    "k": (5.0, 60.0),
+    "home_adv": (0.0, 150.0),
+    "initial": (1350.0, 1550.0),
+    "regress": (0.0, 0.5),
+}
+
+BURN_IN_SEASONS = 1
+EPS = 1e-6
+
+# Colonnes lues dans le store (projection) pour un sweep filtré
+SWEEP_COLUMNS = ["Date", "Season", "HomeTeam", "AwayTeam", "HomeGoals", "AwayGoals"]
+
+
+# ------------------------------------------
+# Données
+# ------------------------------------------
+def load_sweep_history(leagues=None, seasons=None, root=HISTORY_STORE):
+    """
+    Historique du sweep. Avec un filtre ligues / saisons : seules les
+    partitions correspondantes du store sont lues (history_store.load_history) ;
+    sans filtre : history.csv complet (rebuild_features_pro.load_history).
+    """
+    if leagues is None and seasons is None:
+        from src.update.rebuild_features_pro import load_history
+        return load_history()
+
+    from src.history_store import load_history
+    from utils.standardize_features import standardize_history
+
+    df = load_history(leagues=leagues, seasons=seasons, columns=SWEEP_COLUMNS, root=root)
+    if df.empty:
+        print("❌ No store partition matches (python -m src.history_store import).")
+        return None
+    return standardize_history(df)
+
+
+def prepare_history(df, burn_in_seasons=BURN_IN_SEASONS):
+    """
+    Tableaux du rejeu : matchs joués triés par date, équipes et saisons
+    codées en entiers (saisons dans l'ordre chronologique), résultat
+    0/1/2 (H/D/A) et masque des matchs scorés (après le rodage).
+    """
+    hg = pd.to_numeric(df["HomeGoals"], errors="coerce")
+    ag = pd.to_numeric(df["AwayGoals"], errors="coerce")
+    dates = pd.to_datetime(df["Date"], errors="coerce")
+    played = (hg.notna() & ag.notna() & dates.notna()).to_numpy()
+
+    order = np.flatnonzero(played)
+    order = order[np.argsort(dates.to_numpy()[order], kind="stable")]
+
+    n = len(order)
+    codes, teams = pd.factorize(np.concatenate([
+        df["HomeTeam"].to_numpy(dtype=object)[order],
+        df["AwayTeam"].to_numpy(dtype=object)[order],
+    ]))
+
+    if "Season" in df.columns:
+        labels = df["Season"].to_numpy(dtype=object)[order]
+    else:
+        labels = season_labels(dates.to_numpy()[order])
+    seasons, _ = pd.factorize(labels)
+
+    h = hg.to_numpy(dtype=float)[order]
+    a = ag.to_numpy(dtype=float)[order]
+    outcome = np.where(h > a, 0, np.where(h == a, 1, 2))
+
+    scored = seasons >= burn_in_seasons
+    if not scored.any():
+        scored[:] = True
+
+    return {
+        "home": codes[:n], "away": codes[n:], "n_teams": len(teams),
+        "hg": h, "ag": a, "season": seasons,
+        "outcome": outcome, "scored": scored,
+        "draw_rate": float((outcome[scored] == 1).mean()),
+    }
+
+
+# ------------------------------------------
+# Score
+# ------------------------------------------
+def outcome_probs(elo_home, elo_away, home_adv, draw_rate):
+    """
+    Probabilités H/D/A implicites : E = score attendu Elo (domicile),
+    nul ∝ 4·E·(1−E) (max pour un match équilibré) calé sur le taux de
+    nuls observé, le reste réparti selon E.
+    """
+    e = 1 / (1 + 10 ** ((elo_away - (elo_home + home_adv)) / 400))
+    closeness = 4 * e * (1 - e)
+    p_d = draw_rate * closeness / max(closeness.mean(), EPS)
+    p_d = np.clip(p_d, EPS, 2 * np.minimum(e, 1 - e) - EPS)
+
+    probs = np.column_stack([e - p_d / 2, p_d, 1 - e - p_d / 2])
+    probs = np.clip(probs, EPS, 1)
+    return probs / probs.sum(axis=1, keepdims=True)
+
+
+def evaluate(params, data):
+    """Log-loss / accuracy d'un réglage sur les matchs scorés."""
+    elo_h, elo_a, _ = elo_arrays(
+        data["home"], data["away"], data["hg"], data["ag"], data["n_teams"],
+        initial=params["initial"], k=params["k"], home_adv=params["home_adv"],
+        seasons=data["season"], regress=params["regress"], mean=INITIAL_RATING,
+    )
+
+    mask = data["scored"]
+    probs = outcome_probs(elo_h[mask], elo_a[mask], params["home_adv"], data["draw_rate"])
+    y = data["outcome"][mask]
+
+    return {
+        **params,
+        "log_loss": float(-np.log(probs[np.arange(len(y)), y]).mean()),
+        "accuracy": float((probs.argmax(axis=1) == y).mean()),
+        "n_scored": int(mask.sum()),
+    }
+
+
+# ------------------------------------------
+# Candidats
+# ------------------------------------------
+def grid_candidates(grid=GRID):
+    keys = list(grid)
+    return [dict(zip(keys, values)) for values in itertools.product(*grid.values())]
+
+
+def random_candidates(n, ranges=RANDOM_RANGES, seed=0):
+    rng = np.random.default_rng(seed)
+    return [
+        {key: round(float(rng.uniform(lo, hi)), 3) for key, (lo, hi) in ranges.items()}
+        for _ in range(n)
+    ]
+
+
+# ------------------------------------------
+# Pool de process
+# ------------------------------------------
+_DATA = {}
+
+
+def _init_worker(data):
+    _DATA.update(data)
+
+
+def _evaluate_task(params):
+    return evaluate(params, _DATA)
+
+
+def sweep(df, candidates, workers=None):
+    """Évalue les candidats en parallèle ; DataFrame trié par log-loss (rank 1 = meilleur)."""
+    data = prepare_history(df)
+    workers = _resolve_workers(workers)
+
+    if workers == 1:
+        rows = [evaluate(p, data) for p in candidates]
+    else:
+        ctx = get_context()
+        with ctx.Pool(workers, initializer=_init_worker, initargs=(data,)) as pool:
+            rows = list(pool.imap_unordered(_evaluate_task, candidates))
+
+    board = pd.DataFrame(rows).sort_values(
+        ["log_loss", "accuracy", "k", "home_adv", "initial", "regress"],
+        ascending=[True, False, True, True, True, True],
+    )
+    board.insert(0, "rank", np.arange(1, len(board) + 1))
+    return board.reset_index(drop=True)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Sweep des hyperparamètres Elo.")
+    parser.add_argument("--random", type=int, default=0, help="N tirages aléatoires au lieu de la grille")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--workers", type=int, default=None)
+    parser.add_argument("--out", default=str(LEADERBOARD))
+    parser.add_argument("--leagues", nargs="+", default=None, help="ligues du store (league_id ou Div)")
+    parser.add_argument("--seasons", nargs="+", default=None, help="saisons du store (2024/2025, 2024…)")
+    args = parser.parse_args(argv)
+
+    df = load_sweep_history(args.leagues, args.seasons)
+    if df is None:
+        return
+
+    candidates = random_candidates(args.random, seed=args.seed) if args.random else grid_candidates()
+    print(f"🔧 Elo sweep : {len(candidates)} candidats sur {len(df)} matchs...")
+
+    board = sweep(df, candidates, workers=args.workers)
+    board.to_csv(args.out, index=False)
+
+    best = board.iloc[0]
+    print(
+        f"🏆 Best : K={best['k']} HOME_ADV={best['home_adv']} initial={best['initial']} "
+        f"regress={best['regress']} → log-loss {best['log_loss']:.4f} (acc {best['accuracy']:.3f})"
+    )
+    print(f"💾 Leaderboard → {args.out}")
+    return board
+
+
+if __name__ == "__main__":
+    main()
@@ -2,6 +2,8 @@ import pandas as pd
 from pathlib import Path
 import numpy as np
 
+from src.features.team_table import match_sides, rolling_means, team_perspective
+
 ROOT = Path(__file__).resolve().parents[2]
 PROCESSED = ROOT / "data" / "processed"
 
@@ -38,38 +40,96 @@ def compute_xg_proxies(df):
     return df
 
 
-def compute_xg_rolling(df):
+def xg_from_goals(goals):
+    """xG proxy d'un côté à partir de ses buts (mêmes poids que compute_xg_proxies)."""
+    goals = np.asarray(goals, dtype=float)
+    shots = goals * 6 + 4
+    sot = goals * 3 + 2
+    return shots * 0.08 + sot * 0.23 + goals * 0.45
+
+
+def xg_rolling_columns(df, windows=(5, 10), closed="left"):
     """
-    Rolling xG / xGA sur 5 et 10 matches
+    Rolling xG / xGA PAR ÉQUIPE sur ses n derniers matchs joués,
+    pour chaque fenêtre de `windows` en une passe (sommes cumulées
+    sur la table long format, sans copie du DataFrame d'origine).
+
+    closed="left" : avant le match (features sans fuite)
+    closed="both" : match inclus
+
+    Retourne SEULEMENT les nouvelles colonnes, alignées sur df (même index) :
+    {home,away}_xg_roll_{n}, {home,away}_xga_roll_{n}, {home,away}_xg_diff_roll_{n}
+    + les anciens noms xg_roll_{n}, xga_roll_{n}, xg_diff_roll_{n} (côté
+    domicile, comme xg_for). Changement de valeurs : ces colonnes étaient
+    une moyenne glissante sur tout le dataset trié par date, match inclus ;
+    ce sont désormais les n derniers matchs de l'équipe.
     """
-    df = df.sort_values("Date").copy()
+    long = team_perspective(df)
+    long["xg"] = xg_from_goals(long["gf"].to_numpy())
+    long["xga"] = xg_from_goals(long["ga"].to_numpy())
 
-    df["xg_roll_5"] = df["xg_for"].rolling(5, min_periods=1).mean()
-    df["xga_roll_5"] = df["xg_against"].rolling(5, min_periods=1).mean()
+    roll = rolling_means(long, windows=windows, stats=("xg", "xga"), closed=closed)
+    home, away = match_sides(long, roll, len(df))
 
-    df["xg_roll_10"] = df["xg_for"].rolling(10, min_periods=1).mean()
-    df["xga_roll_10"] = df["xg_against"].rolling(10, min_periods=1).mean()
+    out = {}
+    for side, frame in (("home", home), ("away", away)):
+        for n in windows:
+            xg = frame[f"xg_last_{n}"].to_numpy()
+            xga = frame[f"xga_last_{n}"].to_numpy()
+            out[f"{side}_xg_roll_{n}"] = xg
+            out[f"{side}_xga_roll_{n}"] = xga
+            out[f"{side}_xg_diff_roll_{n}"] = xg - xga
 
-    df["xg_diff_roll_5"] = df["xg_roll_5"] - df["xga_roll_5"]
-    df["xg_diff_roll_10"] = df["xg_roll_10"] - df["xga_roll_10"]
+    # Anciens noms (côté domicile)
+    for n in windows:
+        for stat in ("xg", "xga", "xg_diff"):
+            out[f"{stat}_roll_{n}"] = out[f"home_{stat}_roll_{n}"]
 
-    return df
+    return pd.DataFrame(out, index=df.index)
 
 
-def add_xg_features(df):
+def _with_columns(df, *frames):
+    """df + colonnes de `frames` (colonnes déjà présentes remplacées, pas de doublon)."""
+    new = [c for f in frames for c in f.columns]
+    return pd.concat([df.drop(columns=new, errors="ignore"), *frames], axis=1)
+
+
+def compute_xg_rolling(df, windows=(5, 10), closed="left"):
     """
-    Fonction appelée depuis rebuild_features.py
-    Ajoute :
-    - xG_for / xG_against
-    - rolling xG (5 / 10)
-    - xG_diff
+    DataFrame complet : df + colonnes de xg_rolling_columns (remplacées
+    si déjà présentes). Ordre des lignes de df (plus de tri par date).
     """
-    df = df.copy()
+    return _with_columns(df, xg_rolling_columns(df, windows=windows, closed=closed))
 
-    df = compute_xg_proxies(df)
-    df = compute_xg_rolling(df)
 
-    # xG gap brut
-    df["xg_diff"] = df["xg_for"] - df["xg_against"]
+def add_xg_features(df, windows=(5, 10), closed="left"):
+    """
+    Ajoute :
+    - shots_for / shots_against, sot_for / sot_against (proxies du match)
+    - xg_for / xg_against (proxy du match, côté domicile)
+    - xg_diff
+    - rolling xG / xGA / xG_diff par équipe, côtés home et away
+      (voir xg_rolling_columns, anciens noms conservés)
+    Colonnes déjà présentes (re-run) remplacées. Une seule copie : le
+    DataFrame retourné, dans l'ordre de df (il n'est plus trié par date).
+    """
+    hg = pd.to_numeric(df["HomeGoals"], errors="coerce").to_numpy(dtype=float)
+    ag = pd.to_numeric(df["AwayGoals"], errors="coerce").to_numpy(dtype=float)
+    xg_for = xg_from_goals(hg)
+    xg_against = xg_from_goals(ag)
+
+    match = pd.DataFrame(
+        {
+            "shots_for": hg * 6 + 4,
+            "shots_against": ag * 6 + 4,
+            "sot_for": hg * 3 + 2,
+            "sot_against": ag * 3 + 2,
+            "xg_for": xg_for,
+            "xg_against": xg_against,
+            "xg_diff": xg_for - xg_against,
+        },
+        index=df.index,
+    )
+    rolling = xg_rolling_columns(df, windows=windows, closed=closed)
 
-    return df
+    return _with_columns(df, match, rolling)
@@ -4,9 +4,10 @@
 
 from src.update.fetch_upcoming_api import fetch_upcoming_api
 from src.update.update_history import update_history
-from src.update.rebuild_features_pro import rebuild_all_features
-from src.update.build_upcoming_features_pro import build_upcoming_features_pro
-from src.update.predict_upcoming import predict_upcoming
+from src.update.elo_advanced import update_elo_state
+from src.update.rebuild_features_pro import update_features
+from src.update.build_upcoming_features_pro import build as build_upcoming_features_pro
+from src.update.predict_upcoming import predict as predict_upcoming
 from src.update.compute_value_bets import compute_value_bets
 
 def safe_run(title, func):
@@ -23,7 +24,8 @@ def main():
 
     safe_run("Fetch upcoming fixtures (API-Football)", fetch_upcoming_api)
     safe_run("Update RAW (fixtures + results)", update_history)
-    safe_run("Rebuild PRO features (historical)", rebuild_all_features)
+    safe_run("Update Elo state (incremental)", update_elo_state)
+    safe_run("Update PRO features (historical, incremental)", update_features)
     safe_run("Build upcoming PRO features", build_upcoming_features_pro)
     safe_run("Predict upcoming fixtures (XGB + calibration)", predict_upcoming)
     safe_run("Compute value bets (EV + Kelly)", compute_value_bets)
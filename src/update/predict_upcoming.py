@@ -8,6 +8,7 @@ import joblib
 from pathlib import Path
 from src.config import PROCESSED, MODELS
 from src.model_loader import load_model_bundle
+from src.storage import read_dataset, write_dataset
 
 INPUT_FILE = PROCESSED / "predictions_upcoming_features.csv"
 OUTPUT_FILE = PROCESSED / "predictions_upcoming.csv"
@@ -15,7 +16,7 @@ OUTPUT_FILE = PROCESSED / "predictions_upcoming.csv"
 
 def predict():
     print(f"📥 Loading upcoming features from {INPUT_FILE}")
-    df = pd.read_csv(INPUT_FILE)
+    df = read_dataset(INPUT_FILE)
 
     # --------------------------------------------
     # Load model + calibrator + medians + features
@@ -56,8 +57,8 @@ def predict():
     # --------------------------------------------
     # Save final predictions
     # --------------------------------------------
-    df_out.to_csv(OUTPUT_FILE, index=False)
-    print(f"📦 Saved calibrated predictions → {OUTPUT_FILE} (shape= {df_out.shape} )")
+    saved = write_dataset(df_out, OUTPUT_FILE)
+    print(f"📦 Saved calibrated predictions → {saved} (shape= {df_out.shape} )")
     print("✔️ Predict upcoming fixtures OK")
 
 
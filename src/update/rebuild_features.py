@@ -1,6 +1,9 @@
 import pandas as pd
 from pathlib import Path
 
+from src.storage import write_dataset
+from utils.loader import load_dataset
+
 ROOT = Path(__file__).resolve().parents[2]
 DATA = ROOT / "data"
 RAW = DATA / "raw"
@@ -14,8 +17,8 @@ OUT = PROCESSED / "all_matches_features_updated.csv"
 def rebuild_all_features():
     print("🔧 Loading RAW datasets...")
 
-    df_fix = pd.read_csv(FIX)
-    df_res = pd.read_csv(RES)
+    df_fix = load_dataset(FIX, schema="fixtures")
+    df_res = load_dataset(RES, schema="results")
 
     # Standardisation minimale
     df_fix.rename(columns={"date": "Date"}, inplace=True)
@@ -54,7 +57,7 @@ def rebuild_all_features():
 
     df = df[[c for c in cols if c in df.columns]]
 
-    print(f"💾 Saving → {OUT} (shape={df.shape})")
-    df.to_csv(OUT, index=False)
+    saved = write_dataset(df, OUT)
+    print(f"💾 Saved → {saved} (shape={df.shape})")
 
     print("✔ Historical PRO features rebuilt.")
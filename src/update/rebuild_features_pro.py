@@ -2,117 +2,499 @@
 # REBUILD FEATURES PRO – APUESDATA
 # =========================================
 import sys
+import pickle
 from pathlib import Path
 
 ROOT = Path(__file__).resolve().parents[1]  # projet / APUESDATA
 sys.path.insert(0, str(ROOT))
 
+from utils.loader import iter_dataset, load_dataset
 from utils.standardize_features import standardize_history
 import pandas as pd
 import numpy as np
 
-from src.config import HISTORY, HIST_FEATURES
+from src.config import HISTORY, HIST_FEATURES, FEATURES_STATE, TEAM_SNAPSHOT
+from src.features.asof_join import snapshot_tail, team_snapshot
+from src.features.team_table import team_perspective, rolling_means, match_sides
+from src.features.parallel import rolling_sides_parallel
+from src.features.registry import build_feature_frame
+from src.features.rolling_state import RollingStateEngine
+from src.storage import (
+    DatasetWriter, dataset_exists, dataset_target, parquet_enabled, read_dataset, write_dataset,
+)
 
+# ⚠️ Incrémenter à chaque changement de définition des features :
+# le checkpoint devient invalide → rebuild complet au prochain run.
+FEATURE_VERSION = 2
 
-def rebuild_all_features():
-    print("🔧 Loading RAW datasets...")
+WINDOWS = (5, 10)
+
+# Mode par blocs : nb de lignes de history.csv lues à la fois
+CHUNK_SIZE = 50_000
+
+META_COLS = ["fixture_id", "Date", "HomeTeam", "AwayTeam", "HomeGoals", "AwayGoals"]
+FEATURE_NAMES = [
+    f"{side}_{stat}{n}"
+    for n in WINDOWS
+    for side in ("home", "away")
+    for stat in ("gf", "ga", "pts")
+]
 
+
+# ------------------------------------------
+# Loading
+# ------------------------------------------
+def load_history():
     # 🔥 Correction principale : fichier correct
     hist_file = HISTORY / "history.csv"
 
     if not hist_file.exists():
         print(f"❌ History file not found → {hist_file}")
-        return
+        return None
 
     try:
-        df = pd.read_csv(hist_file)
+        df = load_dataset(hist_file, schema="history")
     except Exception as e:
         print("❌ Failed to load history:", e)
-        return
+        return None
 
     if df.empty:
         print("⚠️ Empty history file.")
-        return
+        return None
 
     # Clean + normalize
     df = standardize_history(df)
-    df = df.sort_values("Date").reset_index(drop=True)
+    return df.sort_values("Date", kind="stable").reset_index(drop=True)
+
+
+def _feature_columns(home, away):
+    """Colonnes FEATURE_NAMES à partir des fenêtres home / away (match_sides)."""
+    home = home.fillna(0)
+    away = away.fillna(0)
+
+    feats = {}
+    for n in WINDOWS:
+        for side, frame in (("home", home), ("away", away)):
+            feats[f"{side}_gf{n}"] = frame[f"gf_last_{n}"]
+            feats[f"{side}_ga{n}"] = frame[f"ga_last_{n}"]
+            feats[f"{side}_pts{n}"] = frame[f"points_last_{n}"]
+    return pd.DataFrame(feats)
+
+
+def _assemble(df, feats):
+    """Colonnes meta de df + colonnes FEATURE_NAMES de feats (alignées par position)."""
+    out = pd.DataFrame({
+        c: df[c].to_numpy() if c in df.columns else None
+        for c in META_COLS
+    })
+    for c in FEATURE_NAMES:
+        out[c] = feats[c].to_numpy() if c in feats.columns else np.nan
+    return out
+
+
+# ------------------------------------------
+# Pending rows / checkpoint
+# ------------------------------------------
+def pending_cutoff(df):
+    """
+    Première date encore "ouverte" : dernier jour joué, ou plus tôt si un
+    match antérieur n'a pas encore de score. Les lignes à partir de cette
+    date sont recalculées à chaque run incrémental.
+    """
+    dated = df["Date"].notna()
+    played = dated & df["HomeGoals"].notna() & df["AwayGoals"].notna()
+
+    cutoff = df.loc[played, "Date"].max()
+    unplayed = df.loc[dated & ~played, "Date"]
+    if not unplayed.empty and (pd.isna(cutoff) or unplayed.min() < cutoff):
+        cutoff = unplayed.min()
+    return cutoff
+
+
+def _before(df, cutoff):
+    if pd.isna(cutoff):
+        return np.zeros(len(df), dtype=bool)
+    return (df["Date"] < cutoff).to_numpy()
+
+
+def _pro_row(engine, home, away, date):
+    """Ligne PRO (forme 5 / 10) lue depuis l'état des deux équipes."""
+    row = {}
+    for side, team in (("home", home), ("away", away)):
+        last = engine.state(team).last(max(WINDOWS))
+        for n in WINDOWS:
+            w = last[:n]
+            row[f"{side}_gf{n}"] = np.mean([m[0] for m in w]) if w else 0
+            row[f"{side}_ga{n}"] = np.mean([m[1] for m in w]) if w else 0
+            row[f"{side}_pts{n}"] = np.mean([
+                3 if m[0] > m[1] else (1 if m[0] == m[1] else 0) for m in w
+            ]) if w else 0
+    return row
+
+
+def _storage_format():
+    return "parquet" if parquet_enabled() else "csv"
+
+
+def load_checkpoint():
+    if not FEATURES_STATE.exists():
+        return None
+    try:
+        with open(FEATURES_STATE, "rb") as f:
+            ckpt = pickle.load(f)
+    except Exception as e:
+        print("⚠️ Unreadable features checkpoint:", e)
+        return None
+
+    if ckpt.get("version") != FEATURE_VERSION or ckpt.get("columns") != META_COLS + FEATURE_NAMES:
+        print("⚠️ Feature definitions changed → checkpoint ignored.")
+        return None
+    # offset : octets (CSV) ou lignes (Parquet) → même format de stockage requis
+    if ckpt.get("format") != _storage_format():
+        print("⚠️ Storage format changed → checkpoint ignored.")
+        return None
+    return ckpt
+
+
+def save_checkpoint(engine_bytes, cutoff, n_before, offset):
+    tmp = FEATURES_STATE.with_suffix(".tmp")
+    with open(tmp, "wb") as f:
+        pickle.dump({
+            "version": FEATURE_VERSION,
+            "columns": META_COLS + FEATURE_NAMES,
+            "cutoff": cutoff,
+            "n_before": n_before,
+            "offset": offset,
+            "format": _storage_format(),
+            "engine": pickle.loads(engine_bytes),
+        }, f)
+    tmp.replace(FEATURES_STATE)
+
+
+# ------------------------------------------
+# Team snapshot (lookup des features upcoming)
+# ------------------------------------------
+def save_team_snapshot(snapshot):
+    saved = write_dataset(snapshot, TEAM_SNAPSHOT, schema="snapshot")
+    print(f"💾 Saved team snapshot → {saved}  ({len(snapshot)} teams)")
+
+
+def load_team_snapshot():
+    """Dernier état par équipe (asof_join.team_snapshot) ou None si absent."""
+    if not dataset_exists(TEAM_SNAPSHOT):
+        return None
+    try:
+        return read_dataset(TEAM_SNAPSHOT, schema="snapshot")
+    except Exception as e:
+        print("⚠️ Unreadable team snapshot:", e)
+        return None
+
+
+def refresh_team_snapshot(df, teams):
+    """
+    Snapshot recalculé pour `teams` seulement (l'état d'une équipe ne dépend
+    que de ses propres matchs) ; les autres équipes sont reprises du
+    snapshot existant. Snapshot complet s'il n'existe pas encore.
+    """
+    old = load_team_snapshot()
+    if old is None:
+        return team_snapshot(df)
+
+    teams = pd.Index(teams).dropna().astype(str).unique()
+    mine = (df["HomeTeam"].isin(teams) | df["AwayTeam"].isin(teams)).to_numpy()
+    fresh = team_snapshot(df[mine])
+    fresh = fresh[fresh["team"].isin(teams)]
+
+    kept = old[~old["team"].astype(str).isin(teams)]
+    return pd.concat([kept, fresh], ignore_index=True).sort_values("team").reset_index(drop=True)
+
+
+# ------------------------------------------
+# Full rebuild
+# ------------------------------------------
+def rebuild_all_features(workers=None, chunksize=None):
+    """
+    Rebuild complet des features historiques PRO + checkpoint de l'état
+    + snapshot par équipe (features upcoming).
+    workers > 1 : fenêtres glissantes calculées en parallèle (découpage par équipe).
+    chunksize : mode mémoire bornée (rebuild_features_chunked), rien n'est retourné.
+    """
+    if chunksize:
+        return rebuild_features_chunked(chunksize, workers=workers)
+
+    print("🔧 Loading RAW datasets...")
+
+    df = load_history()
+    if df is None:
+        return
 
     # ------------------------------------------
     # Compute statistical features PRO
+    # (table long format 2 lignes / match + sommes cumulées par équipe,
+    #  fenêtres calculées AVANT chaque match)
     # ------------------------------------------
-    def compute_team_features(team, n):
-        matches = df[(df["HomeTeam"] == team) | (df["AwayTeam"] == team)].tail(n)
+    if workers is not None and workers != 1:
+        home, away = rolling_sides_parallel(
+            df, windows=WINDOWS, stats=("gf", "ga", "points"), workers=workers
+        )
+        feats = _feature_columns(home, away)
+    else:
+        # Intermédiaires résolus par le registre (mêmes définitions que l'upcoming)
+        feats = build_feature_frame(df, FEATURE_NAMES).fillna(0)
+    df_features = _assemble(df, feats)
 
-        if matches.empty:
-            return 0, 0, 0
+    # ------------------------------------------
+    # Save : lignes "fermées" puis lignes en attente (offset mémorisé)
+    # ------------------------------------------
+    cutoff = pending_cutoff(df)
+    before = _before(df, cutoff)
+    n_before = int(before.sum())
 
-        gf, ga, pts = [], [], []
+    with DatasetWriter(HIST_FEATURES) as out:
+        out.write(df_features.iloc[:n_before])
+        offset = out.tell()
+        out.write(df_features.iloc[n_before:])
 
-        for _, m in matches.iterrows():
-            is_home = m["HomeTeam"] == team
+    engine = RollingStateEngine()
+    engine.advance(df[before])
+    save_checkpoint(pickle.dumps(engine), cutoff, n_before, offset)
+    save_team_snapshot(team_snapshot(df))
 
-            gf_match = m["HomeGoals"] if is_home else m["AwayGoals"]
-            ga_match = m["AwayGoals"] if is_home else m["HomeGoals"]
+    print(f"💾 Saved historical features → {out.target}  (shape={df_features.shape})")
+    return df_features
+
+
+# ------------------------------------------
+# Full rebuild par blocs (mémoire bornée)
+# ------------------------------------------
+_DATE_COLS = ("Date", "date", "fixture_date")
+
+
+def _scan_history(hist_file, chunksize):
+    """
+    1re passe (dates + scores seulement) : cutoff des lignes en attente
+    (même règle que pending_cutoff) et contrôle de l'ordre chronologique
+    du fichier. Retourne (cutoff, trié).
+    """
+    keep = set(_DATE_COLS) | {"HomeGoals", "AwayGoals"}
+    played_max = unplayed_min = last = pd.NaT
+
+    for chunk in iter_dataset(hist_file, chunksize, schema="history", usecols=lambda c: c in keep):
+        chunk = standardize_history(chunk, sort=False)
+        dates = chunk["Date"].dropna()
+        if not dates.empty:
+            if not dates.is_monotonic_increasing or (pd.notna(last) and dates.iloc[0] < last):
+                return None, False
+            last = dates.iloc[-1]
+
+        # Fichier trié : dernier match joué vu = max, premier non joué vu = min
+        played = chunk["Date"].notna() & chunk["HomeGoals"].notna() & chunk["AwayGoals"].notna()
+        if played.any():
+            played_max = chunk.loc[played, "Date"].max()
+        unplayed = chunk.loc[chunk["Date"].notna() & ~played, "Date"]
+        if pd.isna(unplayed_min) and not unplayed.empty:
+            unplayed_min = unplayed.min()
+
+    cutoff = played_max
+    if pd.notna(unplayed_min) and (pd.isna(cutoff) or unplayed_min < cutoff):
+        cutoff = unplayed_min
+    return cutoff, True
+
+
+def _state_context(engine, teams, date):
+    """
+    Derniers résultats (≤ max(WINDOWS)) de chaque équipe déjà vue, sous
+    forme de lignes-match fictives (adversaire absent) datées avant le
+    bloc : contexte des fenêtres glissantes vectorisées.
+    """
+    rows = {"HomeTeam": [], "HomeGoals": [], "AwayGoals": []}
+    for team in teams:
+        st = engine.states.get(team)
+        if st is None:
+            continue
+        for m in reversed(st.last(max(WINDOWS))):
+            rows["HomeTeam"].append(team)
+            rows["HomeGoals"].append(m[0])
+            rows["AwayGoals"].append(m[1])
+
+    ctx = pd.DataFrame(rows, columns=["HomeTeam", "HomeGoals", "AwayGoals"])
+    ctx["AwayTeam"] = None
+    ctx["Date"] = date - pd.Timedelta(days=1)
+    return ctx
+
+
+def _block_features(engine, block):
+    """
+    Features d'un bloc de dates complètes : état des équipes avant le bloc
+    (engine) + fenêtres vectorisées sur le bloc. Identique au rebuild complet.
+    """
+    teams = pd.unique(np.concatenate([
+        block["HomeTeam"].to_numpy(dtype=object), block["AwayTeam"].to_numpy(dtype=object)
+    ]))
+    ctx = _state_context(engine, teams, block["Date"].min())
+
+    cols = ["Date", "HomeTeam", "AwayTeam", "HomeGoals", "AwayGoals"]
+    frame = pd.concat([ctx[cols], block[cols]], ignore_index=True)
+
+    long = team_perspective(frame)
+    roll = rolling_means(long, windows=WINDOWS, stats=("gf", "ga", "points"))
+    home, away = match_sides(long, roll, len(frame))
+
+    feats = _feature_columns(home.iloc[len(ctx):], away.iloc[len(ctx):])
+    return _assemble(block, feats)
+
+
+def rebuild_features_chunked(chunksize=CHUNK_SIZE, workers=None):
+    """
+    Rebuild complet en flux : history.csv lu par blocs de `chunksize` lignes
+    (ordre chronologique du fichier), état par équipe (RollingStateEngine)
+    reporté d'un bloc à l'autre, lignes de features écrites au fil de l'eau.
+    Mémoire ~ un bloc + l'état des équipes. Features et snapshot identiques
+    octet pour octet à rebuild_all_features : les deux chemins gardent
+    l'ordre du fichier entre lignes de même date (tris stables de
+    load_history / standardize_history). Checkpoint équivalent : mêmes
+    états par équipe, seul l'ordre d'insertion du dict peut différer.
+
+    Les dernières lignes d'un bloc partageant sa date maximale sont reportées
+    au bloc suivant : une journée n'est jamais coupée. Fichier non trié par
+    Date → rebuild en mémoire.
+    """
+    hist_file = HISTORY / "history.csv"
+    if not hist_file.exists():
+        print(f"❌ History file not found → {hist_file}")
+        return None
+
+    print(f"🔧 Streaming RAW history by chunks of {chunksize} rows...")
+    cutoff, ordered = _scan_history(hist_file, chunksize)
+    if not ordered:
+        print("⚠️ history.csv is not sorted by Date → in-memory rebuild.")
+        return rebuild_all_features(workers=workers)
 
-            gf.append(gf_match)
-            ga.append(ga_match)
+    engine = RollingStateEngine()
+    engine_bytes, offset = None, None
+    undated, carry, tail = [], None, None
+    n_rows = n_before = 0
 
-            if gf_match > ga_match:
-                pts.append(3)
-            elif gf_match == ga_match:
-                pts.append(1)
+    with DatasetWriter(HIST_FEATURES) as out:
+        out.write(pd.DataFrame(columns=META_COLS + FEATURE_NAMES))
+
+        def flush(block):
+            nonlocal engine_bytes, offset, n_rows, n_before, tail
+            if block.empty:
+                return
+            # Tampon borné pour le snapshot : derniers matchs / dernière saison par équipe
+            tail = snapshot_tail(block if tail is None else pd.concat([tail, block], ignore_index=True))
+            rows = _block_features(engine, block)
+            closed = _before(block, cutoff)
+            n_closed = int(closed.sum())
+
+            if engine_bytes is None and n_closed < len(block):
+                # Passage du cutoff : état du checkpoint = lignes fermées seulement
+                out.write(rows.iloc[:n_closed])
+                engine.advance(block.iloc[:n_closed])
+                offset = out.tell()
+                engine_bytes = pickle.dumps(engine)
+                out.write(rows.iloc[n_closed:])
+                engine.advance(block.iloc[n_closed:])
             else:
-                pts.append(0)
-
-        return np.mean(gf), np.mean(ga), np.mean(pts)
-
-    # Build rows
-    feature_rows = []
-
-    for _, row in df.iterrows():
-        home = row["HomeTeam"]
-        away = row["AwayTeam"]
-
-        # Last 5
-        home_gf5, home_ga5, home_pts5 = compute_team_features(home, 5)
-        away_gf5, away_ga5, away_pts5 = compute_team_features(away, 5)
-
-        # Last 10
-        home_gf10, home_ga10, home_pts10 = compute_team_features(home, 10)
-        away_gf10, away_ga10, away_pts10 = compute_team_features(away, 10)
-
-        feature_rows.append({
-            "fixture_id": row.get("fixture_id"),
-            "Date": row["Date"],
-            "HomeTeam": home,
-            "AwayTeam": away,
-            "HomeGoals": row.get("HomeGoals"),
-            "AwayGoals": row.get("AwayGoals"),
-
-            # Last 5
-            "home_gf5": home_gf5,
-            "home_ga5": home_ga5,
-            "home_pts5": home_pts5,
-            "away_gf5": away_gf5,
-            "away_ga5": away_ga5,
-            "away_pts5": away_pts5,
-
-            # Last 10
-            "home_gf10": home_gf10,
-            "home_ga10": home_ga10,
-            "home_pts10": home_pts10,
-            "away_gf10": away_gf10,
-            "away_ga10": away_ga10,
-            "away_pts10": away_pts10,
-        })
-
-    df_features = pd.DataFrame(feature_rows)
-    df_features.to_csv(HIST_FEATURES, index=False)
-
-    print(f"💾 Saved historical features → {HIST_FEATURES}  (shape={df_features.shape})")
-    return df_features
+                out.write(rows)
+                engine.advance(block)
+
+            n_rows += len(block)
+            n_before += n_closed
+
+        for chunk in iter_dataset(hist_file, chunksize, schema="history"):
+            chunk = standardize_history(chunk, sort=False)
+            undated.append(chunk[chunk["Date"].isna()])
+            chunk = chunk[chunk["Date"].notna()]
+            if carry is not None:
+                chunk = pd.concat([carry, chunk], ignore_index=True)
+            if chunk.empty:
+                continue
+
+            last_day = chunk["Date"].to_numpy() == chunk["Date"].iloc[-1].to_datetime64()
+            carry = chunk[last_day]
+            flush(chunk[~last_day].reset_index(drop=True))
+
+        if carry is not None:
+            flush(carry.reset_index(drop=True))
+
+        if engine_bytes is None:
+            offset = out.tell()
+            engine_bytes = pickle.dumps(engine)
+
+        # Lignes sans date : aucun historique visible (features à 0), en fin de fichier
+        undated = pd.concat(undated, ignore_index=True) if undated else pd.DataFrame()
+        if not undated.empty:
+            out.write(_block_features(RollingStateEngine(), undated))
+            n_rows += len(undated)
+
+    save_checkpoint(engine_bytes, cutoff, n_before, offset)
+    if tail is not None:
+        save_team_snapshot(team_snapshot(tail))
+    print(f"💾 Saved historical features → {out.target}  ({n_rows} rows, streamed)")
+
+
+# ------------------------------------------
+# Incremental update (pipeline quotidien)
+# ------------------------------------------
+def update_features(workers=None, full=False, chunksize=None):
+    """
+    Mise à jour incrémentale : recharge l'état par équipe du checkpoint,
+    ne calcule que les lignes à partir de la dernière date ouverte et les
+    (ré)écrit en fin de HIST_FEATURES. Rebuild complet si pas de
+    checkpoint, si les features ont changé ou si l'historique passé a bougé
+    (chunksize : rebuild complet en mode mémoire bornée).
+    """
+    ckpt = None if full else load_checkpoint()
+    if ckpt is None or not dataset_target(HIST_FEATURES).exists():
+        return rebuild_all_features(workers=workers, chunksize=chunksize)
+
+    print("🔧 Loading RAW datasets (incremental)...")
+    df = load_history()
+    if df is None:
+        return
+
+    before = _before(df, ckpt["cutoff"])
+    cutoff = pending_cutoff(df)
+    if int(before.sum()) != ckpt["n_before"] or (
+        pd.notna(ckpt["cutoff"]) and pd.notna(cutoff) and cutoff < ckpt["cutoff"]
+    ):
+        print("⚠️ Past history changed since checkpoint → full rebuild.")
+        return rebuild_all_features(workers=workers, chunksize=chunksize)
+
+    new = df[~before]
+    closing = _before(new, cutoff)
+
+    engine = ckpt["engine"]
+    engine.row_fn = _pro_row
+
+    # 1) lignes qui se ferment : émises + intégrées à l'état du checkpoint
+    closed_rows = _assemble(new[closing], engine.process(new[closing]))
+    engine.row_fn = None
+    engine_bytes = pickle.dumps(engine)
+    engine.row_fn = _pro_row
+
+    # 2) lignes encore ouvertes : émises seulement
+    open_rows = _assemble(new[~closing], engine.process(new[~closing]))
+
+    with DatasetWriter(HIST_FEATURES, resume=ckpt["offset"]) as out:
+        out.write(closed_rows)
+        offset = out.tell()
+        out.write(open_rows)
+
+    save_checkpoint(engine_bytes, cutoff, ckpt["n_before"] + len(closed_rows), offset)
+    # Snapshot : seules les équipes des lignes depuis le cutoff ont bougé
+    touched = pd.concat([new["HomeTeam"].astype(object), new["AwayTeam"].astype(object)])
+    save_team_snapshot(refresh_team_snapshot(df, touched))
+
+    print(
+        f"💾 Appended {len(closed_rows) + len(open_rows)} feature rows → {out.target} "
+        f"({len(closed_rows)} closed, {len(open_rows)} pending)"
+    )
+    return pd.concat([closed_rows, open_rows], ignore_index=True)
 
 
 if __name__ == "__main__":
-    rebuild_all_features()
+    chunksize = CHUNK_SIZE if "--chunked" in sys.argv else None
+    update_features(full="--full" in sys.argv, chunksize=chunksize)
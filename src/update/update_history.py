@@ -5,12 +5,15 @@
 import pandas as pd
 from pathlib import Path
 from src.config import RAW_FIX, RAW_RES, RAW_LAST_RES, HISTORY
+from src.history_store import append_history
+from src.match_db import open_db
+from utils.loader import load_dataset
 
 def safe_read_csv(path: Path):
     """Load CSV safely: returns empty DF if file missing or empty."""
     try:
         if path.exists() and path.stat().st_size > 0:
-            return pd.read_csv(path)
+            return load_dataset(path)
         return pd.DataFrame()
     except:
         return pd.DataFrame()
@@ -63,6 +66,15 @@ def update_history():
     df_all.to_csv(out, index=False)
     print(f"💾 Saved history → {out} (shape={df_all.shape})")
 
+    # Store partitionné : seules les partitions (ligue, saison) reçues sont réécrites
+    append_history(df_all)
+
+    # Base SQLite optionnelle (src/match_db.py) : tenue à jour si elle existe
+    db = open_db()
+    if db is not None:
+        n = db.upsert_matches(df_all)
+        print(f"💾 Match DB: {n} matches upserted")
+
     return df_all
 
 
@@ -1,6 +1,8 @@
 import pandas as pd
 from pathlib import Path
 
+from utils.loader import load_dataset, to_dates
+
 ROOT = Path(__file__).resolve().parents[2]
 RAW = ROOT / "data" / "raw"
 PROCESSED = ROOT / "data" / "processed"
@@ -10,6 +12,14 @@ RAW_RES = RAW / "results_api.csv"
 HIST = PROCESSED / "all_matches_raw.csv"
 
 
+def _load_dated(path, schema):
+    """Fichier raw typé ; ValueError s'il n'a pas de colonne Date."""
+    df = load_dataset(path, schema=schema)
+    if "Date" not in df.columns:
+        raise ValueError(f"Missing column 'Date' in {path.name}")
+    return df
+
+
 def update_processed_data():
     """
     Met à jour all_matches_raw.csv en ajoutant fixtures_api + results_api.
@@ -19,20 +29,20 @@ def update_processed_data():
 
     # === Lire historique ===
     if HIST.exists():
-        df_old = pd.read_csv(HIST, low_memory=False)
+        df_old = load_dataset(HIST, schema="history")
     else:
         df_old = pd.DataFrame()
 
     # === Fixtures ===
     try:
-        df_fix = pd.read_csv(RAW_FIX, parse_dates=["Date"], low_memory=False)
+        df_fix = _load_dated(RAW_FIX, "fixtures")
     except Exception:
         print("⚠️ Impossible de lire fixtures_api.csv → ignoré")
         df_fix = pd.DataFrame()
 
     # === Results ===
     try:
-        df_res = pd.read_csv(RAW_RES, parse_dates=["Date"], low_memory=False)
+        df_res = _load_dated(RAW_RES, "results")
     except Exception:
         print("⚠️ Impossible de lire results_api.csv → ignoré")
         df_res = pd.DataFrame()
@@ -47,10 +57,8 @@ def update_processed_data():
     if "Date" in df_new.columns:
 
         # 1️⃣ Convertir toutes les dates, même celles foireuses, en NaT
-        df_new["Date"] = pd.to_datetime(df_new["Date"], errors="coerce", utc=True)
-
         # 2️⃣ Supprimer timezone pour tout uniformiser
-        df_new["Date"] = df_new["Date"].dt.tz_convert(None)
+        df_new["Date"] = to_dates(df_new["Date"])
 
         # 3️⃣ Trier proprement
         df_new = df_new.sort_values("Date").reset_index(drop=True)
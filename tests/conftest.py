@@ -0,0 +1,20 @@
+# =========================================
+# TESTS – APUESDATA
+# =========================================
+#
+#   python -m pytest -q
+#
+# src.config exige les clés API : valeurs factices si absentes
+# (aucun test n'appelle l'API).
+# =========================================
+
+import os
+import sys
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(ROOT))
+
+os.environ.setdefault("API_FOOTBALL_KEY", "test")
+os.environ.setdefault("API_FOOTBALL_HOST", "test")
+os.environ.setdefault("APUESDATA_MEMORY_REPORT", "0")
@@ -0,0 +1,75 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from src.features.asof_join import team_snapshot
+from src.features.registry import build_feature_frame
+from src.storage import read_dataset
+
+FEATURE_COLS = [
+    "home_gf_avg_last_5", "away_ga_avg_last_5",
+    "home_winrate_season", "away_points_avg_last_10",
+    "elo_home", "elo_away",
+]
+
+
+def _history(names):
+    brugge, anderlecht, genk = names
+    pairs = [
+        (brugge, anderlecht, 2, 1), (genk, brugge, 0, 0), (anderlecht, genk, 3, 1),
+        (brugge, genk, 1, 2), (anderlecht, brugge, 1, 1), (genk, anderlecht, 2, 2),
+    ]
+    return pd.DataFrame({
+        "Date": pd.date_range("2024-08-10", periods=len(pairs), freq="7D"),
+        "HomeTeam": [p[0] for p in pairs],
+        "AwayTeam": [p[1] for p in pairs],
+        "HomeGoals": [float(p[2]) for p in pairs],
+        "AwayGoals": [float(p[3]) for p in pairs],
+        "elo_home": np.linspace(1500, 1520, len(pairs)),
+        "elo_away": np.linspace(1490, 1510, len(pairs)),
+    })
+
+
+# Noms de l'API (casse, espaces) ≠ orthographe de l'historique
+FIXTURES = pd.DataFrame({
+    "Date": pd.to_datetime(["2024-10-20", "2024-10-21"]),
+    "HomeTeam": ["Club Brugge KV", "GENK "],
+    "AwayTeam": ["Anderlecht", "club brugge kv"],
+})
+
+
+@pytest.mark.parametrize("names", [
+    ("club brugge kv", "anderlecht", "genk"),   # historique standardisé
+    ("Club Brugge KV", "ANDERLECHT", "Genk"),   # historique brut
+])
+def test_asof_and_snapshot_paths_share_team_keys(names):
+    history = _history(names)
+
+    by_snapshot = build_feature_frame(FIXTURES, FEATURE_COLS, snapshot=team_snapshot(history))
+    by_asof = build_feature_frame(FIXTURES, FEATURE_COLS, history=history)
+
+    assert not by_asof.isna().any().any()
+    pd.testing.assert_frame_equal(by_asof, by_snapshot)
+
+
+def test_upcoming_output_keeps_old_fill_and_order(tmp_path, monkeypatch):
+    import src.update.build_upcoming_features_pro as bu
+
+    cols = FEATURE_COLS + ["BWH", "not_in_registry"]
+    fixtures = FIXTURES.assign(fixture_id=[101, 102])
+    monkeypatch.setattr(bu, "UPCOMING_FEATURES", tmp_path / "upcoming.csv")
+    monkeypatch.setattr(bu, "load_dataset", lambda *a, **k: fixtures.copy())
+    monkeypatch.setattr(bu, "load_elo_state", lambda: None)
+    monkeypatch.setattr(bu, "load_team_snapshot", lambda: None)
+    monkeypatch.setattr(bu, "_CACHE", {
+        "feature_cols": cols,
+        "history": _history(("club brugge kv", "anderlecht", "genk")),
+    })
+
+    bu.build()
+    out = read_dataset(tmp_path / "upcoming.csv")
+
+    # Colonnes du modèle en tête, méta à la suite ; hors registre → 0
+    assert list(out.columns[:len(cols)]) == cols
+    assert list(out.columns[len(cols):]) == ["fixture_id", "Date", "HomeTeam", "AwayTeam"]
+    assert (out[["BWH", "not_in_registry"]] == 0).all().all()
@@ -0,0 +1,35 @@
+import pandas as pd
+
+from benchmarks.synthetic import generate_history
+from src import history_store
+from src.history_store import write_history
+from src.update.elo_sweep import load_sweep_history
+from utils.standardize_features import standardize_history
+
+
+def test_sweep_reads_only_matching_partitions(tmp_path, monkeypatch):
+    df = generate_history(1500)
+    write_history(df, tmp_path)
+
+    read = []
+    real_read = history_store.read_dataset
+    monkeypatch.setattr(
+        history_store, "read_dataset",
+        lambda path, **kw: read.append(path) or real_read(path, **kw),
+    )
+
+    league = str(df["league_id"].iloc[0])
+    season = str(df["Season"].iloc[-1])
+    out = load_sweep_history(leagues=[league], seasons=[season], root=tmp_path)
+
+    assert len(read) == 1
+    assert read[0].parent.name == f"league={league}"
+
+    expected = standardize_history(
+        df[(df["league_id"].astype(str) == league) & (df["Season"].astype(str) == season)]
+    )
+    assert len(out) == len(expected) > 0
+    pd.testing.assert_series_equal(
+        out["HomeTeam"].astype(str).reset_index(drop=True),
+        expected["HomeTeam"].astype(str).reset_index(drop=True),
+    )
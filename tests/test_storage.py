@@ -0,0 +1,61 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from src.storage import DatasetWriter, read_dataset, write_dataset
+from utils.loader import cast
+
+BACKENDS = ["csv", "parquet"]
+
+
+def _backend(fmt):
+    if fmt == "parquet":
+        pytest.importorskip("pyarrow")
+    return fmt
+
+
+def _features(n=12):
+    rng = np.random.default_rng(0)
+    return pd.DataFrame({
+        "fixture_id": np.arange(n) + 1000,
+        "Date": pd.date_range("2024-08-10", periods=n, freq="3D"),
+        "HomeTeam": ["club brugge", "genk", "anderlecht"] * (n // 3),
+        "AwayTeam": ["genk", "anderlecht", "club brugge"] * (n // 3),
+        "HomeGoals": rng.integers(0, 4, n).astype(float),
+        "AwayGoals": rng.integers(0, 4, n).astype(float),
+        "home_gf5": rng.random(n),
+        "away_pts10": rng.random(n),
+    })
+
+
+@pytest.mark.parametrize("fmt", BACKENDS)
+def test_write_read_round_trip(tmp_path, fmt):
+    fmt = _backend(fmt)
+    path = tmp_path / "all_matches_features_updated.csv"
+    df = _features()
+
+    saved = write_dataset(df, path, fmt=fmt)
+    assert saved.suffix == f".{fmt}"
+
+    # Dtypes du schéma "features" (float32) quel que soit le format
+    expected = cast(df.copy(), path=path)
+    pd.testing.assert_frame_equal(read_dataset(path), expected)
+
+
+@pytest.mark.parametrize("fmt", BACKENDS)
+def test_dataset_writer_resume_matches_full_write(tmp_path, fmt):
+    fmt = _backend(fmt)
+    path = tmp_path / "all_matches_features_updated.csv"
+    df = _features()
+
+    with DatasetWriter(path, fmt=fmt) as out:
+        out.write(df.iloc[:0])
+        out.write(df.iloc[:5])
+        position = out.tell()
+        out.write(df.iloc[5:8])
+
+    # Reprise : lignes après `position` remplacées
+    with DatasetWriter(path, fmt=fmt, resume=position) as out:
+        out.write(df.iloc[5:])
+
+    pd.testing.assert_frame_equal(read_dataset(path), cast(df.copy(), path=path))
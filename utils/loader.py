@@ -1,16 +1,296 @@
 # =========================================
 # LOADER UTILS – APUESDATA
 # =========================================
+#
+# Registre des schémas des fichiers connus (history, fixtures, results,
+# upcoming, features, predictions…) : chaque lecture se fait avec des
+# dtypes explicites plutôt que l'inférence de pandas :
+# - équipes / divisions / statuts en category (un code par ligne)
+# - buts en float64 (NaN = non joué), identifiants en Int32 / Int64 (nullables)
+# - cotes (et features / probabilités) en float32
+# - dates au format explicite (ISO8601), inférence seulement en secours
+#
+# Rapport de la mémoire gagnée par rapport à une lecture sans dtypes :
+# en CLI, ou à chaque chargement avec APUESDATA_MEMORY_REPORT=1 :
+#
+#   python -m utils.loader data/raw/history/history.csv   (rapport seul)
+# =========================================
 
-import pandas as pd
+import os
+import sys
 from pathlib import Path
 
+import numpy as np
+import pandas as pd
+
+REPORT_MEMORY = os.getenv("APUESDATA_MEMORY_REPORT", "0") == "1"
+
+DATE_FORMAT = "ISO8601"
+
+# Colonnes communes à tous les fichiers du pipeline
+COMMON_DTYPES = {
+    "fixture_id": "Int64",
+    "league_id": "Int32",
+    "HomeTeam": "category",
+    "AwayTeam": "category",
+    "home_name": "category",
+    "away_name": "category",
+    "Season": "category",
+    "Div": "category",
+    "status": "category",
+    # Buts en float64 comme un read_csv brut : NaN = match non joué,
+    # comparaisons False (pas de pd.NA propagé comme avec Int8)
+    "HomeGoals": "float64",
+    "AwayGoals": "float64",
+    "home_goals": "float64",
+    "away_goals": "float64",
+    "FTHG": "float64",
+    "FTAG": "float64",
+    "target_1x2": "Int8",
+    # Ratings ~1500 : float64 (en float32, elo_home - elo_away perd ~1e-4)
+    "elo_home": "float64",
+    "elo_away": "float64",
+}
+
+# Fichiers API-Football (fetch_*) : saison = année, identifiants d'équipes
+API_DTYPES = {"season": "Int16", "home_id": "Int32", "away_id": "Int32"}
+
+# Colonnes de cotes (football-data : B365H, PSA, AvgD… ; API : odds_home_mean…)
+ODDS_PREFIXES = ("B365", "BW", "IW", "PS", "WH", "VC", "Max", "Avg", "Odds", "odds_")
+
+# Couples d'équipes : mêmes catégories (comparaisons / concat home+away)
+TEAM_PAIRS = (("HomeTeam", "AwayTeam"), ("home_name", "away_name"))
+
+# files   : noms de fichiers (sans extension) couverts par le schéma
+# dates   : colonnes converties au format DATE_FORMAT
+# dtypes  : dtypes explicites (en plus de COMMON_DTYPES)
+# default : dtype des autres colonnes numériques (None : float64 / int64)
+SCHEMAS = {
+    "history": {
+        "files": ("history", "all_history", "all_matches_raw"),
+        "dates": ("Date", "date", "fixture_date"),
+        "dtypes": {},
+        "default": None,
+    },
+    "fixtures": {
+        "files": ("fixtures_api", "fixtures_example"),
+        "dates": ("date", "Date"),
+        "dtypes": API_DTYPES,
+        "default": None,
+    },
+    "results": {
+        "files": ("results_api", "last_results_api"),
+        "dates": ("date", "Date"),
+        "dtypes": API_DTYPES,
+        "default": None,
+    },
+    "upcoming": {
+        "files": ("upcoming_api",),
+        "dates": ("date", "Date"),
+        "dtypes": API_DTYPES,
+        "default": None,
+    },
+    "features": {
+        "files": (
+            "all_matches_features", "all_matches_features_updated",
+            "predictions_upcoming_features", "upcoming_features",
+        ),
+        "dates": ("Date",),
+        "dtypes": {},
+        "default": "float32",
+    },
+    "predictions": {
+        "files": ("predictions_upcoming", "bets_recommendations", "match_recommendations", "preds_example"),
+        "dates": ("Date",),
+        "dtypes": {"BestBet": "category", "Recommended": "category", "prediction_1X2": "category"},
+        "default": "float32",
+    },
+    # État des équipes (rebuild, une ligne par équipe) : dates seulement
+    "snapshot": {
+        "files": ("team_snapshot",),
+        "dates": ("Date", "last_date"),
+        "dtypes": {},
+        "default": None,
+    },
+    "lineups": {
+        "files": ("lineups_api",),
+        "dates": (),
+        "dtypes": {"MatchID_API": "Int64"},
+        "default": None,
+    },
+}
+
+# Fichier inconnu : dtypes communs seulement
+GENERIC = {"files": (), "dates": ("Date",), "dtypes": {}, "default": None}
+
+
+def schema_for(path):
+    """Schéma du fichier `path` (reconnu par son nom, .csv ou .parquet)."""
+    stem = Path(path).stem
+    for schema in SCHEMAS.values():
+        if stem in schema["files"]:
+            return schema
+    return GENERIC
 
-def load_csv(path: Path, parse_date_cols=None):
+
+def _schema(schema, path=None):
+    if schema is None:
+        return schema_for(path) if path is not None else GENERIC
+    return SCHEMAS[schema] if isinstance(schema, str) else schema
+
+
+def column_dtype(col, schema):
+    """dtype explicite de `col` (None : colonne laissée à pandas)."""
+    if col in schema["dates"]:
+        return "datetime"
+    dtype = schema["dtypes"].get(col) or COMMON_DTYPES.get(col)
+    if dtype is None and col.startswith(ODDS_PREFIXES):
+        dtype = "float32"
+    return dtype
+
+
+def to_dates(values, fmt=DATE_FORMAT):
+    """
+    Dates naïves (UTC) au format explicite `fmt` ; les valeurs non
+    conformes (ex. 16/08/2024) passent par l'inférence, comme avant.
+    """
+    s = values if isinstance(values, pd.Series) else pd.Series(values)
+    if pd.api.types.is_datetime64_any_dtype(s):
+        return s.dt.tz_convert(None) if s.dt.tz is not None else s
+
+    out = pd.to_datetime(s, format=fmt, errors="coerce", utc=True).dt.tz_convert(None)
+    bad = out.isna() & s.notna()
+    if bad.any():
+        rest = s[bad].astype(str).str.strip()
+        rest = rest[rest != ""]
+        if len(rest):
+            out[rest.index] = pd.to_datetime(rest, errors="coerce", utc=True).dt.tz_convert(None)
+    return out
+
+
+def share_categories(df, pairs=TEAM_PAIRS):
+    """HomeTeam / AwayTeam (catégoriels) ramenés aux mêmes catégories."""
+    for a, b in pairs:
+        if a in df.columns and b in df.columns:
+            sa, sb = df[a], df[b]
+            if isinstance(sa.dtype, pd.CategoricalDtype) and isinstance(sb.dtype, pd.CategoricalDtype):
+                if not sa.cat.categories.equals(sb.cat.categories):
+                    cats = sa.cat.categories.union(sb.cat.categories)
+                    df[a] = sa.cat.set_categories(cats)
+                    df[b] = sb.cat.set_categories(cats)
+    return df
+
+
+def cast(df, schema=None, path=None):
+    """DataFrame aux dtypes du schéma (colonnes déjà au bon type inchangées)."""
+    schema = _schema(schema, path)
+    for col in df.columns:
+        s = df[col]
+        dtype = column_dtype(col, schema)
+
+        if dtype == "datetime":
+            df[col] = to_dates(s)
+        elif dtype == "category":
+            if not isinstance(s.dtype, pd.CategoricalDtype):
+                df[col] = s.astype("category")
+        elif dtype is not None:
+            if s.dtype != dtype:
+                s = pd.to_numeric(s, errors="coerce")
+                df[col] = (s.round() if dtype.startswith("Int") else s).astype(dtype)
+        elif schema["default"] and pd.api.types.is_numeric_dtype(s) and not pd.api.types.is_bool_dtype(s):
+            df[col] = s.astype(schema["default"])
+    return share_categories(df)
+
+
+def _read_dtypes(columns, schema):
+    """
+    dtypes passés à read_csv. Entiers nullables lus en float64 (parseur C,
+    ~2x plus rapide que Int8 / Int64 directement) puis convertis par cast ;
+    dates converties après lecture.
+    """
+    dtypes = {}
+    for col in columns:
+        dtype = column_dtype(col, schema)
+        if dtype is not None and dtype != "datetime":
+            dtypes[col] = "float64" if dtype.startswith("Int") else dtype
+    return dtypes
+
+
+def _read_csv(path, schema, usecols=None, **kwargs):
+    header = pd.read_csv(path, nrows=0, usecols=usecols).columns
+    try:
+        return pd.read_csv(path, usecols=usecols, dtype=_read_dtypes(header, schema), **kwargs)
+    except (ValueError, TypeError):
+        # Valeur non conforme au dtype (ex. "N/A" dans une colonne de buts) :
+        # lecture libre puis conversion avec coercition
+        return pd.read_csv(path, usecols=usecols, low_memory=False, **kwargs)
+
+
+def untyped_nbytes(df):
+    """Mémoire estimée du même DataFrame lu sans dtypes (object / int64 / float64)."""
+    total = df.index.memory_usage()
+    for col in df.columns:
+        s = df[col]
+        if isinstance(s.dtype, pd.CategoricalDtype):
+            # une chaîne Python (+ pointeur) par ligne ; NaN en dernière position
+            sizes = np.array([sys.getsizeof(c) for c in s.cat.categories] + [sys.getsizeof(np.nan)])
+            total += 8 * len(s) + int(sizes[s.cat.codes.to_numpy()].sum())
+        elif pd.api.types.is_bool_dtype(s):
+            total += len(s)
+        elif pd.api.types.is_numeric_dtype(s) or pd.api.types.is_datetime64_any_dtype(s):
+            total += 8 * len(s)
+        else:
+            total += s.memory_usage(index=False, deep=True)
+    return total
+
+
+def memory_report(df, name):
+    """Affiche (et retourne) la mémoire typée vs non typée de df."""
+    typed = df.memory_usage(deep=True).sum()
+    untyped = untyped_nbytes(df)
+    saved = untyped - typed
+    pct = 100 * saved / untyped if untyped else 0.0
+    print(
+        f"📦 {name}: {len(df)} rows, {typed / 1e6:.1f} MB "
+        f"(untyped ≈ {untyped / 1e6:.1f} MB, saved {saved / 1e6:.1f} MB / {pct:.0f}%)"
+    )
+    return {"file": name, "rows": len(df), "typed": typed, "untyped": untyped, "saved": saved}
+
+
+def load_dataset(path: Path, schema=None, columns=None, report=None):
+    """
+    Lit le CSV `path` avec les dtypes de son schéma (nom de SCHEMAS,
+    dict, ou None : reconnu par le nom du fichier).
+    columns : seules ces colonnes sont lues, dans cet ordre (les absentes
+    sont ignorées). FileNotFoundError si le fichier n'existe pas.
+    """
+    path = Path(path)
+    schema = _schema(schema, path)
+
+    wanted = None if columns is None else set(columns)
+    df = _read_csv(path, schema, usecols=None if wanted is None else (lambda c: c in wanted))
+    if columns is not None:
+        df = df[[c for c in columns if c in df.columns]]
+    df = cast(df, schema)
+
+    if REPORT_MEMORY if report is None else report:
+        memory_report(df, path.name)
+    return df
+
+
+def iter_dataset(path: Path, chunksize, schema=None, usecols=None):
+    """Lecture typée par blocs de `chunksize` lignes (usecols : callable ou liste)."""
+    path = Path(path)
+    schema = _schema(schema, path)
+    for chunk in _read_csv(path, schema, usecols=usecols, chunksize=chunksize):
+        yield cast(chunk, schema)
+
+
+def load_csv(path: Path, parse_date_cols=None, schema=None):
     """
     Charge un CSV de manière robuste :
     - retourne un DataFrame vide si le fichier n'existe pas
-    - convertit automatiquement les dates
+    - dtypes du schéma du fichier (voir SCHEMAS), dates converties
     """
 
     if not path.exists():
@@ -18,7 +298,7 @@ def load_csv(path: Path, parse_date_cols=None):
         return pd.DataFrame()
 
     try:
-        df = pd.read_csv(path)
+        df = load_dataset(path, schema=schema)
     except Exception as e:
         print(f"❌ Erreur de lecture CSV ({path}): {e}")
         return pd.DataFrame()
@@ -27,7 +307,7 @@ def load_csv(path: Path, parse_date_cols=None):
     if parse_date_cols:
         for col in parse_date_cols:
             if col in df.columns:
-                df[col] = pd.to_datetime(df[col], errors="coerce")
+                df[col] = to_dates(df[col])
 
     return df
 
@@ -52,7 +332,7 @@ def load_upcoming_csv(path: Path):
         print("⚠️ Aucun upcoming_api.csv trouvé.")
         return pd.DataFrame()
 
-    df = pd.read_csv(path)
+    df = load_dataset(path, schema="upcoming")
 
     # DATE
     date_col = auto_detect_date(df)
@@ -60,8 +340,7 @@ def load_upcoming_csv(path: Path):
         print("❌ Impossible de détecter une colonne date dans upcoming_api.csv")
         return pd.DataFrame()
 
-    df["Date"] = pd.to_datetime(df[date_col], errors="coerce", utc=True)
-    df["Date"] = df["Date"].dt.tz_convert(None)
+    df["Date"] = to_dates(df[date_col])
 
     # EQUIPES
     HOME = ["home_name", "HomeTeam", "homeTeam", "team_home"]
@@ -80,3 +359,11 @@ def load_upcoming_csv(path: Path):
     df["match"] = df["HomeTeam"] + " vs " + df["AwayTeam"]
 
     return df.sort_values("Date").reset_index(drop=True)
+
+
+if __name__ == "__main__":
+    # Rapport mémoire des fichiers passés en argument (défaut : tous les CSV de data/)
+    root = Path(__file__).resolve().parents[1]
+    paths = [Path(a) for a in sys.argv[1:]] or sorted((root / "data").rglob("*.csv"))
+    for p in paths:
+        load_dataset(p, report=True)
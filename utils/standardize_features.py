@@ -2,8 +2,11 @@
 # STANDARDIZE FEATURES – APUESDATA
 # =========================================
 
+import numpy as np
 import pandas as pd
 
+from utils.loader import share_categories, to_dates
+
 
 def normalize_team_name(name: str):
     """Nettoyage standardisé des noms d’équipes"""
@@ -18,28 +21,52 @@ def normalize_team_name(name: str):
     )
 
 
-def standardize_history(df: pd.DataFrame):
+def normalize_team_column(s: pd.Series):
+    """
+    normalize_team_name sur une colonne ; équipe manquante conservée en
+    NaN (les deux branches). Colonne catégorielle (loader) : une
+    normalisation par équipe et non par ligne, résultat catégoriel.
+    """
+    if not isinstance(s.dtype, pd.CategoricalDtype):
+        return s.astype(str).map(normalize_team_name).where(s.notna())
+
+    # Code -1 (NaN) conservé tel quel
+    names = [normalize_team_name(str(c)) for c in s.cat.categories]
+    codes, uniques = pd.factorize(pd.Index(names))
+    old = s.cat.codes.to_numpy()
+    new = np.where(old >= 0, codes[np.maximum(old, 0)], -1) if len(codes) else old
+    return pd.Series(
+        pd.Categorical.from_codes(new, uniques),
+        index=s.index, name=s.name,
+    )
+
+
+def standardize_history(df: pd.DataFrame, sort: bool = True):
     """
     Pré-normalisation du dataset historique avant feature engineering :
     - normalisation HomeTeam / AwayTeam
     - conversion datetimes
+    - tri par Date (sort=False : ordre d'origine conservé, ex. lecture par blocs)
     """
 
     df = df.copy()
 
     # Nettoyage noms équipes
     if "HomeTeam" in df.columns:
-        df["HomeTeam"] = df["HomeTeam"].astype(str).apply(normalize_team_name)
+        df["HomeTeam"] = normalize_team_column(df["HomeTeam"])
 
     if "AwayTeam" in df.columns:
-        df["AwayTeam"] = df["AwayTeam"].astype(str).apply(normalize_team_name)
+        df["AwayTeam"] = normalize_team_column(df["AwayTeam"])
+    share_categories(df)
 
     # Dates
     for col in ["Date", "date", "fixture_date"]:
         if col in df.columns:
-            df["Date"] = pd.to_datetime(df[col], errors="coerce")
+            df["Date"] = to_dates(df[col])
             break
 
-    df = df.sort_values("Date").reset_index(drop=True)
+    if sort:
+        # Tri stable : ordre d'origine conservé entre matchs du même jour
+        df = df.sort_values("Date", kind="stable").reset_index(drop=True)
 
     return df